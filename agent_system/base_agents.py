@@ -8,6 +8,7 @@ that form our autonomous AI company.
 import json
 import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
@@ -16,6 +17,8 @@ import openai
 import anthropic
 from django.conf import settings
 
+from .llm_service import generate_scheduled, get_local_provider
+
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,7 @@ class AgentResponse:
     token_usage: int
     model_used: str
     error_message: str = ""
+    partial: bool = False  # Truncated at the deadline; content is what streamed in before it
     
     def to_dict(self):
         return asdict(self)
@@ -60,6 +64,11 @@ class BaseAIAgent(ABC):
         self.role_description = ""
         self.capabilities = []
         self.required_data_sources = []
+        self.max_tokens = 4000
+        # time.monotonic() by which the answer is needed (set per run from the task's
+        # time limit) and the output streamed in so far
+        self.deadline: Optional[float] = None
+        self.partial_output: List[str] = []
         
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -79,8 +88,13 @@ class BaseAIAgent(ABC):
     async def analyze(self, context: AnalysisContext) -> AgentResponse:
         """
         Main analysis method - orchestrates the entire analysis process
+        
+        With a ``deadline`` set, the LLM call is bounded by the time left and its
+        ``max_tokens`` by what can be generated in that time. If the deadline hits
+        mid-stream, the output received so far is returned as a partial response.
         """
         start_time = datetime.now()
+        self.partial_output = []
         
         try:
             # Prepare the analysis
@@ -90,7 +104,19 @@ class BaseAIAgent(ABC):
             logger.info(f"{self.agent_name} starting analysis for {context.business_idea_id}")
             
             # Execute the LLM call
-            raw_response, token_usage = await self._call_llm(system_prompt, analysis_prompt)
+            try:
+                raw_response, token_usage = await asyncio.wait_for(
+                    self._call_llm(system_prompt, analysis_prompt),
+                    timeout=self.remaining_time()
+                )
+            except asyncio.TimeoutError:
+                if not self.partial_output:
+                    raise TimeoutError("LLM call produced no output before the task deadline")
+                logger.warning(f"{self.agent_name} hit its deadline; keeping the partial output")
+                return self.partial_response(
+                    (datetime.now() - start_time).total_seconds(),
+                    prompt=system_prompt + analysis_prompt
+                )
             
             # Parse and structure the response
             structured_data = self.parse_response(raw_response)
@@ -126,6 +152,36 @@ class BaseAIAgent(ABC):
                 error_message=str(e)
             )
     
+    def remaining_time(self) -> Optional[float]:
+        """Seconds left until the deadline, None without one"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+    
+    def output_token_budget(self) -> int:
+        """``max_tokens`` for the next call: no more than can be generated before the deadline"""
+        remaining = self.remaining_time()
+        if remaining is None:
+            return self.max_tokens
+        tokens_per_second = getattr(settings, 'AGENT_OUTPUT_TOKENS_PER_SECOND', 20)
+        budget = max(int(remaining * tokens_per_second), getattr(settings, 'AGENT_MIN_OUTPUT_TOKENS', 256))
+        return min(self.max_tokens, budget)
+    
+    def partial_response(self, execution_time: float, prompt: str = "") -> AgentResponse:
+        """Response built from the output streamed in before the deadline"""
+        content = ''.join(self.partial_output)
+        structured_data = self.parse_response(content)
+        return AgentResponse(
+            success=True,
+            content=content,
+            structured_data=structured_data,
+            confidence=self._calculate_confidence(structured_data),
+            execution_time=execution_time,
+            token_usage=_estimate_tokens(prompt) + _estimate_tokens(content),
+            model_used=self.model_preference,
+            partial=True
+        )
+    
     async def _call_llm(self, system_prompt: str, user_prompt: str) -> Tuple[str, int]:
         """
         Make the actual LLM API call with proper error handling and retries
@@ -134,47 +190,86 @@ class BaseAIAgent(ABC):
             return await self._call_openai(system_prompt, user_prompt)
         elif self.model_preference.startswith('claude'):
             return await self._call_anthropic(system_prompt, user_prompt)
+        elif get_local_provider(self.model_preference):
+            return await self._call_local(system_prompt, user_prompt)
         else:
             raise ValueError(f"Unsupported model: {self.model_preference}")
     
     async def _call_openai(self, system_prompt: str, user_prompt: str) -> Tuple[str, int]:
-        """Call OpenAI API"""
+        """Call OpenAI API, streaming the output into ``partial_output``"""
         client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         
-        response = await client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model=self.model_preference,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.3,
-            max_tokens=4000,
+            max_tokens=self.output_token_budget(),
+            stream=True,
+            # The last chunk then reports the real usage (sent as a raw body field, which
+            # this SDK version has no keyword argument for)
+            extra_body={"stream_options": {"include_usage": True}},
         )
+        usage = None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                self.partial_output.append(chunk.choices[0].delta.content)
+            usage = getattr(chunk, 'usage', None) or usage
         
-        content = response.choices[0].message.content
-        token_usage = response.usage.total_tokens
+        content = ''.join(self.partial_output)
+        token_usage = _total_tokens(usage)
+        if token_usage is None:
+            # OpenAI-compatible servers may ignore stream_options
+            token_usage = _estimate_tokens(system_prompt + user_prompt) + _estimate_tokens(content)
         
         return content, token_usage
     
     async def _call_anthropic(self, system_prompt: str, user_prompt: str) -> Tuple[str, int]:
-        """Call Anthropic Claude API"""
+        """Call Anthropic Claude API, streaming the output into ``partial_output``"""
         client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
         
-        response = await client.messages.create(
+        stream = await client.messages.create(
             model=self.model_preference,
-            max_tokens=4000,
+            max_tokens=self.output_token_budget(),
             system=system_prompt,
             messages=[
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.3,
+            stream=True,
         )
+        input_tokens = output_tokens = 0
+        async for event in stream:
+            if event.type == 'message_start':
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == 'content_block_delta':
+                self.partial_output.append(event.delta.text)
+            elif event.type == 'message_delta':
+                output_tokens = event.usage.output_tokens
         
-        content = response.content[0].text
-        token_usage = response.usage.input_tokens + response.usage.output_tokens
+        content = ''.join(self.partial_output)
+        token_usage = input_tokens + output_tokens
         
         return content, token_usage
     
+    async def _call_local(self, system_prompt: str, user_prompt: str) -> Tuple[str, int]:
+        """
+        Call a local LM Studio / Ollama server (``lmstudio/<model>``, ``ollama/<model>``).
+        
+        Goes through the model scheduler, so agents in every worker process share the
+        endpoint's batches instead of swapping its resident model per call.
+        """
+        provider, model = get_local_provider(self.model_preference)
+        options = {'model': model, 'temperature': 0.3, 'max_tokens': self.output_token_budget()}
+        if self.deadline is not None:
+            options['timeout'] = self.remaining_time()
+        response = await generate_scheduled(provider, system_prompt, user_prompt, **options)
+        
+        self.partial_output.append(response.content)
+        return response.content, response.token_usage
+    
     def _calculate_confidence(self, structured_data: Dict[str, Any]) -> float:
         """
         Calculate confidence score based on the completeness and quality of the analysis
@@ -202,6 +297,20 @@ class BaseAIAgent(ABC):
         return all(hasattr(context, field) and getattr(context, field) for field in required_fields)
 
 
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) where the API reports no usage"""
+    return len(text) // 4
+
+
+def _total_tokens(usage) -> Optional[int]:
+    """``total_tokens`` of a usage block, parsed into a model or left as a plain dict"""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get('total_tokens')
+    return getattr(usage, 'total_tokens', None)
+
+
 class AgentCommunicationHub:
     """
     Manages communication and coordination between agents.
@@ -8,6 +8,7 @@ with specialized knowledge and analysis capabilities.
 import json
 import re
 from typing import Dict, List, Any
+from django.conf import settings
 from .base_agents import BaseAIAgent, AnalysisContext, communication_hub
 
 
@@ -362,6 +363,62 @@ class FinancialAnalystAgent(BaseAIAgent):
         }
 
 
+class TriageAgent(BaseAIAgent):
+    """
+    Triage Agent - Cheap pre-screen that gives a coarse viability score
+    before the full multi-agent analysis is scheduled.
+    """
+    
+    def __init__(self):
+        super().__init__("Triage", getattr(settings, 'TRIAGE_MODEL', 'gpt-3.5-turbo'))
+        self.role_description = "Fast first-pass screening of business ideas"
+        self.capabilities = ["Viability screening", "Red flag detection"]
+        self.max_tokens = getattr(settings, 'TRIAGE_MAX_TOKENS', 300)
+    
+    def get_system_prompt(self) -> str:
+        return """You are a venture analyst screening a high volume of business ideas.
+        Give a fast, coarse judgement of whether an idea deserves a full analysis.
+        Be brief and answer with JSON only."""
+    
+    def get_analysis_prompt(self, context: AnalysisContext) -> str:
+        budget_text = f"${context.estimated_budget:,.2f}" if context.estimated_budget else "Not specified"
+        return f"""Screen this business idea:
+        
+        **Business Idea:** {context.title}
+        **Description:** {context.description}
+        **Industry:** {context.industry}
+        **Target Market:** {context.target_market}
+        **Estimated Budget:** {budget_text}
+        
+        Respond with JSON only:
+        {{
+            "viability_score": 55,
+            "rationale": "One or two sentences",
+            "red_flags": ["flag1", "flag2"]
+        }}"""
+    
+    def parse_response(self, raw_response: str) -> Dict[str, Any]:
+        try:
+            json_match = re.search(r'\{.*\}', raw_response, re.DOTALL)
+            if json_match:
+                data = json.loads(json_match.group())
+                data['viability_score'] = min(max(int(data.get('viability_score', 50)), 1), 100)
+                return data
+        except (json.JSONDecodeError, TypeError, ValueError):
+            pass
+        
+        return {
+            "viability_score": extract_score(raw_response),
+            "rationale": raw_response[:300],
+            "red_flags": [],
+            "confidence_indicators": {"data_quality_multiplier": 0.5}
+        }
+    
+    def _calculate_confidence(self, structured_data: Dict[str, Any]) -> float:
+        indicators = structured_data.get('confidence_indicators', {})
+        return 100.0 * indicators.get('data_quality_multiplier', 1.0)
+
+
 # Register all agents with the communication hub
 def initialize_agents():
     """Initialize and register all business agents"""
@@ -369,6 +426,7 @@ def initialize_agents():
         CEOAgent(),
         MarketResearchAgent(),
         FinancialAnalystAgent(),
+        TriageAgent(),
     ]
     
     for agent in agents:
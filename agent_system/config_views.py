@@ -30,6 +30,7 @@ from .services import (
     setup_default_agent_system, test_agent_configuration
 )
 from analysis_engine.models import AgentReport
+from analysis_engine.pagination import InvalidCursor, KeysetPaginator, approximate_count
 
 
 @login_required
@@ -286,19 +287,20 @@ def agent_execution_logs_view(request, config_id):
     
     try:
         config = AgentConfiguration.objects.get(id=config_id)
-        logs = config.execution_logs.order_by('-execution_timestamp')
+        logs = config.execution_logs.defer('prompt_used', 'response_content', 'structured_data')
         
-        # Pagination
-        page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 20))
-        
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        paginated_logs = logs[start:end]
+        # Keyset pagination on (execution_timestamp, id)
+        try:
+            page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+        except ValueError:
+            page_size = 20
+        try:
+            page = KeysetPaginator(logs, '-execution_timestamp', page_size).get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return Response({'error': 'Invalid cursor'}, status=400)
         
         logs_data = []
-        for log in paginated_logs:
+        for log in page:
             logs_data.append({
                 'id': log.id,
                 'status': log.status,
@@ -310,13 +312,17 @@ def agent_execution_logs_view(request, config_id):
                 'business_idea_id': log.business_idea_id,
             })
         
-        return Response({
+        response = {
             'logs': logs_data,
-            'total_count': logs.count(),
-            'page': page,
             'page_size': page_size,
-            'has_next': end < logs.count()
-        })
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+            'has_next': page.has_next(),
+        }
+        # Counting is optional and capped at PAGINATION_COUNT_LIMIT
+        if request.GET.get('count', '').lower() == 'true':
+            response['total_count'], response['total_count_exact'] = approximate_count(logs)
+        return Response(response)
         
     except AgentConfiguration.DoesNotExist:
         return Response({'error': 'Agent configuration not found'}, status=404)
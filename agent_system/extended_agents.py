@@ -518,6 +518,7 @@ def initialize_all_agents():
         RiskAnalystAgent(),
         MarketingStrategistAgent(),
         IdeaGeneratorAgent(),
+        TriageAgent(),
     ]
     
     for agent in agents:
@@ -527,4 +528,4 @@ def initialize_all_agents():
 
 
 # Import the base agents to make them available
-from .business_agents import CEOAgent, MarketResearchAgent, FinancialAnalystAgent
+from .business_agents import CEOAgent, MarketResearchAgent, FinancialAnalystAgent, TriageAgent
@@ -15,6 +15,8 @@ from django.conf import settings
 import openai
 import anthropic
 
+from .model_scheduler import model_scheduler
+
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +54,9 @@ class LLMResponse:
 class BaseLLMProvider:
     """Base class for all LLM providers"""
     
+    # Local servers hold one resident model; their requests go through the model scheduler
+    is_local = False
+    
     def __init__(self, name: str, api_endpoint: str, api_key: str = None, **config):
         self.name = name
         self.api_endpoint = api_endpoint
@@ -82,6 +87,8 @@ class BaseLLMProvider:
 class LMStudioProvider(BaseLLMProvider):
     """LM Studio local LLM provider"""
     
+    is_local = True
+    
     def __init__(self, name: str = "LM Studio", api_endpoint: str = "http://localhost:1234", **config):
         super().__init__(name, api_endpoint, **config)
         self.default_model = config.get('default_model', 'local-model')
@@ -142,6 +149,8 @@ class LMStudioProvider(BaseLLMProvider):
 class OllamaProvider(BaseLLMProvider):
     """Ollama local LLM provider"""
     
+    is_local = True
+    
     def __init__(self, name: str = "Ollama", api_endpoint: str = "http://localhost:11434", **config):
         super().__init__(name, api_endpoint, **config)
         self.default_model = config.get('default_model', 'llama2')
@@ -326,7 +335,7 @@ class LLMProviderManager:
             if not provider.is_available:
                 raise LLMProviderError(f"Provider {provider_name} is not available")
         
-        return await provider.generate(system_prompt, user_prompt, **kwargs)
+        return await generate_scheduled(provider, system_prompt, user_prompt, **kwargs)
     
     def get_available_providers(self) -> List[str]:
         """Get list of available provider names"""
@@ -350,6 +359,43 @@ class LLMProviderManager:
 llm_manager = LLMProviderManager()
 
 
+async def generate_scheduled(provider: BaseLLMProvider, system_prompt: str, user_prompt: str,
+                             **kwargs) -> LLMResponse:
+    """Generate with ``provider``; local servers are called through the model scheduler"""
+    if provider.is_local and getattr(settings, 'MODEL_AFFINITY_ENABLED', True):
+        # Group requests per resident model instead of forcing a swap per call
+        model = kwargs.get('model') or provider.default_model
+        async with model_scheduler.slot(provider.api_endpoint, model):
+            return await provider.generate(system_prompt, user_prompt, **kwargs)
+    
+    return await provider.generate(system_prompt, user_prompt, **kwargs)
+
+
+def get_local_provider(model_name: str) -> Optional[Tuple[BaseLLMProvider, str]]:
+    """
+    Local provider and model for ``lmstudio/<model>`` or ``ollama/<model>`` names
+    (e.g. an agent's ``model_preference``); None for hosted models.
+    """
+    prefix, _, model = (model_name or '').partition('/')
+    if not model:
+        return None
+    if prefix == 'lmstudio':
+        endpoint = getattr(settings, 'LM_STUDIO_ENDPOINT', 'http://localhost:1234')
+        return LMStudioProvider(api_endpoint=endpoint, default_model=model), model
+    if prefix == 'ollama':
+        endpoint = getattr(settings, 'OLLAMA_ENDPOINT', 'http://localhost:11434')
+        return OllamaProvider(api_endpoint=endpoint, default_model=model), model
+    return None
+
+
+def get_local_endpoints() -> List[str]:
+    """Endpoints of the configured local servers"""
+    return [
+        getattr(settings, 'LM_STUDIO_ENDPOINT', 'http://localhost:1234'),
+        getattr(settings, 'OLLAMA_ENDPOINT', 'http://localhost:11434'),
+    ]
+
+
 async def initialize_llm_providers():
     """Initialize all LLM providers based on configuration"""
     
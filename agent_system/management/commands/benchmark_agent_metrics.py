@@ -0,0 +1,139 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.test import RequestFactory, override_settings
+from rest_framework.test import force_authenticate
+
+from agent_system.views import agent_metrics_view
+from analysis_engine.models import AgentReport, BusinessIdea
+from analysis_engine.rollups import rebuild_rollups
+
+BENCHMARK_TITLE = '[metrics benchmark]'
+
+
+class Command(BaseCommand):
+    help = ('Time agent_metrics_view against a synthetic report table (default 1M reports), '
+            'per-request aggregation vs. the cached snapshot, and the per-type loop it replaced. '
+            'All rows are written in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=1_000_000, help='Synthetic agent reports')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per variant')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-legacy', action='store_true',
+                            help='Skip the per-type loop, which loads every completed report')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._populate(options['reports'], options['batch_size'])
+            user = User.objects.create_user(username=f'metrics-benchmark-{time.time_ns()}')
+
+            results = {}
+            for variant, enabled in [('grouped', False), ('snapshot', True)]:
+                cache.clear()
+                with override_settings(AGENT_METRICS_SNAPSHOT_ENABLED=enabled):
+                    results[variant] = self._time_view(user, options['repeat'])
+            if not options['skip_legacy']:
+                results['legacy loop'] = self._time(self._legacy_metrics, options['repeat'])
+
+            transaction.set_rollback(True)
+
+        self._report(results, options['reports'])
+
+    def _populate(self, report_count, batch_size):
+        """Insert ``report_count`` reports spread over enough ideas for one report per agent type"""
+        agent_types = [agent_type for agent_type, _ in AgentReport.AGENT_TYPES]
+        statuses = ['COMPLETED'] * 8 + ['FAILED', 'IN_PROGRESS']
+        started = time.monotonic()
+
+        written = 0
+        while written < report_count:
+            idea_count = min(batch_size, (report_count - written + len(agent_types) - 1) // len(agent_types))
+            ideas = BusinessIdea.objects.bulk_create([
+                BusinessIdea(title=f"{BENCHMARK_TITLE} {written + index}", description='Synthetic idea')
+                for index in range(idea_count)
+            ])
+            reports = []
+            for idea in ideas:
+                for agent_type in agent_types[:report_count - written - len(reports)]:
+                    status = random.choice(statuses)
+                    completed = status == 'COMPLETED'
+                    reports.append(AgentReport(
+                        business_idea=idea,
+                        agent_type=agent_type,
+                        status=status,
+                        report_content='',
+                        agent_score=random.randint(1, 100) if completed else None,
+                        confidence=Decimal(random.randint(5000, 9900)) / 100 if completed else None,
+                        token_usage=random.randint(500, 4000) if completed else None,
+                        cost_estimate=Decimal(random.randint(1, 900)) / 10000 if completed else None,
+                        execution_time=timedelta(seconds=random.uniform(2, 120)) if completed else None,
+                    ))
+            AgentReport.objects.bulk_create(reports, batch_size=batch_size)
+            written += len(reports)
+
+        self.stdout.write(f"Inserted {written} reports in {time.monotonic() - started:.1f}s")
+
+        # Metrics read the daily rollups, which bulk inserts don't maintain
+        started = time.monotonic()
+        counts = rebuild_rollups()
+        self.stdout.write(f"Built {counts['agent_rollups']} agent rollups in {time.monotonic() - started:.1f}s")
+
+    def _time_view(self, user, repeat):
+        factory = RequestFactory()
+
+        def request():
+            view_request = factory.get('/agents/metrics/')
+            force_authenticate(view_request, user=user)
+            return agent_metrics_view(view_request)
+
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # The first request fills the snapshot; report it separately
+        with connection.execute_wrapper(count_query):
+            first = self._time(request, 1)
+            queries.clear()
+            result = self._time(request, repeat)
+        result['first'] = first['median']
+        result['queries'] = len(queries) / repeat
+        return result
+
+    def _time(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - started) * 1000)
+        return {'median': statistics.median(timings), 'max': max(timings)}
+
+    def _legacy_metrics(self):
+        """The per-agent-type implementation replaced by the grouped query"""
+        for agent_type, _ in AgentReport.AGENT_TYPES:
+            reports = AgentReport.objects.filter(agent_type=agent_type)
+            completed_reports = reports.filter(status='COMPLETED')
+            reports.count()
+            completed_reports.count()
+            reports.filter(status='FAILED').count()
+            for field in ['agent_score', 'confidence', 'token_usage', 'cost_estimate']:
+                completed_reports.aggregate(avg=Avg(field))
+            [report.execution_time.total_seconds() for report in completed_reports if report.execution_time]
+
+    def _report(self, results, report_count):
+        self.stdout.write(f"agent_metrics_view with {report_count} reports")
+        self.stdout.write(f"{'variant':<14}{'first ms':>12}{'median ms':>12}{'max ms':>12}{'queries':>10}")
+        for variant, result in results.items():
+            first = f"{result['first']:.1f}" if 'first' in result else '-'
+            queries = f"{result['queries']:.0f}" if 'queries' in result else '-'
+            self.stdout.write(f"{variant:<14}{first:>12}{result['median']:>12.1f}{result['max']:>12.1f}{queries:>10}")
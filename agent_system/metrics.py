@@ -0,0 +1,111 @@
+"""
+Agent Performance Metrics
+
+Per-agent-type report counts, quality and efficiency averages computed with a
+single ``GROUP BY agent_type`` query over the daily agent rollups (see
+``analysis_engine.rollups``), so the cost follows the number of rollup days
+rather than the number of reports. With ``AGENT_METRICS_SNAPSHOT_ENABLED`` the
+result is kept as a snapshot in the shared cache, refreshed from beat every
+``AGENT_METRICS_SNAPSHOT_INTERVAL`` seconds, so requests don't scan the report
+table at all.
+
+The auto-refreshing status pages (agent status, platform metrics) read the same
+grouped stats through ``get_report_stats``, cached for ``METRICS_CACHE_TTL``
+seconds across workers.
+"""
+
+import logging
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from analysis_engine.models import AgentReport, DailyAgentRollup
+from analysis_engine.rollups import report_stats
+
+logger = logging.getLogger(__name__)
+
+METRICS_SNAPSHOT_KEY = 'agent_system:metrics:snapshot'
+REPORT_STATS_KEY = 'agent_system:metrics:report_stats'
+
+
+def aggregate_report_stats() -> Dict[str, Dict[str, Any]]:
+    """Report counts and averages of completed reports per agent type, from one grouped query"""
+    return report_stats(DailyAgentRollup.objects.all())
+
+
+def get_report_stats() -> Dict[str, Dict[str, Any]]:
+    """``aggregate_report_stats`` through a short-lived cache shared by all workers"""
+    stats = cache.get(REPORT_STATS_KEY)
+    if stats is None:
+        stats = aggregate_report_stats()
+        cache.set(REPORT_STATS_KEY, stats, getattr(settings, 'METRICS_CACHE_TTL', 15))
+    return stats
+
+
+def compute_agent_metrics() -> Dict[str, Any]:
+    """Metrics of every agent type from one grouped query"""
+    by_type = aggregate_report_stats()
+    
+    metrics = {}
+    for agent_type, agent_name in AgentReport.AGENT_TYPES:
+        row = by_type.get(agent_type, {})
+        total = row.get('total', 0)
+        successful = row.get('successful', 0)
+        average_score = row.get('average_score')
+        average_confidence = row.get('average_confidence')
+        average_tokens = row.get('average_tokens')
+        average_cost = row.get('average_cost')
+        average_execution_time = row.get('average_execution_time')
+        
+        metrics[agent_type] = {
+            'agent_name': agent_name,
+            'performance': {
+                'total_reports': total,
+                'successful_reports': successful,
+                'failed_reports': row.get('failed', 0),
+                'success_rate': round(successful / total * 100, 2) if total else 0,
+            },
+            'quality_metrics': {
+                'average_score': round(float(average_score), 1) if average_score else None,
+                'average_confidence': round(float(average_confidence), 1) if average_confidence else None,
+            },
+            'efficiency_metrics': {
+                'average_execution_time': (round(average_execution_time.total_seconds(), 2)
+                                           if average_execution_time else 0),
+                'average_token_usage': int(average_tokens) if average_tokens else None,
+                'average_cost': round(float(average_cost), 4) if average_cost else None,
+            },
+        }
+    
+    return {
+        'agent_metrics': metrics,
+        'summary': {
+            'total_agents': len(AgentReport.AGENT_TYPES),
+            'total_reports': sum(row['total'] for row in by_type.values()),
+            'successful_reports': sum(row['successful'] for row in by_type.values()),
+        },
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def refresh_agent_metrics_snapshot() -> Dict[str, Any]:
+    """Recompute the metrics and store them as the shared snapshot"""
+    snapshot = compute_agent_metrics()
+    # Outlives one refresh interval so a late beat run never leaves requests without it
+    ttl = getattr(settings, 'AGENT_METRICS_SNAPSHOT_INTERVAL', 300) * 2
+    cache.set(METRICS_SNAPSHOT_KEY, snapshot, ttl)
+    return snapshot
+
+
+def get_agent_metrics() -> Dict[str, Any]:
+    """Agent metrics from the snapshot when enabled, computed on the spot otherwise"""
+    if not getattr(settings, 'AGENT_METRICS_SNAPSHOT_ENABLED', False):
+        return compute_agent_metrics()
+    
+    snapshot = cache.get(METRICS_SNAPSHOT_KEY)
+    if snapshot is None:
+        logger.info("Agent metrics snapshot missing, computing it now")
+        snapshot = refresh_agent_metrics_snapshot()
+    return snapshot
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent_system", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentExecutionBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField(help_text="Start of the hour")),
+                ("executions", models.PositiveIntegerField(default=0)),
+                (
+                    "agent_config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="execution_buckets",
+                        to="agent_system.agentconfiguration",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-bucket_start"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="agentexecutionbucket",
+            constraint=models.UniqueConstraint(
+                fields=("agent_config", "bucket_start"),
+                name="unique_agent_execution_bucket",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent_system", "0002_agentexecutionbucket"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="agentexecutionlog",
+            index=models.Index(
+                fields=["agent_config", "execution_timestamp", "id"],
+                name="agent_syste_agent_c_be5def_idx",
+            ),
+        ),
+    ]
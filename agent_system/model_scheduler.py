@@ -0,0 +1,413 @@
+"""
+Model-Affinity Scheduling for Local LLM Servers
+
+LM Studio and Ollama keep a single model resident and swap multi-GB weights in
+whenever a request names a different model. Agents configured with different
+models on the same host therefore pay a model load on almost every interleaved
+call. The scheduler queues local requests per (endpoint, model), keeps serving
+the resident model in batches and only switches once the batch reaches its
+fairness cap or another model's oldest request has waited too long.
+
+Web and worker processes share the same local servers, so each endpoint is
+leased through the shared cache: only the process holding the lease sends it
+requests and decides when to switch models. A process that cannot get the lease
+leaves a waiting marker; the holder hands the endpoint over once its batch is
+done or that marker is older than its own oldest waiting request. The resident
+model and per-model served/swap/wait counters are kept with the lease, so they
+describe the endpoint rather than one process; the counters are atomic
+increments, so a lease that expired under a long call never loses updates.
+
+The shared cache may be a network round trip away, so none of this I/O runs on
+a caller's event loop: each process does it on one scheduler thread, and the
+lock guarding the in-memory schedule is never held across it.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+LEASE_KEY = 'model_scheduler:lease:{endpoint}'
+WAITING_KEY = 'model_scheduler:waiting:{endpoint}'
+RESIDENT_KEY = 'model_scheduler:resident:{endpoint}'
+MODELS_KEY = 'model_scheduler:models:{endpoint}'
+COUNTER_KEY = 'model_scheduler:{counter}:{endpoint}:{model}'
+COUNTERS = ('served', 'swaps', 'wait_ms')
+
+
+class _Waiter:
+    """A request waiting for its model to be scheduled on an endpoint"""
+    
+    __slots__ = ('model', 'enqueued_at', 'loop', 'future', 'granted')
+    
+    def __init__(self, model: str, loop: asyncio.AbstractEventLoop):
+        self.model = model
+        self.enqueued_at = time.monotonic()
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+
+class EndpointQueue:
+    """Pending requests of one local endpoint, grouped by model"""
+    
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.pending: Dict[str, Deque[_Waiter]] = {}
+        self.active_model: Optional[str] = None
+        self.in_flight = 0
+        self.batch_served = 0
+        # A dispatch is queued on the scheduler thread and has not started yet
+        self.dispatch_requested = False
+        # Lease state, only touched on the scheduler thread
+        self.holds_lease = False
+        # When the endpoint was last handed over to another process
+        self.yielded_at = float('-inf')
+    
+    def oldest(self, model: str) -> float:
+        return self.pending[model][0].enqueued_at
+    
+    def longest_wait(self) -> float:
+        if not self.pending:
+            return 0.0
+        return time.monotonic() - min(self.oldest(model) for model in self.pending)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _wake(waiter: _Waiter):
+    try:
+        waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+    except RuntimeError:
+        # The waiter's loop has closed; it gave its slot back when it was cancelled
+        pass
+
+
+def _increment(key: str, delta: int):
+    cache.add(key, 0, None)
+    cache.incr(key, delta)
+
+
+class ModelAffinityScheduler:
+    """
+    Grants local LLM requests in per-model batches.
+    
+    The in-memory schedule is guarded by a thread lock and waiters are woken on
+    their own loop, so callers on different event loops (request threads, the
+    agent runtime loop) share one schedule per process. Lease and counter I/O
+    runs on the scheduler thread; across processes the endpoint lease decides,
+    and waiters ask for another dispatch every ``MODEL_AFFINITY_LEASE_POLL``
+    seconds in case another process released the endpoint meanwhile.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointQueue] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+    
+    @property
+    def owner(self) -> str:
+        # Includes the pid so that forked children never share a lease
+        return f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+    
+    def _scheduler_thread(self) -> ThreadPoolExecutor:
+        """The single thread doing this process's cache I/O; call with the lock held"""
+        # Threads do not survive a fork, so each process starts its own
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-scheduler')
+            self._executor_pid = os.getpid()
+        return self._executor
+    
+    @asynccontextmanager
+    async def slot(self, endpoint: str, model: str):
+        """Wait until ``model`` may run on ``endpoint`` and hold the slot for the call"""
+        endpoint = endpoint.rstrip('/')
+        waiter = _Waiter(model, asyncio.get_running_loop())
+        poll = getattr(settings, 'MODEL_AFFINITY_LEASE_POLL', 0.5)
+        
+        with self._lock:
+            queue = self._endpoints.setdefault(endpoint, EndpointQueue(endpoint))
+            queue.pending.setdefault(model, deque()).append(waiter)
+        
+        try:
+            self._request_dispatch(queue)
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), poll)
+                    break
+                except asyncio.TimeoutError:
+                    # Another process may have released the endpoint meanwhile
+                    self._request_dispatch(queue)
+        except BaseException:
+            self._abandon(endpoint, waiter)
+            raise
+        
+        try:
+            yield
+        finally:
+            with self._lock:
+                queue.in_flight -= 1
+            self._request_dispatch(queue)
+    
+    def _abandon(self, endpoint: str, waiter: _Waiter):
+        """Drop a cancelled waiter, or give back its slot if it was granted meanwhile"""
+        with self._lock:
+            queue = self._endpoints[endpoint]
+            if waiter.granted:
+                queue.in_flight -= 1
+            else:
+                waiting = queue.pending.get(waiter.model)
+                if waiting and waiter in waiting:
+                    waiting.remove(waiter)
+                    if not waiting:
+                        del queue.pending[waiter.model]
+        self._request_dispatch(queue)
+    
+    def _request_dispatch(self, queue: EndpointQueue):
+        """Queue a dispatch of ``queue`` on the scheduler thread unless one is already queued"""
+        with self._lock:
+            if queue.dispatch_requested:
+                return
+            queue.dispatch_requested = True
+            executor = self._scheduler_thread()
+        executor.submit(self._dispatch, queue)
+    
+    def _dispatch(self, queue: EndpointQueue):
+        """Grant what the endpoint can take now; runs on the scheduler thread"""
+        concurrency = getattr(settings, 'MODEL_AFFINITY_ENDPOINT_CONCURRENCY', 1)
+        with self._lock:
+            queue.dispatch_requested = False
+            idle = not queue.pending and not queue.in_flight
+            wanted = bool(queue.pending) and queue.in_flight < concurrency
+            longest_wait = queue.longest_wait()
+        
+        if idle:
+            self._release(queue)
+            return
+        if not wanted or not self._acquire(queue, longest_wait):
+            return
+        external_wait = self._external_wait(queue)
+        
+        with self._lock:
+            grants, hand_over = self._grant(queue, concurrency, external_wait)
+        
+        if hand_over:
+            logger.info(f"Handing {queue.endpoint} over to another process after a batch of {queue.batch_served}")
+            self._release(queue)
+            queue.yielded_at = time.monotonic()
+        
+        # Counted before the waiters run, so stats read afterwards include them
+        for waiter, wait, swapped, loaded in grants:
+            self._record_grant(queue.endpoint, waiter.model, wait, swapped, loaded)
+            _wake(waiter)
+    
+    def _grant(self, queue: EndpointQueue, concurrency: int,
+               external_wait: Optional[float]) -> Tuple[List[Tuple[_Waiter, float, bool, bool]], bool]:
+        """Pick the waiters to run now, with the lock held; also says whether to hand the endpoint over"""
+        grants = []
+        while queue.in_flight < concurrency and queue.pending:
+            model, hand_over = self._next_model(queue, external_wait)
+            if hand_over:
+                return grants, True
+            if model is None:
+                break
+            
+            waiting = queue.pending[model]
+            waiter = waiting.popleft()
+            if not waiting:
+                del queue.pending[model]
+            
+            swapped = loaded = False
+            if model != queue.active_model:
+                if queue.active_model is not None:
+                    swapped = True
+                    logger.info(f"Swapping {queue.endpoint} from {queue.active_model} to {model} "
+                                f"after a batch of {queue.batch_served}")
+                loaded = True
+                queue.active_model = model
+                queue.batch_served = 0
+            
+            queue.batch_served += 1
+            queue.in_flight += 1
+            waiter.granted = True
+            grants.append((waiter, time.monotonic() - waiter.enqueued_at, swapped, loaded))
+        return grants, False
+    
+    def _next_model(self, queue: EndpointQueue, external_wait: Optional[float]) -> Tuple[Optional[str], bool]:
+        """The model to grant next, or None to wait; the flag asks to hand the endpoint over"""
+        if not queue.pending:
+            return None, False
+        
+        active = queue.active_model
+        others = [model for model in queue.pending if model != active]
+        
+        if active in queue.pending:
+            waits = [time.monotonic() - queue.oldest(model) for model in others]
+            if external_wait is not None:
+                waits.append(external_wait)
+            if not waits:
+                return active, False
+            
+            max_wait = getattr(settings, 'MODEL_AFFINITY_MAX_WAIT', 30.0)
+            starving = max(waits) >= max_wait
+            if queue.batch_served < getattr(settings, 'MODEL_AFFINITY_BATCH_LIMIT', 8) and not starving:
+                return active, False
+        
+        # Swap only after the resident model's in-flight requests have drained
+        if queue.in_flight:
+            return None, False
+        
+        # Another process has waited longer than any local request: hand the endpoint over
+        if external_wait is not None and (
+            not others or external_wait >= time.monotonic() - min(queue.oldest(model) for model in others)
+        ):
+            return None, True
+        return (min(others, key=queue.oldest) if others else active), False
+    
+    def _external_wait(self, queue: EndpointQueue) -> Optional[float]:
+        """How long another process has been waiting for the endpoint we hold, if it is"""
+        if not queue.holds_lease:
+            return None
+        since = cache.get(WAITING_KEY.format(endpoint=queue.endpoint))
+        return None if since is None else max(time.time() - since, 0.0)
+    
+    def _acquire(self, queue: EndpointQueue, longest_wait: float) -> bool:
+        """Hold (or renew) the endpoint lease; otherwise mark this process as waiting for it"""
+        lease_key = LEASE_KEY.format(endpoint=queue.endpoint)
+        waiting_key = WAITING_KEY.format(endpoint=queue.endpoint)
+        ttl = getattr(settings, 'MODEL_AFFINITY_LEASE_TTL', 330)
+        
+        if queue.holds_lease:
+            if cache.get(lease_key) == self.owner:
+                cache.touch(lease_key, ttl)
+                return True
+            # The lease expired under a long call and another process has it now
+            queue.holds_lease = False
+        
+        # Leave a just-released endpoint to the process it was handed to
+        handover = 2 * getattr(settings, 'MODEL_AFFINITY_LEASE_POLL', 0.5)
+        if time.monotonic() - queue.yielded_at >= handover and cache.add(lease_key, self.owner, ttl):
+            queue.holds_lease = True
+            cache.delete(waiting_key)
+            # Whatever the previous holder left loaded is resident now
+            resident = cache.get(RESIDENT_KEY.format(endpoint=queue.endpoint))
+            with self._lock:
+                queue.active_model = resident
+                queue.batch_served = 0
+            return True
+        
+        waiting_ttl = 4 * getattr(settings, 'MODEL_AFFINITY_LEASE_POLL', 0.5) + 1
+        if not cache.add(waiting_key, time.time() - longest_wait, waiting_ttl):
+            cache.touch(waiting_key, waiting_ttl)
+        return False
+    
+    def _release(self, queue: EndpointQueue):
+        if not queue.holds_lease:
+            return
+        lease_key = LEASE_KEY.format(endpoint=queue.endpoint)
+        # Not atomic; at worst a lease that just expired and was re-taken is dropped early
+        if cache.get(lease_key) == self.owner:
+            cache.delete(lease_key)
+        queue.holds_lease = False
+    
+    def _record_grant(self, endpoint: str, model: str, wait: float, swapped: bool, loaded: bool):
+        """Count a grant in the endpoint's shared counters"""
+        if loaded:
+            cache.set(RESIDENT_KEY.format(endpoint=endpoint), model, None)
+        _increment(COUNTER_KEY.format(counter='served', endpoint=endpoint, model=model), 1)
+        _increment(COUNTER_KEY.format(counter='wait_ms', endpoint=endpoint, model=model), round(wait * 1000))
+        if swapped:
+            _increment(COUNTER_KEY.format(counter='swaps', endpoint=endpoint, model=model), 1)
+        
+        # The model list only grows; one dropped by a concurrent first grant is added back on the next
+        models_key = MODELS_KEY.format(endpoint=endpoint)
+        models = cache.get(models_key) or []
+        if model not in models:
+            cache.set(models_key, models + [model], None)
+    
+    def _read_shared(self, endpoints: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resident model, lease holder and per-model counters of each endpoint"""
+        shared = {}
+        for endpoint in endpoints:
+            models = cache.get(MODELS_KEY.format(endpoint=endpoint)) or []
+            keys = {
+                (model, counter): COUNTER_KEY.format(counter=counter, endpoint=endpoint, model=model)
+                for model in models for counter in COUNTERS
+            }
+            values = cache.get_many(keys.values())
+            shared[endpoint] = {
+                'resident_model': cache.get(RESIDENT_KEY.format(endpoint=endpoint)),
+                'lease_holder': cache.get(LEASE_KEY.format(endpoint=endpoint)),
+                'models': {
+                    model: {counter: values.get(keys[model, counter], 0) for counter in COUNTERS}
+                    for model in models
+                },
+            }
+        return shared
+    
+    def stats(self, endpoints: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Swap counts and average wait per endpoint and model (shared by all processes),
+        with this process's pending requests and queue age.
+        
+        ``endpoints`` adds endpoints this process has not sent requests to yet.
+        """
+        now = time.monotonic()
+        with self._lock:
+            local = {
+                endpoint: (
+                    {model: (len(waiting), waiting[0].enqueued_at) for model, waiting in queue.pending.items()},
+                    queue.in_flight
+                )
+                for endpoint, queue in self._endpoints.items()
+            }
+            executor = self._scheduler_thread()
+        
+        wanted = set(local) | {endpoint.rstrip('/') for endpoint in endpoints}
+        # Read on the scheduler thread, after the grants it has already decided were counted
+        shared = executor.submit(self._read_shared, wanted).result()
+        
+        result = {}
+        for endpoint in wanted:
+            pending, in_flight = local.get(endpoint, ({}, 0))
+            endpoint_shared = shared[endpoint]
+            models = {}
+            for model in set(pending) | set(endpoint_shared['models']):
+                waiting, enqueued_at = pending.get(model, (0, None))
+                counters = endpoint_shared['models'].get(model, dict.fromkeys(COUNTERS, 0))
+                served = counters['served']
+                models[model] = {
+                    'pending': waiting,
+                    'queue_age': round(now - enqueued_at, 3) if waiting else 0.0,
+                    'served': served,
+                    'swaps': counters['swaps'],
+                    'average_wait': round(counters['wait_ms'] / served / 1000, 3) if served else 0.0,
+                }
+            lease_holder = endpoint_shared['lease_holder']
+            result[endpoint] = {
+                'active_model': endpoint_shared['resident_model'],
+                'lease_holder': lease_holder,
+                'holds_lease': lease_holder == self.owner,
+                'in_flight': in_flight,
+                'total_swaps': sum(counters['swaps'] for counters in endpoint_shared['models'].values()),
+                'models': models,
+            }
+        return result
+
+
+model_scheduler = ModelAffinityScheduler()
@@ -202,6 +202,10 @@ class AgentExecutionLog(models.Model):
     
     class Meta:
         ordering = ['-execution_timestamp']
+        indexes = [
+            # Keyset pagination of one agent's logs
+            models.Index(fields=['agent_config', 'execution_timestamp', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.agent_config.name} - {self.status} ({self.execution_timestamp})"
@@ -252,6 +256,23 @@ class AgentPerformanceMetrics(models.Model):
         return f"{self.agent_config.name} Metrics"
 
 
+class AgentExecutionBucket(models.Model):
+    """Executions of an agent per hour; the sliding windows of AgentPerformanceMetrics are sums of these"""
+    
+    agent_config = models.ForeignKey(AgentConfiguration, on_delete=models.CASCADE, related_name='execution_buckets')
+    bucket_start = models.DateTimeField(help_text="Start of the hour")
+    executions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['agent_config', 'bucket_start'], name='unique_agent_execution_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.agent_config.name} - {self.executions} executions from {self.bucket_start}"
+
+
 class AgentConfigurationPreset(models.Model):
     """Predefined configuration presets for quick agent setup"""
     
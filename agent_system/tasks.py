@@ -0,0 +1,28 @@
+"""
+Celery Tasks for the Agent System
+"""
+
+import logging
+
+from celery import shared_task
+
+from .metrics import refresh_agent_metrics_snapshot
+from .telemetry import refresh_execution_windows
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_agent_metrics():
+    """Rebuild the cached agent metrics snapshot (beat, every AGENT_METRICS_SNAPSHOT_INTERVAL)"""
+    snapshot = refresh_agent_metrics_snapshot()
+    logger.debug(f"Refreshed agent metrics snapshot ({snapshot['summary']['total_reports']} reports)")
+    return snapshot['summary']
+
+
+@shared_task
+def refresh_agent_execution_windows():
+    """Slide the 24h/7d/30d execution counts of idle agents forward (beat, hourly)"""
+    refreshed = refresh_execution_windows()
+    logger.debug(f"Refreshed execution windows of {refreshed} agents")
+    return refreshed
@@ -0,0 +1,312 @@
+"""
+Agent Execution Telemetry
+
+Agent runs are recorded in ``AgentExecutionLog`` and rolled into
+``AgentPerformanceMetrics`` without adding writes to every agent task:
+
+- ``record_execution`` appends to an in-process buffer; the buffer is flushed
+  once it holds ``AGENT_TELEMETRY_BATCH_SIZE`` records or
+  ``AGENT_TELEMETRY_FLUSH_INTERVAL`` seconds after the previous flush (checked on
+  every record and after every Celery task), and when the worker process exits.
+- A flush writes the logs with one ``bulk_create`` and updates each agent's
+  metrics row with one ``UPDATE``: counters and cost as ``F()`` increments and
+  averages as exponentially weighted moving averages (``AGENT_TELEMETRY_EWMA_ALPHA``)
+  folded into the stored value, so concurrent workers never overwrite each other.
+- Executions are also counted per agent and hour in ``AgentExecutionBucket``. The
+  24h/7d/30d counts are sums over at most 720 buckets, refreshed after each flush
+  and hourly from beat so they keep sliding while an agent is idle.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from celery.signals import task_postrun, worker_process_shutdown
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Round
+from django.utils import timezone
+
+from .models import AgentConfiguration, AgentExecutionBucket, AgentExecutionLog, AgentPerformanceMetrics
+
+logger = logging.getLogger(__name__)
+
+# Analysis agent types whose AgentConfiguration is registered under another name
+CONFIG_AGENT_TYPES = {
+    'FINANCIAL': 'FINANCIAL_ANALYST',
+    'TECH_LEAD': 'TECHNICAL_LEAD',
+    'MARKETING': 'MARKETING_STRATEGIST',
+}
+
+# Sliding windows of AgentPerformanceMetrics, in hourly buckets
+EXECUTION_WINDOWS = {
+    'executions_last_24h': 24,
+    'executions_last_7d': 24 * 7,
+    'executions_last_30d': 24 * 30,
+}
+
+# Logged response content is cut to this length; the full report is on AgentReport
+LOGGED_CONTENT_CHARS = 2000
+
+
+@dataclass
+class ExecutionRecord:
+    """Outcome of one agent run, as buffered until the next flush"""
+    agent_type: str
+    business_idea_id: str
+    status: str  # AgentExecutionLog status: success, failure, timeout or error
+    execution_time: float
+    token_usage: int = 0
+    cost: float = 0.0
+    confidence: float = 0.0
+    response_content: str = ''
+    structured_data: Dict[str, Any] = field(default_factory=dict)
+    model_used: str = ''
+    error_message: str = ''
+    error_type: str = ''
+    executed_at: datetime = field(default_factory=timezone.now)
+    
+    @classmethod
+    def from_response(cls, agent_type: str, business_idea_id: str, response, cost: float = 0.0) -> 'ExecutionRecord':
+        """Record of a finished ``AgentResponse``"""
+        return cls(
+            agent_type=agent_type,
+            business_idea_id=business_idea_id,
+            status='success' if response.success else 'failure',
+            execution_time=response.execution_time,
+            token_usage=response.token_usage or 0,
+            cost=float(cost or 0),
+            confidence=response.confidence or 0.0,
+            response_content=(response.content or '')[:LOGGED_CONTENT_CHARS],
+            structured_data=response.structured_data or {},
+            model_used=response.model_used or '',
+            error_message=response.error_message or '',
+        )
+
+
+class ExecutionTelemetrySink:
+    """In-process buffer of execution records, written in batches"""
+    
+    def __init__(self):
+        self.buffer: List[ExecutionRecord] = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+    
+    def record(self, record: ExecutionRecord):
+        with self.lock:
+            self.buffer.append(record)
+        self.flush_if_due()
+    
+    def flush_if_due(self) -> int:
+        if not self.buffer:
+            return 0
+        batch_size = getattr(settings, 'AGENT_TELEMETRY_BATCH_SIZE', 50)
+        interval = getattr(settings, 'AGENT_TELEMETRY_FLUSH_INTERVAL', 10)
+        if len(self.buffer) >= batch_size or time.monotonic() - self.last_flush >= interval:
+            return self.flush()
+        return 0
+    
+    def flush(self) -> int:
+        """Write all buffered records; returns how many were taken from the buffer"""
+        with self.lock:
+            records, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+        if not records:
+            return 0
+        
+        try:
+            write_execution_records(records)
+        except Exception as e:
+            # Telemetry must never fail an agent task; the records are lost
+            logger.error(f"Dropped {len(records)} agent execution records: {str(e)}")
+        return len(records)
+
+
+telemetry_sink = ExecutionTelemetrySink()
+
+
+def record_execution(record: ExecutionRecord):
+    """Buffer the record of an agent run (no-op unless AGENT_TELEMETRY_ENABLED)"""
+    if getattr(settings, 'AGENT_TELEMETRY_ENABLED', True):
+        telemetry_sink.record(record)
+
+
+@task_postrun.connect
+def flush_telemetry_after_task(**kwargs):
+    if getattr(settings, 'AGENT_TELEMETRY_ENABLED', True):
+        telemetry_sink.flush_if_due()
+
+
+@worker_process_shutdown.connect
+def flush_telemetry_on_shutdown(**kwargs):
+    telemetry_sink.flush()
+
+
+def write_execution_records(records: List[ExecutionRecord]):
+    """Write a batch of records: logs, metric increments, hourly buckets and windows"""
+    config_types = {CONFIG_AGENT_TYPES.get(record.agent_type, record.agent_type) for record in records}
+    configs = {
+        config.agent_type: config
+        for config in AgentConfiguration.objects.select_related('llm_provider').filter(agent_type__in=config_types)
+    }
+    
+    logs = []
+    by_config = defaultdict(list)
+    for record in records:
+        config = configs.get(CONFIG_AGENT_TYPES.get(record.agent_type, record.agent_type))
+        if config is None:
+            # Agents without a configuration (e.g. triage) have nowhere to log to
+            continue
+        by_config[config.id].append(record)
+        logs.append(AgentExecutionLog(
+            agent_config=config,
+            business_idea_id=record.business_idea_id,
+            status=record.status,
+            execution_time_seconds=record.execution_time,
+            token_usage=record.token_usage,
+            estimated_cost=Decimal(str(record.cost)).quantize(Decimal('0.000001')),
+            prompt_used='',
+            response_content=record.response_content,
+            structured_data=record.structured_data,
+            confidence_score=record.confidence,
+            error_message=record.error_message,
+            error_type=record.error_type,
+            model_used=record.model_used or config.model_name,
+            llm_provider_name=config.llm_provider.name,
+        ))
+    if not logs:
+        return
+    
+    with transaction.atomic():
+        AgentExecutionLog.objects.bulk_create(logs)
+        AgentPerformanceMetrics.objects.bulk_create(
+            [AgentPerformanceMetrics(agent_config_id=config_id) for config_id in by_config],
+            ignore_conflicts=True
+        )
+        for config_id, config_records in by_config.items():
+            _update_metrics(config_id, config_records)
+            _count_in_buckets(config_id, config_records)
+        refresh_execution_windows(by_config)
+    
+    logger.debug(f"Flushed {len(logs)} agent execution records")
+
+
+def _ewma(field_name: str, samples: List[float], count_field: str):
+    """
+    Stored EWMA of ``field_name`` after ``samples``, as an expression over the stored value.
+    
+    Folding n samples into average A gives (1 - a)^n * A + sum(a * (1 - a)^(n - i) * x_i),
+    so the update stays a single atomic statement. An average without samples yet
+    (``count_field`` is 0) is seeded with the first sample.
+    """
+    alpha = getattr(settings, 'AGENT_TELEMETRY_EWMA_ALPHA', 0.1)
+    contribution = 0.0
+    for sample in samples:
+        contribution = contribution * (1 - alpha) + alpha * sample
+    seeded = samples[0]
+    for sample in samples[1:]:
+        seeded += alpha * (sample - seeded)
+    
+    return Case(
+        When(**{count_field: 0}, then=Value(seeded)),
+        default=F(field_name) * (1 - alpha) ** len(samples) + contribution,
+        output_field=FloatField()
+    )
+
+
+def _latest(field_name: str, value: datetime):
+    return Greatest(Coalesce(F(field_name), Value(value)), Value(value))
+
+
+def _update_metrics(config_id: int, records: List[ExecutionRecord]):
+    successes = [record for record in records if record.status == 'success']
+    failures = [record for record in records if record.status != 'success']
+    
+    values = {
+        'total_executions': F('total_executions') + len(records),
+        'successful_executions': F('successful_executions') + len(successes),
+        'failed_executions': F('failed_executions') + len(failures),
+        'total_cost': F('total_cost') + Decimal(str(sum(record.cost for record in records))),
+        'average_execution_time': _ewma(
+            'average_execution_time', [record.execution_time for record in records], 'total_executions'
+        ),
+        'last_execution_at': _latest('last_execution_at', max(record.executed_at for record in records)),
+        'updated_at': timezone.now(),
+    }
+    if successes:
+        values.update({
+            'average_token_usage': Cast(Round(_ewma(
+                'average_token_usage', [record.token_usage for record in successes], 'successful_executions'
+            )), IntegerField()),
+            'average_confidence_score': _ewma(
+                'average_confidence_score', [record.confidence for record in successes], 'successful_executions'
+            ),
+            'last_successful_execution_at': _latest(
+                'last_successful_execution_at', max(record.executed_at for record in successes)
+            ),
+        })
+    if failures:
+        values['last_failure_at'] = _latest('last_failure_at', max(record.executed_at for record in failures))
+    
+    AgentPerformanceMetrics.objects.filter(agent_config_id=config_id).update(**values)
+
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _count_in_buckets(config_id: int, records: List[ExecutionRecord]):
+    counts = defaultdict(int)
+    for record in records:
+        counts[_hour(record.executed_at)] += 1
+    
+    for bucket_start, executions in counts.items():
+        bucket = AgentExecutionBucket.objects.filter(agent_config_id=config_id, bucket_start=bucket_start)
+        if bucket.update(executions=F('executions') + executions):
+            continue
+        try:
+            with transaction.atomic():
+                AgentExecutionBucket.objects.create(
+                    agent_config_id=config_id, bucket_start=bucket_start, executions=executions
+                )
+        except IntegrityError:
+            # Another worker opened the bucket first
+            bucket.update(executions=F('executions') + executions)
+
+
+def refresh_execution_windows(config_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None) -> int:
+    """
+    Recompute the 24h/7d/30d execution counts from the hourly buckets.
+    
+    Without ``config_ids`` every agent is refreshed, agents without recent buckets
+    are reset to zero and buckets older than the longest window are dropped.
+    """
+    current_hour = _hour(now or timezone.now())
+    oldest = current_hour - timedelta(hours=max(EXECUTION_WINDOWS.values()))
+    
+    buckets = AgentExecutionBucket.objects.filter(bucket_start__gt=oldest)
+    if config_ids is not None:
+        buckets = buckets.filter(agent_config_id__in=list(config_ids))
+    rows = buckets.order_by().values('agent_config').annotate(**{
+        window: Coalesce(Sum('executions', filter=Q(bucket_start__gt=current_hour - timedelta(hours=hours))), 0)
+        for window, hours in EXECUTION_WINDOWS.items()
+    })
+    
+    refreshed = []
+    for row in rows:
+        config_id = row.pop('agent_config')
+        AgentPerformanceMetrics.objects.filter(agent_config_id=config_id).update(**row)
+        refreshed.append(config_id)
+    
+    if config_ids is None:
+        AgentPerformanceMetrics.objects.exclude(agent_config_id__in=refreshed).filter(
+            executions_last_30d__gt=0
+        ).update(**{window: 0 for window in EXECUTION_WINDOWS})
+        AgentExecutionBucket.objects.filter(bucket_start__lte=oldest).delete()
+    return len(refreshed)
@@ -0,0 +1,382 @@
+"""
+Tests for the Agent System
+"""
+
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from agent_system.base_agents import AnalysisContext, BaseAIAgent
+from agent_system.metrics import refresh_agent_metrics_snapshot
+from agent_system.models import AgentConfiguration, AgentExecutionBucket, AgentExecutionLog, LLMProvider
+from agent_system.llm_service import LLMResponse
+from agent_system.model_scheduler import ModelAffinityScheduler, model_scheduler
+from agent_system.telemetry import ExecutionRecord, ExecutionTelemetrySink, refresh_execution_windows
+from agent_system.views import agent_metrics_view
+from analysis_engine.models import AgentReport, BusinessIdea
+from analysis_engine.rollups import rebuild_rollups
+
+
+@override_settings(MODEL_AFFINITY_BATCH_LIMIT=3, MODEL_AFFINITY_MAX_WAIT=60, MODEL_AFFINITY_ENDPOINT_CONCURRENCY=1)
+class ModelAffinitySchedulerTests(SimpleTestCase):
+    """Batching of interleaved local model requests"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def run_requests(self, scheduler, models):
+        order = []
+        
+        async def request(model):
+            async with scheduler.slot('http://localhost:1234/', model):
+                order.append(model)
+                await asyncio.sleep(0)
+        
+        async def run_all():
+            await asyncio.gather(*(request(model) for model in models))
+        
+        asyncio.run(run_all())
+        return order
+    
+    def test_interleaved_requests_are_batched_per_model(self):
+        scheduler = ModelAffinityScheduler()
+        
+        order = self.run_requests(scheduler, ['llama', 'mistral'] * 4)
+        
+        # The first request loads llama; the batch cap of 3 then alternates fairly
+        self.assertEqual(order, ['llama'] * 3 + ['mistral'] * 3 + ['llama', 'mistral'])
+        stats = scheduler.stats()['http://localhost:1234']
+        self.assertEqual(stats['total_swaps'], 3)
+        self.assertEqual(stats['models']['mistral']['served'], 4)
+        self.assertEqual(stats['models']['mistral']['pending'], 0)
+    
+    @override_settings(MODEL_AFFINITY_MAX_WAIT=0)
+    def test_starving_model_is_scheduled_before_batch_cap(self):
+        scheduler = ModelAffinityScheduler()
+        
+        order = self.run_requests(scheduler, ['llama', 'mistral', 'llama', 'mistral'])
+        
+        self.assertEqual(order, ['llama', 'mistral', 'llama', 'mistral'])
+    
+    def test_cache_io_stays_off_the_event_loop(self):
+        scheduler = ModelAffinityScheduler()
+        threads = set()
+        
+        def record_add(*args, **kwargs):
+            threads.add(threading.current_thread())
+            return cache.add(*args, **kwargs)
+        
+        shared = mock.Mock(wraps=cache)
+        shared.add.side_effect = record_add
+        with mock.patch('agent_system.model_scheduler.cache', shared):
+            self.run_requests(scheduler, ['llama', 'mistral'])
+        
+        # The lease and the counters are written on the scheduler thread only
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads.pop(), threading.main_thread())
+        self.assertEqual(scheduler.stats()['http://localhost:1234']['models']['llama']['served'], 1)
+    
+    def run_in_two_processes(self, requests):
+        """Runs ``(scheduler, model)`` requests; the first holds its slot briefly"""
+        order = []
+        
+        async def request(scheduler, model, hold=0.0):
+            async with scheduler.slot('http://localhost:1234/', model):
+                order.append(model)
+                await asyncio.sleep(hold)
+        
+        async def run_all():
+            first = asyncio.ensure_future(request(*requests[0], hold=0.05))
+            await asyncio.sleep(0)
+            await asyncio.gather(first, *(request(*item) for item in requests[1:]))
+        
+        asyncio.run(run_all())
+        return order
+    
+    @override_settings(MODEL_AFFINITY_LEASE_POLL=0.01)
+    def test_processes_share_the_endpoint_through_its_lease(self):
+        # Separate scheduler instances stand in for separate worker processes
+        web, worker = ModelAffinityScheduler(), ModelAffinityScheduler()
+        
+        order = self.run_in_two_processes([(web, 'llama'), (worker, 'mistral'), (web, 'llama')])
+        
+        # The worker's request waits for the holder's batch instead of forcing a swap
+        self.assertEqual(order, ['llama', 'llama', 'mistral'])
+        # The worker served last, so its stats read waits for it to give the lease back
+        for scheduler in [worker, web]:
+            stats = scheduler.stats()['http://localhost:1234']
+            self.assertEqual(stats['active_model'], 'mistral')
+            self.assertEqual(stats['total_swaps'], 1)
+            self.assertEqual(stats['models']['llama']['served'], 2)
+            self.assertIsNone(stats['lease_holder'])
+    
+    @override_settings(MODEL_AFFINITY_LEASE_POLL=0.01, MODEL_AFFINITY_MAX_WAIT=0)
+    def test_waiting_process_gets_the_endpoint_when_starving(self):
+        web, worker = ModelAffinityScheduler(), ModelAffinityScheduler()
+        
+        order = self.run_in_two_processes([(web, 'llama'), (worker, 'mistral'), (web, 'llama'), (web, 'llama')])
+        
+        self.assertEqual(order, ['llama', 'mistral', 'llama', 'llama'])
+    
+    def test_agent_local_models_go_through_the_scheduler(self):
+        agent = SlowStreamingAgent('Local Agent', model_preference='lmstudio/llama')
+        generate = mock.AsyncMock(return_value=LLMResponse('{"score": 55}', 42, 'llama', 0.1))
+        
+        with mock.patch('agent_system.llm_service.LMStudioProvider.generate', generate):
+            content, token_usage = asyncio.run(BaseAIAgent._call_llm(agent, 'system', 'user'))
+        
+        self.assertEqual((content, token_usage), ('{"score": 55}', 42))
+        self.assertEqual(generate.call_args.kwargs['model'], 'llama')
+        stats = model_scheduler.stats()['http://localhost:1234']
+        self.assertEqual(stats['models']['llama']['served'], 1)
+
+
+class SlowStreamingAgent(BaseAIAgent):
+    """Agent whose model streams a few tokens and then stalls"""
+    
+    def get_system_prompt(self):
+        return 'You are a test agent.'
+    
+    def get_analysis_prompt(self, context):
+        return f'Analyse {context.title}'
+    
+    def parse_response(self, raw_response):
+        return {'score': 40} if raw_response else {}
+    
+    async def _call_llm(self, system_prompt, user_prompt):
+        for token in ['{"score": ', '40, ', '"summary": "Promising']:
+            self.partial_output.append(token)
+            await asyncio.sleep(0)
+        await asyncio.sleep(30)
+        return ''.join(self.partial_output), 100
+
+
+@override_settings(AGENT_OUTPUT_TOKENS_PER_SECOND=10, AGENT_MIN_OUTPUT_TOKENS=50)
+class AgentDeadlineTests(SimpleTestCase):
+    """Deadline-bounded agent calls"""
+    
+    def setUp(self):
+        self.context = AnalysisContext(
+            business_idea_id='idea-1',
+            title='Bike repair van',
+            description='Mobile bicycle repairs',
+            industry='Services',
+            target_market='Commuters',
+            estimated_budget=None,
+            additional_data={}
+        )
+    
+    def test_deadline_returns_partial_output(self):
+        agent = SlowStreamingAgent('Slow Agent', model_preference='local-model')
+        agent.deadline = time.monotonic() + 0.05
+        
+        result = asyncio.run(agent.analyze(self.context))
+        
+        self.assertTrue(result.success)
+        self.assertTrue(result.partial)
+        self.assertEqual(result.content, '{"score": 40, "summary": "Promising')
+        self.assertEqual(result.structured_data, {'score': 40})
+    
+    def test_output_budget_follows_remaining_time(self):
+        agent = SlowStreamingAgent('Slow Agent', model_preference='local-model')
+        self.assertEqual(agent.output_token_budget(), 4000)
+        
+        agent.deadline = time.monotonic() + 60
+        self.assertLessEqual(agent.output_token_budget(), 600)
+        agent.deadline = time.monotonic()
+        self.assertEqual(agent.output_token_budget(), 50)
+
+
+class StreamedChunks:
+    """Async iterator over canned chat completion chunks"""
+    
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def chat_chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class OpenAIUsageTests(SimpleTestCase):
+    """Token usage of streamed OpenAI calls"""
+    
+    def call(self, chunks):
+        agent = SlowStreamingAgent('Usage Agent', model_preference='gpt-4')
+        client = mock.Mock()
+        client.chat.completions.create = mock.AsyncMock(return_value=StreamedChunks(chunks))
+        with mock.patch('agent_system.base_agents.openai.AsyncOpenAI', return_value=client):
+            result = asyncio.run(agent._call_openai('system ' * 20, 'user ' * 20))
+        return result, client.chat.completions.create.call_args.kwargs
+    
+    def test_reported_usage_is_used(self):
+        (content, token_usage), kwargs = self.call([
+            chat_chunk('{"score": '), chat_chunk('70}'), chat_chunk(usage={'total_tokens': 321}),
+        ])
+        self.assertEqual(content, '{"score": 70}')
+        self.assertEqual(token_usage, 321)
+        self.assertEqual(kwargs['extra_body'], {'stream_options': {'include_usage': True}})
+    
+    def test_usage_is_estimated_when_not_reported(self):
+        (content, token_usage), _ = self.call([chat_chunk('{"score": 70}')])
+        self.assertEqual(token_usage, (len('system ' * 20 + 'user ' * 20) + len(content)) // 4)
+
+
+class AgentMetricsTests(TestCase):
+    """Grouped agent metrics and the cached snapshot"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('analyst', password='secret')
+        for index, (status, seconds) in enumerate([('COMPLETED', 10), ('COMPLETED', 20), ('FAILED', None)]):
+            business_idea = BusinessIdea.objects.create(title=f'Idea {index}', description='Metrics fixture')
+            AgentReport.objects.create(
+                business_idea=business_idea,
+                agent_type='FINANCIAL',
+                status=status,
+                agent_score=60 + index * 10 if status == 'COMPLETED' else None,
+                execution_time=timedelta(seconds=seconds) if seconds else None
+            )
+        rebuild_rollups()
+    
+    def get_metrics(self):
+        request = APIRequestFactory().get('/agents/metrics/')
+        force_authenticate(request, user=self.user)
+        return agent_metrics_view(request).data
+    
+    def test_metrics_come_from_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            data = self.get_metrics()
+        
+        financial = data['agent_metrics']['FINANCIAL']
+        self.assertEqual(financial['performance']['total_reports'], 3)
+        self.assertEqual(financial['performance']['failed_reports'], 1)
+        self.assertEqual(financial['quality_metrics']['average_score'], 65.0)
+        self.assertEqual(financial['efficiency_metrics']['average_execution_time'], 15.0)
+        self.assertEqual(data['agent_metrics']['CEO']['performance']['total_reports'], 0)
+        self.assertEqual(data['summary']['successful_reports'], 2)
+    
+    @override_settings(AGENT_METRICS_SNAPSHOT_ENABLED=True)
+    def test_snapshot_is_served_without_queries(self):
+        refresh_agent_metrics_snapshot()
+        
+        with self.assertNumQueries(0):
+            data = self.get_metrics()
+        self.assertEqual(data['summary']['total_reports'], 3)
+    
+    def test_status_page_cost_is_independent_of_configurations(self):
+        provider = LLMProvider.objects.create(
+            name='OpenAI', provider_type='openai', api_endpoint='https://api.openai.com/v1'
+        )
+        for agent_type in ['FINANCIAL', 'MARKETING', 'TECH_LEAD']:
+            AgentConfiguration.objects.create(
+                agent_type=agent_type, name=agent_type.title(), description='Fixture',
+                llm_provider=provider, model_name='gpt-4'
+            )
+        self.client.force_login(self.user)
+        
+        # Session, user, configurations with their provider, one grouped report query
+        with self.assertNumQueries(4):
+            data = self.client.get('/agents/status/', HTTP_ACCEPT='application/json').json()
+        self.assertEqual(data['agent_metrics']['FINANCIAL']['total_reports'], 3)
+        self.assertEqual(data['agent_metrics']['FINANCIAL']['completed_reports'], 2)
+        self.assertEqual(data['agent_metrics']['MARKETING']['total_reports'], 0)
+        
+        # Further refreshes reuse the cached report stats
+        with self.assertNumQueries(3):
+            self.client.get('/agents/status/', HTTP_ACCEPT='application/json')
+
+
+@override_settings(AGENT_TELEMETRY_BATCH_SIZE=3, AGENT_TELEMETRY_FLUSH_INTERVAL=3600, AGENT_TELEMETRY_EWMA_ALPHA=0.5)
+class ExecutionTelemetryTests(TestCase):
+    """Batched execution logs, incremental metrics and bucketed windows"""
+    
+    def setUp(self):
+        provider = LLMProvider.objects.create(
+            name='OpenAI', provider_type='openai', api_endpoint='https://api.openai.com/v1'
+        )
+        self.config = AgentConfiguration.objects.create(
+            agent_type='FINANCIAL_ANALYST', name='Financial Analyst', description='Fixture',
+            llm_provider=provider, model_name='gpt-4'
+        )
+        self.sink = ExecutionTelemetrySink()
+    
+    def record(self, status='success', seconds=10.0, tokens=1000, confidence=80.0, executed_at=None):
+        self.sink.record(ExecutionRecord(
+            agent_type='FINANCIAL',
+            business_idea_id='idea',
+            status=status,
+            execution_time=seconds,
+            token_usage=tokens,
+            cost=0.01,
+            confidence=confidence,
+            executed_at=executed_at or timezone.now()
+        ))
+    
+    def test_records_are_written_once_the_batch_is_full(self):
+        self.record(seconds=10.0)
+        self.record(seconds=20.0)
+        self.assertFalse(AgentExecutionLog.objects.exists())
+        
+        self.record(status='error', seconds=40.0, tokens=0, confidence=0.0)
+        self.assertEqual(AgentExecutionLog.objects.filter(agent_config=self.config).count(), 3)
+        self.assertEqual(self.sink.buffer, [])
+        
+        metrics = self.config.performance_metrics
+        self.assertEqual(metrics.total_executions, 3)
+        self.assertEqual(metrics.successful_executions, 2)
+        self.assertEqual(metrics.failed_executions, 1)
+        self.assertEqual(float(metrics.total_cost), 0.03)
+        # Seeded with the first run, then each run weighs half
+        self.assertAlmostEqual(metrics.average_execution_time, 27.5)
+        self.assertEqual(metrics.average_token_usage, 1000)
+        self.assertEqual(metrics.executions_last_24h, 3)
+        self.assertIsNotNone(metrics.last_failure_at)
+    
+    def test_averages_fold_into_the_stored_value(self):
+        for seconds in [10.0, 10.0, 10.0]:
+            self.record(seconds=seconds)
+        self.record(seconds=30.0)
+        self.sink.flush()
+        
+        metrics = self.config.performance_metrics
+        metrics.refresh_from_db()
+        self.assertEqual(metrics.total_executions, 4)
+        self.assertAlmostEqual(metrics.average_execution_time, 20.0)
+        self.assertEqual(AgentExecutionBucket.objects.get().executions, 4)
+    
+    def test_windows_slide_with_the_buckets(self):
+        now = timezone.now()
+        self.record(executed_at=now - timedelta(days=3))
+        self.record(executed_at=now - timedelta(days=20))
+        self.record(executed_at=now - timedelta(days=40))
+        
+        metrics = self.config.performance_metrics
+        self.assertEqual(metrics.executions_last_24h, 0)
+        self.assertEqual(metrics.executions_last_7d, 1)
+        self.assertEqual(metrics.executions_last_30d, 2)
+        
+        refresh_execution_windows(now=now + timedelta(days=15))
+        metrics.refresh_from_db()
+        self.assertEqual(metrics.executions_last_7d, 0)
+        self.assertEqual(metrics.executions_last_30d, 1)
+        self.assertEqual(AgentExecutionBucket.objects.count(), 1)
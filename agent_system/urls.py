@@ -19,6 +19,7 @@ urlpatterns = [
     path('agent/<str:agent_type>/', views.agent_detail_view, name='agent_detail'),
     path('communication/', views.communication_hub_view, name='communication_hub'),
     path('metrics/', views.agent_metrics_view, name='agent_metrics'),
+    path('scheduler/', views.model_scheduler_view, name='model_scheduler'),
     
     # API Endpoints
     path('api/available-agents/', views.api_available_agents, name='api_available_agents'),
@@ -4,6 +4,7 @@ Enhanced Views for the Agent System
 Provides monitoring, management, and configuration interfaces for AI agents.
 """
 
+from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -23,7 +24,9 @@ from .models import (
     AgentConfiguration, LLMProvider, AgentPromptTemplate, 
     AgentExecutionLog, AgentPerformanceMetrics, AgentConfigurationPreset
 )
-from .llm_service import llm_manager, initialize_llm_providers
+from .llm_service import get_local_endpoints, llm_manager, initialize_llm_providers
+from .model_scheduler import model_scheduler
+from .metrics import get_agent_metrics, get_report_stats
 from analysis_engine.models import AgentReport
 
 
@@ -43,43 +46,29 @@ def agent_status_view(request):
     # Get agent configurations from database
     agent_configs = AgentConfiguration.objects.filter(status='active').select_related('llm_provider')
     
-    # Get performance metrics from database
+    # Report stats of all agent types come from one grouped query, cached briefly
+    # for the auto-refreshing page
+    report_stats = get_report_stats()
+    
     agent_metrics = {}
     for config in agent_configs:
-        reports = AgentReport.objects.filter(agent_type=config.agent_type)
-        completed_reports = reports.filter(status='COMPLETED')
+        stats = report_stats.get(config.agent_type, {})
+        total = stats.get('total', 0)
+        completed = stats.get('successful', 0)
+        average_execution_time = stats.get('average_execution_time')
         
-        if completed_reports.exists():
-            agent_metrics[config.agent_type] = {
-                'name': config.name,
-                'total_reports': reports.count(),
-                'completed_reports': completed_reports.count(),
-                'success_rate': (completed_reports.count() / reports.count()) * 100,
-                'average_score': completed_reports.aggregate(avg=Avg('agent_score'))['avg'],
-                'average_execution_time': completed_reports.aggregate(
-                    avg=Avg('execution_time')
-                )['avg'].total_seconds() if completed_reports.aggregate(
-                    avg=Avg('execution_time')
-                )['avg'] else 0,
-                'llm_provider': config.llm_provider.name,
-                'model_name': config.model_name,
-                'status': config.status,
-                'last_updated': config.updated_at,
-            }
-        else:
-            # No reports yet, show basic config info
-            agent_metrics[config.agent_type] = {
-                'name': config.name,
-                'total_reports': 0,
-                'completed_reports': 0,
-                'success_rate': 0,
-                'average_score': None,
-                'average_execution_time': 0,
-                'llm_provider': config.llm_provider.name,
-                'model_name': config.model_name,
-                'status': config.status,
-                'last_updated': config.updated_at,
-            }
+        agent_metrics[config.agent_type] = {
+            'name': config.name,
+            'total_reports': total,
+            'completed_reports': completed,
+            'success_rate': (completed / total) * 100 if total else 0,
+            'average_score': stats.get('average_score'),
+            'average_execution_time': average_execution_time.total_seconds() if average_execution_time else 0,
+            'llm_provider': config.llm_provider.name,
+            'model_name': config.model_name,
+            'status': config.status,
+            'last_updated': config.updated_at,
+        }
     
     context = {
         'hub_status': hub_status,
@@ -89,7 +78,7 @@ def agent_status_view(request):
     }
     
     if request.headers.get('Accept') == 'application/json':
-        return JsonResponse(context)
+        return JsonResponse({key: value for key, value in context.items() if key != 'agent_configs'})
     
     return render(request, 'agent_system/status.html', context)
 
@@ -343,65 +332,24 @@ def prompt_template_edit_view(request, template_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def agent_metrics_view(request):
-    """API view to get detailed agent performance metrics"""
-    
-    metrics = {}
-    
-    # Get metrics for each agent type
-    for agent_type, agent_name in AgentReport.AGENT_TYPES:
-        reports = AgentReport.objects.filter(agent_type=agent_type)
-        completed_reports = reports.filter(status='COMPLETED')
-        failed_reports = reports.filter(status='FAILED')
-        
-        # Calculate detailed metrics
-        total_reports = reports.count()
-        success_count = completed_reports.count()
-        failure_count = failed_reports.count()
-        
-        success_rate = (success_count / total_reports * 100) if total_reports > 0 else 0
-        
-        # Average metrics for successful reports
-        avg_score = completed_reports.aggregate(avg=Avg('agent_score'))['avg']
-        avg_confidence = completed_reports.aggregate(avg=Avg('confidence'))['avg']
-        avg_tokens = completed_reports.aggregate(avg=Avg('token_usage'))['avg']
-        avg_cost = completed_reports.aggregate(avg=Avg('cost_estimate'))['avg']
-        
-        # Execution time statistics
-        execution_times = []
-        for report in completed_reports:
-            if report.execution_time:
-                execution_times.append(report.execution_time.total_seconds())
-        
-        avg_execution_time = sum(execution_times) / len(execution_times) if execution_times else 0
-        
-        metrics[agent_type] = {
-            'agent_name': agent_name,
-            'performance': {
-                'total_reports': total_reports,
-                'successful_reports': success_count,
-                'failed_reports': failure_count,
-                'success_rate': round(success_rate, 2),
-            },
-            'quality_metrics': {
-                'average_score': round(float(avg_score), 1) if avg_score else None,
-                'average_confidence': round(float(avg_confidence), 1) if avg_confidence else None,
-            },
-            'efficiency_metrics': {
-                'average_execution_time': round(avg_execution_time, 2),
-                'average_token_usage': int(avg_tokens) if avg_tokens else None,
-                'average_cost': round(float(avg_cost), 4) if avg_cost else None,
-            },
-            'status': 'active' if agent_type in [name.split('.')[-1] for name in communication_hub.agents.keys()] else 'inactive'
-        }
+    """
+    API view to get detailed agent performance metrics
+    
+    Computed by one grouped query (see ``agent_system.metrics``) or read from the
+    periodically refreshed snapshot; only the live agent status is added per request.
+    """
+    data = get_agent_metrics()
+    active_types = {name.split('.')[-1] for name in communication_hub.agents.keys()}
+    
+    metrics = {
+        agent_type: {**agent_metrics, 'status': 'active' if agent_type in active_types else 'inactive'}
+        for agent_type, agent_metrics in data['agent_metrics'].items()
+    }
     
     return Response({
         'agent_metrics': metrics,
-        'summary': {
-            'total_agents': len(AgentReport.AGENT_TYPES),
-            'active_agents': len(communication_hub.agents),
-            'total_reports': AgentReport.objects.count(),
-            'successful_reports': AgentReport.objects.filter(status='COMPLETED').count(),
-        }
+        'summary': {**data['summary'], 'active_agents': len(communication_hub.agents)},
+        'generated_at': data['generated_at'],
     })
 
 
@@ -492,6 +440,19 @@ def communication_hub_view(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def model_scheduler_view(request):
+    """API view to get model swap counts and queue age per local endpoint and model"""
+    
+    return Response({
+        'enabled': getattr(settings, 'MODEL_AFFINITY_ENABLED', True),
+        'batch_limit': getattr(settings, 'MODEL_AFFINITY_BATCH_LIMIT', 8),
+        'max_wait': getattr(settings, 'MODEL_AFFINITY_MAX_WAIT', 30.0),
+        'endpoints': model_scheduler.stats(get_local_endpoints()),
+    })
+
+
 @login_required
 @require_http_methods(["GET"])
 def agent_detail_view(request, agent_type):
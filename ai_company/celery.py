@@ -7,6 +7,7 @@ orchestration and business analysis processing.
 
 import os
 from celery import Celery
+from celery.schedules import crontab
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program.
@@ -23,6 +24,22 @@ app.autodiscover_tasks()
 
 # Celery beat schedule for periodic tasks (optional - can be removed if not needed)
 app.conf.beat_schedule = {
+    'dispatch-queued-analyses': {
+        'task': 'analysis_engine.tasks.dispatch_queued_analyses',
+        'schedule': getattr(settings, 'ANALYSIS_DISPATCH_INTERVAL', 30.0),
+    },
+    'reap-stuck-analyses': {
+        'task': 'analysis_engine.tasks.reap_stuck_analyses',
+        'schedule': getattr(settings, 'ANALYSIS_REAPER_INTERVAL', 60.0),
+    },
+    'reconcile-daily-rollups': {
+        'task': 'analysis_engine.tasks.reconcile_daily_rollups',
+        'schedule': crontab(hour=getattr(settings, 'ROLLUP_RECONCILE_HOUR', 3), minute=0),
+    },
+    'refresh-agent-execution-windows': {
+        'task': 'agent_system.tasks.refresh_agent_execution_windows',
+        'schedule': crontab(minute=0),
+    },
     # Uncomment these when you want periodic tasks
     # 'cleanup-failed-tasks': {
     #     'task': 'analysis_engine.tasks.cleanup_failed_tasks',
@@ -34,14 +51,26 @@ app.conf.beat_schedule = {
     # },
 }
 
+if getattr(settings, 'AGENT_METRICS_SNAPSHOT_ENABLED', False):
+    app.conf.beat_schedule['refresh-agent-metrics'] = {
+        'task': 'agent_system.tasks.refresh_agent_metrics',
+        'schedule': getattr(settings, 'AGENT_METRICS_SNAPSHOT_INTERVAL', 300),
+    }
+
 app.conf.timezone = 'UTC'
 
 # Task routing - send different types of tasks to different queues
 app.conf.task_routes = {
     'analysis_engine.tasks.orchestrate_business_analysis': {'queue': 'analysis'},
+    'analysis_engine.tasks.dispatch_queued_analyses': {'queue': 'analysis'},
+    'analysis_engine.tasks.reap_stuck_analyses': {'queue': 'analysis'},
     'analysis_engine.tasks.analyze_with_agent': {'queue': 'agents'},
     'analysis_engine.tasks.create_final_analysis_report': {'queue': 'reports'},
+    'analysis_engine.tasks.refresh_idea_rollups': {'queue': 'reports'},
+    'analysis_engine.tasks.refresh_daily_rollups': {'queue': 'reports'},
+    'analysis_engine.tasks.reconcile_daily_rollups': {'queue': 'reports'},
     'analysis_engine.tasks.generate_business_ideas': {'queue': 'generation'},
+    'agent_system.tasks.refresh_agent_execution_windows': {'queue': 'reports'},
 }
 
 # Task configuration
@@ -64,6 +93,16 @@ app.conf.update(
     task_default_exchange='default',
     task_default_routing_key='default',
     
+    # Message priority: fair-share tiers set it per analysis. Redis emulates it with
+    # one list per step and consumes lower numbers first; untagged tasks get the
+    # standard tier's priority.
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    task_default_priority=6,
+    
     # Worker configuration
     worker_prefetch_multiplier=1,  # Prevent workers from grabbing too many tasks
     worker_max_tasks_per_child=1000,  # Restart workers after 1000 tasks
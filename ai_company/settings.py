@@ -84,6 +84,25 @@ else:
 # Redis Configuration
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 
+# Cache Configuration - cancellation flags, locks and snapshots must be shared by the web
+# and every worker process, so deployments with separate workers set CACHE_BACKEND=redis.
+# The default locmem cache is per process and needs no server (local development, tests).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Celery Configuration
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -107,6 +126,189 @@ OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
 DEFAULT_LLM_MODEL = os.environ.get('DEFAULT_LLM_MODEL', 'gpt-4-turbo-preview')
 
+# Triage pre-screen: one short small-model call before the full agent fan-out.
+# Ideas scoring below the threshold get a lightweight report instead.
+TRIAGE_ENABLED = os.environ.get('TRIAGE_ENABLED', 'False').lower() == 'true'
+TRIAGE_MODEL = os.environ.get('TRIAGE_MODEL', 'gpt-3.5-turbo')
+TRIAGE_THRESHOLD = int(os.environ.get('TRIAGE_THRESHOLD', '30'))
+TRIAGE_MAX_TOKENS = int(os.environ.get('TRIAGE_MAX_TOKENS', '300'))
+
+# Early decision: when an agent's structured output matches one of these rules the
+# remaining agents are cancelled and the final report is built from what is available.
+# Fields use dotted paths into the agent's structured_data; ops are lt, lte, gt, gte, eq.
+EARLY_DECISION_ENABLED = os.environ.get('EARLY_DECISION_ENABLED', 'False').lower() == 'true'
+EARLY_DECISION_RULES = [
+    {
+        'agent_type': 'FINANCIAL',
+        'field': 'financial_score',
+        'op': 'lte',
+        'value': int(os.environ.get('EARLY_DECISION_MIN_FINANCIAL_SCORE', '15')),
+        'reason': 'Financial analysis shows the idea is not viable',
+    },
+    {
+        'agent_type': 'RISK_ANALYST',
+        'field': 'risk_assessment.risk_score',
+        'op': 'gte',
+        'value': int(os.environ.get('EARLY_DECISION_MAX_RISK_SCORE', '90')),
+        'reason': 'Risk analysis shows an unacceptable risk level',
+    },
+]
+
+# Model tiering: pick the cheapest model tier per (agent, idea) from idea difficulty,
+# escalating agents whose recent runs on a tier too often return unparseable output.
+# Tiers are listed from cheapest to most capable; the last one is the baseline.
+MODEL_TIERING_ENABLED = os.environ.get('MODEL_TIERING_ENABLED', 'False').lower() == 'true'
+MODEL_TIERS = {
+    'small': os.environ.get('MODEL_TIER_SMALL', 'gpt-3.5-turbo'),
+    'medium': os.environ.get('MODEL_TIER_MEDIUM', 'gpt-4o-mini'),
+    'large': os.environ.get('MODEL_TIER_LARGE', DEFAULT_LLM_MODEL),
+}
+# Upper difficulty bound (exclusive) for every tier but the last
+MODEL_TIER_THRESHOLDS = [35, 65]
+MODEL_TIER_AGENT_MINIMUM = {
+    'FINANCIAL': 'medium',
+}
+MODEL_TIER_MAX_PARSE_FAILURE_RATE = float(os.environ.get('MODEL_TIER_MAX_PARSE_FAILURE_RATE', '0.2'))
+MODEL_TIER_MIN_SAMPLES = 10
+MODEL_TIER_HISTORY_WINDOW = 50
+
+# Agent runtime: every worker process multiplexes agent LLM calls on one event loop.
+# Run the agents queue on a thread pool (see docker-compose.yml) to keep many calls in
+# flight per process; these limits bound the calls running at once per process.
+AGENT_RUNTIME_MAX_CONCURRENCY = int(os.environ.get('AGENT_RUNTIME_MAX_CONCURRENCY', '100'))
+AGENT_PROVIDER_CONCURRENCY = {
+    'openai': int(os.environ.get('AGENT_OPENAI_CONCURRENCY', '50')),
+    'anthropic': int(os.environ.get('AGENT_ANTHROPIC_CONCURRENCY', '20')),
+    'default': int(os.environ.get('AGENT_DEFAULT_CONCURRENCY', '10')),
+}
+
+# Per-user fair share: an analysis starts only while its submitter is below the
+# max_concurrent cap of their priority tier and the platform is below
+# ANALYSIS_GLOBAL_CONCURRENCY; queued analyses get freed slots by weighted fair
+# queuing (weight). priority is the Celery message priority of the tier's agent
+# tasks (0 is consumed first). Staff users get the staff tier, members of the
+# ANALYSIS_PAID_GROUP group the paid tier.
+ANALYSIS_FAIR_SHARE_ENABLED = os.environ.get('ANALYSIS_FAIR_SHARE_ENABLED', 'True').lower() == 'true'
+ANALYSIS_GLOBAL_CONCURRENCY = int(os.environ.get('ANALYSIS_GLOBAL_CONCURRENCY', '20'))
+ANALYSIS_PAID_GROUP = os.environ.get('ANALYSIS_PAID_GROUP', 'paid')
+ANALYSIS_PRIORITY_TIERS = {
+    'staff': {
+        'weight': 4,
+        'max_concurrent': int(os.environ.get('ANALYSIS_STAFF_MAX_CONCURRENT', '10')),
+        'priority': 0,
+    },
+    'paid': {
+        'weight': 2,
+        'max_concurrent': int(os.environ.get('ANALYSIS_PAID_MAX_CONCURRENT', '5')),
+        'priority': 3,
+    },
+    'standard': {
+        'weight': 1,
+        'max_concurrent': int(os.environ.get('ANALYSIS_USER_MAX_CONCURRENT', '2')),
+        'priority': 6,
+    },
+}
+# Safety-net interval (seconds) for dispatching queued analyses from beat
+ANALYSIS_DISPATCH_INTERVAL = float(os.environ.get('ANALYSIS_DISPATCH_INTERVAL', '30'))
+
+# Admission control on idea submission: the ETA uses recent per-agent execution times
+# and the analyses the agent provider capacity can run at once. When the backlog is
+# saturated (queue depth or estimated wait above the limits) the submission is
+# 'queue'd anyway, 'defer'red (held in the fair-share queue until its estimated start) or 'reject'ed.
+ANALYSIS_ADMISSION_MAX_QUEUE = int(os.environ.get('ANALYSIS_ADMISSION_MAX_QUEUE', '500'))
+ANALYSIS_ADMISSION_MAX_WAIT = int(os.environ.get('ANALYSIS_ADMISSION_MAX_WAIT', str(6 * 3600)))
+ANALYSIS_ADMISSION_SATURATED_ACTION = os.environ.get('ANALYSIS_ADMISSION_SATURATED_ACTION', 'queue')
+ANALYSIS_ADMISSION_DEFAULT_AGENT_SECONDS = 60.0
+ANALYSIS_ADMISSION_HISTORY_DAYS = 7
+# Processes consuming the agents queue; each applies AGENT_PROVIDER_CONCURRENCY
+AGENT_WORKER_PROCESSES = int(os.environ.get('AGENT_WORKER_PROCESSES', '1'))
+
+# Leases and the stuck-analysis reaper: a running agent task owns its AnalysisTask row
+# for AGENT_LEASE_SECONDS and renews the lease while its LLM call is in flight. The
+# reaper (beat, every ANALYSIS_REAPER_INTERVAL seconds) requeues agents whose lease
+# expired or that sat queued/retrying past ANALYSIS_REAPER_PENDING_TIMEOUT, up to
+# ANALYSIS_REAPER_MAX_ATTEMPTS dispatches, and requeues final reports that did not
+# appear within ANALYSIS_REAPER_REPORT_TIMEOUT of the last agent finishing.
+AGENT_LEASE_SECONDS = int(os.environ.get('AGENT_LEASE_SECONDS', '120'))
+AGENT_LEASE_RENEW_INTERVAL = int(os.environ.get('AGENT_LEASE_RENEW_INTERVAL', '30'))
+ANALYSIS_REAPER_INTERVAL = float(os.environ.get('ANALYSIS_REAPER_INTERVAL', '60'))
+ANALYSIS_REAPER_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_REAPER_MAX_ATTEMPTS', '3'))
+ANALYSIS_REAPER_PENDING_TIMEOUT = int(os.environ.get('ANALYSIS_REAPER_PENDING_TIMEOUT', '7200'))
+ANALYSIS_REAPER_REPORT_TIMEOUT = int(os.environ.get('ANALYSIS_REAPER_REPORT_TIMEOUT', '900'))
+# Ideas left ANALYZING this long without an agent workflow are failed
+ANALYSIS_REAPER_ORPHAN_TIMEOUT = int(os.environ.get('ANALYSIS_REAPER_ORPHAN_TIMEOUT', '3600'))
+
+# Idea status polling: snapshots are cached this many seconds (saves invalidate them
+# immediately; bulk updates are picked up on expiry)
+IDEA_STATUS_CACHE_TTL = int(os.environ.get('IDEA_STATUS_CACHE_TTL', '5'))
+
+# Agent status page and platform metrics (auto-refreshed every 30s) share aggregated
+# report stats through the cache for this many seconds
+METRICS_CACHE_TTL = int(os.environ.get('METRICS_CACHE_TTL', '15'))
+
+# Analytics time series: longest range (in periods) a request may ask for
+TIME_SERIES_MAX_PERIODS = int(os.environ.get('TIME_SERIES_MAX_PERIODS', '400'))
+
+# Analytics rollups: a changed idea's slices are looked up this many seconds after the
+# change and each (user, day) slice recounted after another delay, coalescing bursts.
+# Everything is rebuilt nightly at this hour (UTC), which bounds any drift to a day
+ROLLUP_REFRESH_DELAY = int(os.environ.get('ROLLUP_REFRESH_DELAY', '5'))
+ROLLUP_RECONCILE_HOUR = int(os.environ.get('ROLLUP_RECONCILE_HOUR', '3'))
+
+# Agent execution telemetry: execution logs are buffered per worker process and
+# written once AGENT_TELEMETRY_BATCH_SIZE records are pending or
+# AGENT_TELEMETRY_FLUSH_INTERVAL seconds passed; AGENT_TELEMETRY_EWMA_ALPHA weights
+# the newest run in the moving averages of AgentPerformanceMetrics
+AGENT_TELEMETRY_ENABLED = os.environ.get('AGENT_TELEMETRY_ENABLED', 'True').lower() == 'true'
+AGENT_TELEMETRY_BATCH_SIZE = int(os.environ.get('AGENT_TELEMETRY_BATCH_SIZE', '50'))
+AGENT_TELEMETRY_FLUSH_INTERVAL = float(os.environ.get('AGENT_TELEMETRY_FLUSH_INTERVAL', '10'))
+AGENT_TELEMETRY_EWMA_ALPHA = float(os.environ.get('AGENT_TELEMETRY_EWMA_ALPHA', '0.1'))
+
+# Keyset-paginated lists count their rows only up to PAGINATION_COUNT_LIMIT and
+# show "N+" beyond it
+PAGINATION_COUNT_LIMIT = int(os.environ.get('PAGINATION_COUNT_LIMIT', '1000'))
+
+# Agent metrics API: serve a snapshot refreshed from beat every
+# AGENT_METRICS_SNAPSHOT_INTERVAL seconds instead of aggregating per request
+AGENT_METRICS_SNAPSHOT_ENABLED = os.environ.get('AGENT_METRICS_SNAPSHOT_ENABLED', 'False').lower() == 'true'
+AGENT_METRICS_SNAPSHOT_INTERVAL = int(os.environ.get('AGENT_METRICS_SNAPSHOT_INTERVAL', '300'))
+
+# Agent deadlines: an agent task's LLM call must finish AGENT_DEADLINE_MARGIN seconds
+# before the configured Celery soft time limit, which the agents' threads pool does not
+# enforce, so the agent stops the call itself. max_tokens is capped at what the model can generate
+# in the time left (AGENT_OUTPUT_TOKENS_PER_SECOND, at least AGENT_MIN_OUTPUT_TOKENS);
+# output streamed in before the deadline is saved as a partial report.
+AGENT_DEADLINE_MARGIN = int(os.environ.get('AGENT_DEADLINE_MARGIN', '15'))
+AGENT_OUTPUT_TOKENS_PER_SECOND = float(os.environ.get('AGENT_OUTPUT_TOKENS_PER_SECOND', '20'))
+AGENT_MIN_OUTPUT_TOKENS = 256
+
+# Model-affinity scheduling for local LLM servers (LM Studio, Ollama): requests are
+# grouped per (endpoint, model) and the resident model is served in batches of up to
+# MODEL_AFFINITY_BATCH_LIMIT before swapping, unless another model's oldest request
+# has waited MODEL_AFFINITY_MAX_WAIT seconds. Processes share an endpoint through a lease
+# in the cache (renewed per request, expiring after MODEL_AFFINITY_LEASE_TTL seconds);
+# waiting processes re-check it every MODEL_AFFINITY_LEASE_POLL seconds. Agents use
+# local servers with model names like 'lmstudio/<model>' or 'ollama/<model>'.
+MODEL_AFFINITY_ENABLED = os.environ.get('MODEL_AFFINITY_ENABLED', 'True').lower() == 'true'
+MODEL_AFFINITY_BATCH_LIMIT = int(os.environ.get('MODEL_AFFINITY_BATCH_LIMIT', '8'))
+MODEL_AFFINITY_MAX_WAIT = float(os.environ.get('MODEL_AFFINITY_MAX_WAIT', '30'))
+MODEL_AFFINITY_ENDPOINT_CONCURRENCY = int(os.environ.get('MODEL_AFFINITY_ENDPOINT_CONCURRENCY', '1'))
+MODEL_AFFINITY_LEASE_TTL = int(os.environ.get('MODEL_AFFINITY_LEASE_TTL', '330'))
+MODEL_AFFINITY_LEASE_POLL = float(os.environ.get('MODEL_AFFINITY_LEASE_POLL', '0.5'))
+LM_STUDIO_ENDPOINT = os.environ.get('LM_STUDIO_ENDPOINT', 'http://localhost:1234')
+OLLAMA_ENDPOINT = os.environ.get('OLLAMA_ENDPOINT', 'http://localhost:11434')
+
+# How often running agent tasks check whether their analysis was cancelled (seconds)
+CANCELLATION_POLL_INTERVAL = float(os.environ.get('CANCELLATION_POLL_INTERVAL', '1.0'))
+
+# How the final report waits for the agent fan-out: 'counter' (a per-workflow DB counter
+# decremented with F() by each agent, no result-backend storage) or 'chord' (Celery chord)
+ANALYSIS_JOIN_MODE = os.environ.get('ANALYSIS_JOIN_MODE', 'counter')
+
+# Agent tasks receive the idea id and a context version; the context itself is shared
+# through the cache for this long (seconds), enough to cover queueing and retries
+ANALYSIS_CONTEXT_CACHE_TTL = int(os.environ.get('ANALYSIS_CONTEXT_CACHE_TTL', '600'))
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
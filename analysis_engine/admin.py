@@ -6,14 +6,26 @@ business analysis system.
 """
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.db.models import Q
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 import json
 from .models import (
     BusinessIdea, AgentReport, FinalAnalysisReport, 
-    AnalysisTask, IdeaGenerationRequest
+    AnalysisTask, AnalysisQueueEntry, IdeaGenerationRequest, TriageResult, ReaperAction
 )
+from .search import IDEA_SEARCH, REPORT_SEARCH, search_annotations, search_filter
+
+
+class SearchRankChangeList(ChangeList):
+    """Changelist listing the best search matches first unless a column is sorted"""
+    
+    def get_ordering(self, request, queryset):
+        if self.query and ORDER_VAR not in self.params:
+            return ['-search_rank', '-pk']
+        return super().get_ordering(request, queryset)
 
 
 @admin.register(BusinessIdea)
@@ -51,6 +63,23 @@ class BusinessIdeaAdmin(admin.ModelAdmin):
     date_hierarchy = 'submitted_at'
     ordering = ['-submitted_at']
     
+    def get_queryset(self, request):
+        # Progress and submitter come with the page instead of one query per row
+        return super().get_queryset(request).with_progress()
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Full-text search of title and description, best matches first unless sorted"""
+        if not search_term:
+            return queryset, False
+        
+        queryset = queryset.filter(
+            search_filter(IDEA_SEARCH, search_term) | Q(submitted_by__username__iexact=search_term.strip())
+        ).annotate(**search_annotations(IDEA_SEARCH, search_term))
+        return queryset, False
+    
+    def get_changelist(self, request, **kwargs):
+        return SearchRankChangeList
+    
     def progress_display(self, obj):
         """Display analysis progress as a progress bar"""
         progress = obj.progress_percentage
@@ -110,7 +139,7 @@ class AgentReportAdmin(admin.ModelAdmin):
         'confidence', 'created_at', 'execution_time_display'
     ]
     list_filter = [
-        'agent_type', 'status', 'llm_model_used', 'created_at'
+        'agent_type', 'status', 'llm_model_used', 'model_tier', 'parse_failed', 'created_at'
     ]
     search_fields = [
         'business_idea__title', 'business_idea__description', 'report_content'
@@ -127,7 +156,8 @@ class AgentReportAdmin(admin.ModelAdmin):
             'fields': ('agent_score', 'confidence', 'report_content')
         }),
         ('Execution Details', {
-            'fields': ('llm_model_used', 'execution_time', 'token_usage', 'cost_estimate'),
+            'fields': ('llm_model_used', 'model_tier', 'difficulty_score', 'parse_failed',
+                       'execution_time', 'token_usage', 'cost_estimate'),
             'classes': ('collapse',)
         }),
         ('Structured Data', {
@@ -141,6 +171,20 @@ class AgentReportAdmin(admin.ModelAdmin):
     )
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    list_select_related = ['business_idea']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Full-text search of the report content and the idea's title and description"""
+        if not search_term:
+            return queryset, False
+        
+        queryset = queryset.filter(
+            search_filter(REPORT_SEARCH, search_term) | search_filter(IDEA_SEARCH, search_term, 'business_idea')
+        ).annotate(**search_annotations(REPORT_SEARCH, search_term))
+        return queryset, False
+    
+    def get_changelist(self, request, **kwargs):
+        return SearchRankChangeList
     
     def business_idea_title(self, obj):
         """Display business idea title as a link"""
@@ -182,7 +226,7 @@ class FinalAnalysisReportAdmin(admin.ModelAdmin):
         'confidence_level', 'created_at', 'total_cost'
     ]
     list_filter = [
-        'final_recommendation', 'generated_by_agent', 'created_at'
+        'final_recommendation', 'generated_by_agent', 'is_early_decision', 'created_at'
     ]
     search_fields = [
         'business_idea__title', 'executive_summary', 'key_findings'
@@ -193,7 +237,8 @@ class FinalAnalysisReportAdmin(admin.ModelAdmin):
     ]
     fieldsets = (
         ('Basic Information', {
-            'fields': ('business_idea', 'created_at', 'generated_by_agent')
+            'fields': ('business_idea', 'created_at', 'generated_by_agent',
+                       'is_early_decision', 'early_decision_reason')
         }),
         ('Executive Summary', {
             'fields': ('executive_summary', 'overall_score', 'final_recommendation', 'confidence_level')
@@ -217,6 +262,7 @@ class FinalAnalysisReportAdmin(admin.ModelAdmin):
     )
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    list_select_related = ['business_idea']
     
     def business_idea_title(self, obj):
         """Display business idea title as a link"""
@@ -252,6 +298,25 @@ class FinalAnalysisReportAdmin(admin.ModelAdmin):
     financial_projections_display.short_description = 'Financial Projections'
 
 
+@admin.register(TriageResult)
+class TriageResultAdmin(admin.ModelAdmin):
+    """Admin interface for Triage Results"""
+    
+    list_display = [
+        'business_idea', 'viability_score', 'threshold', 'passed',
+        'full_analysis_requested', 'full_analysis_score', 'created_at'
+    ]
+    list_filter = ['passed', 'full_analysis_requested', 'llm_model_used', 'created_at']
+    search_fields = ['business_idea__title', 'rationale']
+    readonly_fields = [
+        'business_idea', 'viability_score', 'threshold', 'passed', 'rationale', 'red_flags',
+        'llm_model_used', 'token_usage', 'cost_estimate', 'execution_time', 'created_at',
+        'full_analysis_score'
+    ]
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+
+
 @admin.register(AnalysisTask)
 class AnalysisTaskAdmin(admin.ModelAdmin):
     """Admin interface for Analysis Tasks"""
@@ -263,7 +328,8 @@ class AnalysisTaskAdmin(admin.ModelAdmin):
     list_filter = ['status', 'agent_type', 'created_at']
     search_fields = ['business_idea__title', 'task_id', 'agent_type']
     readonly_fields = [
-        'task_id', 'created_at', 'started_at', 'completed_at', 'duration_display'
+        'task_id', 'created_at', 'started_at', 'completed_at', 'duration_display',
+        'workflow', 'worker', 'lease_expires_at', 'attempt'
     ]
     fieldsets = (
         ('Task Information', {
@@ -272,6 +338,9 @@ class AnalysisTaskAdmin(admin.ModelAdmin):
         ('Timing', {
             'fields': ('created_at', 'started_at', 'completed_at', 'duration_display')
         }),
+        ('Ownership', {
+            'fields': ('workflow', 'worker', 'lease_expires_at', 'attempt')
+        }),
         ('Results', {
             'fields': ('result', 'error_message'),
             'classes': ('collapse',)
@@ -279,6 +348,7 @@ class AnalysisTaskAdmin(admin.ModelAdmin):
     )
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    list_select_related = ['business_idea']
     
     def business_idea_short(self, obj):
         """Display shortened business idea title"""
@@ -308,6 +378,32 @@ class AnalysisTaskAdmin(admin.ModelAdmin):
     duration_display.short_description = 'Duration'
 
 
+@admin.register(AnalysisQueueEntry)
+class AnalysisQueueEntryAdmin(admin.ModelAdmin):
+    """Admin interface for analyses held back by per-user fair share"""
+    
+    list_display = ['business_idea', 'user', 'priority_tier', 'status', 'created_at', 'dispatched_at']
+    list_filter = ['status', 'priority_tier', 'created_at']
+    search_fields = ['business_idea__title', 'user__username']
+    readonly_fields = ['created_at', 'dispatched_at']
+    raw_id_fields = ['business_idea', 'user']
+    ordering = ['-created_at']
+
+
+@admin.register(ReaperAction)
+class ReaperActionAdmin(admin.ModelAdmin):
+    """Admin interface for actions of the stuck-analysis reaper"""
+    
+    list_display = ['created_at', 'action', 'business_idea', 'agent_type', 'attempt', 'task_id']
+    list_filter = ['action', 'agent_type', 'created_at']
+    search_fields = ['business_idea__title', 'task_id', 'detail']
+    readonly_fields = [
+        'business_idea', 'workflow', 'action', 'agent_type', 'task_id', 'attempt', 'detail', 'created_at'
+    ]
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+
+
 @admin.register(IdeaGenerationRequest)
 class IdeaGenerationRequestAdmin(admin.ModelAdmin):
     """Admin interface for Idea Generation Requests"""
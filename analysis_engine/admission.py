@@ -0,0 +1,190 @@
+"""
+Admission Control for Idea Submission
+
+Submissions used to be enqueued however deep the backlog was, with no feedback,
+so users resubmitted and made it worse. Each submission is now estimated against
+the current backlog: the analyses fair share dispatches before it, the number of
+analyses the agent provider capacity can run at once, and the recent per-agent
+``execution_time`` from ``AgentReport``. The idea is marked ``QUEUE`` with its
+position and an estimated completion time, or deferred/rejected when the backlog
+is saturated. Deferred ideas wait in the fair-share queue until their estimated
+start, from where ``dispatch_queued_analyses`` starts them.
+"""
+
+import logging
+import math
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg
+from django.utils import timezone
+
+from analysis_engine.agent_runtime import get_provider_for_model
+from analysis_engine.fair_share import (
+    enqueue_analysis, get_dispatch_position, get_priority_tier, get_running_counts, has_capacity
+)
+from analysis_engine.models import AgentReport, AnalysisQueueEntry, BusinessIdea
+from analysis_engine.tasks import ANALYSIS_AGENT_TYPES, orchestrate_business_analysis
+
+logger = logging.getLogger(__name__)
+
+DURATIONS_CACHE_KEY = 'analysis:admission:agent_durations'
+
+
+@dataclass
+class AdmissionDecision:
+    """Outcome of the admission check for one submission"""
+    action: str  # 'queue', 'defer' or 'reject'
+    position: int
+    running: int
+    slots: int
+    estimated_wait_seconds: float
+    estimated_start: datetime
+    estimated_completion: datetime
+    saturated: bool = False
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def get_agent_duration_estimates() -> Dict[str, float]:
+    """Average seconds per agent type over the recent completed reports"""
+    durations = cache.get(DURATIONS_CACHE_KEY)
+    if durations is not None:
+        return durations
+    
+    since = timezone.now() - timedelta(days=getattr(settings, 'ANALYSIS_ADMISSION_HISTORY_DAYS', 7))
+    durations = {
+        row['agent_type']: row['average'].total_seconds()
+        for row in AgentReport.objects.filter(
+            status='COMPLETED',
+            completed_at__gte=since,
+            execution_time__isnull=False
+        ).values('agent_type').annotate(average=Avg('execution_time'))
+        if row['average'] is not None
+    }
+    cache.set(DURATIONS_CACHE_KEY, durations, 300)
+    return durations
+
+
+def estimate_analysis_seconds() -> float:
+    """Expected wall time of one analysis: the slowest agent of the fan-out plus the CEO report"""
+    durations = get_agent_duration_estimates()
+    default = getattr(settings, 'ANALYSIS_ADMISSION_DEFAULT_AGENT_SECONDS', 60.0)
+    fan_out = max(durations.get(agent_type, default) for agent_type in ANALYSIS_AGENT_TYPES)
+    return fan_out + durations.get('CEO', default)
+
+
+def get_analysis_slots() -> int:
+    """Analyses that can run at once, bounded by provider capacity and fair share"""
+    provider_limits = getattr(settings, 'AGENT_PROVIDER_CONCURRENCY', {})
+    provider = get_provider_for_model(getattr(settings, 'DEFAULT_LLM_MODEL', ''))
+    provider_limit = provider_limits.get(provider, provider_limits.get('default', 10))
+    provider_limit *= getattr(settings, 'AGENT_WORKER_PROCESSES', 1)
+    
+    slots = provider_limit // len(ANALYSIS_AGENT_TYPES)
+    if getattr(settings, 'ANALYSIS_FAIR_SHARE_ENABLED', True):
+        slots = min(slots, getattr(settings, 'ANALYSIS_GLOBAL_CONCURRENCY', 20))
+    return max(slots, 1)
+
+
+def estimate_wait(ahead: int, running: int) -> float:
+    """Seconds until an analysis with ``ahead`` queued analyses before it completes"""
+    analysis_seconds = estimate_analysis_seconds()
+    waves_before_start = (ahead + running) // get_analysis_slots()
+    return waves_before_start * analysis_seconds + analysis_seconds
+
+
+def get_sent_backlog():
+    """Queued ideas already sent to the orchestrator, i.e. without a waiting fair-share entry"""
+    return BusinessIdea.objects.filter(status='QUEUE').exclude(queue_entries__status='WAITING')
+
+
+def evaluate_admission(user=None) -> AdmissionDecision:
+    """
+    Position, ETA and admission action for a new submission by ``user``.
+    
+    Ideas already sent to the orchestrator are ahead of it; when the user has
+    to wait for a fair-share slot, so are the waiting analyses fair share
+    dispatches before theirs. The queue length limit applies to the whole backlog.
+    """
+    running_counts = get_running_counts()
+    running = sum(running_counts.values())
+    ahead = get_sent_backlog().count()
+    
+    tier = get_priority_tier(user)
+    user_id = user.id if user else None
+    if (AnalysisQueueEntry.objects.filter(user_id=user_id, status='WAITING').exists()
+            or not has_capacity(user_id, tier, running_counts)):
+        ahead += get_dispatch_position(AnalysisQueueEntry(user=user, priority_tier=tier, created_at=timezone.now()))
+    
+    analysis_seconds = estimate_analysis_seconds()
+    wait = estimate_wait(ahead, running)
+    now = timezone.now()
+    
+    saturated = (
+        BusinessIdea.objects.filter(status='QUEUE').count() >= getattr(settings, 'ANALYSIS_ADMISSION_MAX_QUEUE', 500)
+        or wait > getattr(settings, 'ANALYSIS_ADMISSION_MAX_WAIT', 6 * 3600)
+    )
+    action = getattr(settings, 'ANALYSIS_ADMISSION_SATURATED_ACTION', 'queue') if saturated else 'queue'
+    
+    return AdmissionDecision(
+        action=action,
+        position=ahead + 1,
+        running=running,
+        slots=get_analysis_slots(),
+        estimated_wait_seconds=round(wait),
+        estimated_start=now + timedelta(seconds=wait - analysis_seconds),
+        estimated_completion=now + timedelta(seconds=wait),
+        saturated=saturated
+    )
+
+
+def get_queue_estimate(business_idea: BusinessIdea) -> Optional[Dict[str, Any]]:
+    """Current position and ETA of a queued idea, None if it is not queued"""
+    if business_idea.status != 'QUEUE':
+        return None
+    
+    entry = AnalysisQueueEntry.objects.filter(business_idea=business_idea, status='WAITING').first()
+    if entry:
+        ahead = get_sent_backlog().count() + get_dispatch_position(entry)
+    else:
+        ahead = get_sent_backlog().filter(updated_at__lt=business_idea.updated_at).count()
+    running = BusinessIdea.objects.filter(status='ANALYZING').count()
+    wait = estimate_wait(ahead, running)
+    
+    # A deferred idea does not start before its hold expires, however short the queue got
+    if entry and entry.not_before:
+        hold = (entry.not_before - timezone.now()).total_seconds()
+        wait = max(wait, hold + estimate_analysis_seconds())
+    return {
+        'position': ahead + 1,
+        'running': running,
+        'estimated_wait_seconds': round(wait),
+        'estimated_completion': timezone.now() + timedelta(seconds=wait),
+    }
+
+
+def submit_for_analysis(business_idea: BusinessIdea, decision: AdmissionDecision):
+    """Queue the idea's analysis as admitted; deferred ideas wait in the fair-share queue until their start"""
+    if decision.action == 'defer':
+        enqueue_analysis(business_idea, get_priority_tier(business_idea.submitted_by),
+                         not_before=decision.estimated_start)
+        logger.info(f"Deferred analysis of {business_idea.title}: backlog saturated "
+                    f"(position {decision.position}, ETA {decision.estimated_wait_seconds}s)")
+        return
+    
+    business_idea.status = 'QUEUE'
+    business_idea.save(update_fields=['status', 'updated_at'])
+    orchestrate_business_analysis.delay(str(business_idea.id))
+
+
+def format_wait(seconds: float) -> str:
+    """Human-readable wait, e.g. '5 minutes' or '2 hours'"""
+    minutes = math.ceil(seconds / 60)
+    if minutes < 90:
+        return f"{minutes} minute{'s' if minutes != 1 else ''}"
+    return f"{round(minutes / 60)} hours"
@@ -0,0 +1,140 @@
+"""
+Shared Event Loop for Agent LLM Calls
+
+Agent tasks are almost pure network wait. Instead of every task creating and
+blocking on its own event loop, each worker process runs one event loop in a
+background thread and all agent coroutines are multiplexed on it. Combined with
+a thread (or gevent) pool on the ``agents`` queue, a single process can keep
+hundreds of LLM calls in flight.
+
+Concurrency on the loop is bounded globally (``AGENT_RUNTIME_MAX_CONCURRENCY``)
+and per provider (``AGENT_PROVIDER_CONCURRENCY``).
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_provider_for_model(model_name: str) -> str:
+    """Provider key used for per-provider concurrency limits"""
+    model_name = (model_name or '').lower()
+    if model_name.startswith('gpt'):
+        return 'openai'
+    if model_name.startswith('claude'):
+        return 'anthropic'
+    return 'default'
+
+
+class AgentRuntime:
+    """
+    Per-process event loop running agent coroutines.
+    
+    The loop thread is started lazily and restarted after a fork, so the runtime
+    is safe to use from prefork children as well as from thread-pool workers.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._provider_limits: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight: Dict[str, int] = defaultdict(int)
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+            
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run_loop, args=(loop,), name='agent-runtime', daemon=True)
+            thread.start()
+            
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            self._global_limit = None
+            self._provider_limits = {}
+            self.in_flight = defaultdict(int)
+            
+            logger.info(f"Started agent runtime event loop in process {self._pid}")
+            return loop
+    
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+    
+    def _get_limits(self, provider: str):
+        # Semaphores are created on the loop thread so they bind to the runtime loop
+        if self._global_limit is None:
+            self._global_limit = asyncio.Semaphore(getattr(settings, 'AGENT_RUNTIME_MAX_CONCURRENCY', 100))
+        if provider not in self._provider_limits:
+            provider_limits = getattr(settings, 'AGENT_PROVIDER_CONCURRENCY', {})
+            limit = provider_limits.get(provider, provider_limits.get('default', 50))
+            self._provider_limits[provider] = asyncio.Semaphore(limit)
+        return self._global_limit, self._provider_limits[provider]
+    
+    async def _run_limited(self, coro: Awaitable[Any], provider: str) -> Any:
+        global_limit, provider_limit = self._get_limits(provider)
+        async with global_limit:
+            async with provider_limit:
+                self.in_flight[provider] += 1
+                try:
+                    return await coro
+                finally:
+                    self.in_flight[provider] -= 1
+    
+    def run(self, coro: Awaitable[Any], provider: str = 'default',
+            check_cancelled: Optional[Callable[[], None]] = None,
+            poll_interval: Optional[float] = None) -> Any:
+        """
+        Run ``coro`` on the shared loop and block the calling thread until it finishes.
+        
+        ``check_cancelled`` is called from the calling thread every ``poll_interval``
+        seconds. If it raises, the coroutine is cancelled (closing its in-flight HTTP
+        request) and the exception propagates. Polling from the caller keeps cache
+        lookups off the shared loop.
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._run_limited(coro, provider), loop)
+        poll_interval = poll_interval or getattr(settings, 'CANCELLATION_POLL_INTERVAL', 1.0)
+        
+        try:
+            while True:
+                try:
+                    return future.result(timeout=poll_interval if check_cancelled else None)
+                except concurrent.futures.TimeoutError:
+                    check_cancelled()
+        except BaseException:
+            # Cancellation, soft time limits and worker shutdown must not leave the
+            # call running on the shared loop
+            future.cancel()
+            raise
+    
+    def stats(self) -> Dict[str, Any]:
+        """In-flight calls per provider for this process"""
+        return {
+            'pid': self._pid,
+            'running': self._loop is not None and self._pid == os.getpid(),
+            'in_flight': dict(self.in_flight),
+        }
+
+
+agent_runtime = AgentRuntime()
+
+
+def run_agent_coroutine(coro: Awaitable[Any], model_name: str = '',
+                        check_cancelled: Optional[Callable[[], None]] = None) -> Any:
+    """Run an agent coroutine on this process's shared loop under its provider's limit"""
+    return agent_runtime.run(coro, provider=get_provider_for_model(model_name), check_cancelled=check_cancelled)
@@ -0,0 +1,72 @@
+"""
+Cooperative Cancellation for Analysis Workflows
+
+A per-idea cancellation flag lives in the shared cache. Agent tasks check it
+before starting and poll it while their LLM call is in flight (see
+``AgentRuntime.run``), so setting the flag stops queued work and aborts in-flight
+HTTP requests within one poll interval.
+"""
+
+import logging
+from typing import Dict, Optional
+
+from celery import current_app
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CANCELLATION_KEY = 'analysis:cancel:{business_idea_id}'
+
+# Flags outlive the hard task time limit so late-starting tasks still see them
+CANCELLATION_TTL = 60 * 60
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an agent task when its analysis has been cancelled"""
+
+    def __init__(self, reason: str = ''):
+        super().__init__(reason or 'Analysis cancelled')
+        self.reason = reason
+
+
+def request_cancellation(business_idea_id: str, reason: str, kind: str = 'cancelled') -> bool:
+    """
+    Set the cancellation flag for an idea.
+
+    Returns True only for the caller that set the flag first, which makes it safe
+    to use as an exactly-once claim when several agents race to short-circuit.
+    """
+    return cache.add(
+        CANCELLATION_KEY.format(business_idea_id=business_idea_id),
+        {'kind': kind, 'reason': reason},
+        CANCELLATION_TTL
+    )
+
+
+def get_cancellation(business_idea_id: str) -> Optional[Dict[str, str]]:
+    """Return the cancellation flag ({'kind', 'reason'}) for an idea, if set"""
+    return cache.get(CANCELLATION_KEY.format(business_idea_id=business_idea_id))
+
+
+def clear_cancellation(business_idea_id: str):
+    """Clear the flag so a new analysis run for the idea is not cancelled by a stale one"""
+    cache.delete(CANCELLATION_KEY.format(business_idea_id=business_idea_id))
+
+
+def revoke_tasks(task_ids):
+    """Revoke queued Celery tasks so workers drop them without running"""
+    task_ids = [task_id for task_id in task_ids if task_id]
+    if not task_ids:
+        return
+    try:
+        current_app.control.revoke(task_ids)
+    except Exception as e:
+        # Revocation is best-effort; tasks that still start will see the flag
+        logger.warning(f"Failed to revoke tasks {task_ids}: {e}")
+
+
+def raise_if_cancelled(business_idea_id: str):
+    """Raise AnalysisCancelled if the idea's analysis has been cancelled"""
+    flag = get_cancellation(business_idea_id)
+    if flag:
+        raise AnalysisCancelled(flag.get('reason', ''))
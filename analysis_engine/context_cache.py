@@ -0,0 +1,74 @@
+"""
+Shared Analysis Context Cache
+
+Agent tasks receive only the idea id and a context version instead of the full
+serialized context. The orchestrator primes a short-lived shared cache entry and
+each worker loads the context from it, falling back to the database on a miss.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from agent_system.base_agents import AnalysisContext
+from analysis_engine.models import BusinessIdea
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_KEY = 'analysis:context:{business_idea_id}:{version}'
+
+
+def build_analysis_context(business_idea: BusinessIdea) -> AnalysisContext:
+    """Build the agent context for a business idea"""
+    return AnalysisContext(
+        business_idea_id=str(business_idea.id),
+        title=business_idea.title,
+        description=business_idea.description,
+        industry=business_idea.industry,
+        target_market=business_idea.target_market or "",
+        estimated_budget=float(business_idea.estimated_budget) if business_idea.estimated_budget else None,
+        additional_data={}
+    )
+
+
+def get_context_version(context: AnalysisContext) -> str:
+    """Short fingerprint of the context contents; changes whenever the idea input changes"""
+    payload = json.dumps(context.__dict__, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def prime_analysis_context(business_idea: BusinessIdea) -> Tuple[AnalysisContext, str]:
+    """Build the context, store it in the shared cache and return it with its version"""
+    context = build_analysis_context(business_idea)
+    version = get_context_version(context)
+    cache.set(
+        CONTEXT_KEY.format(business_idea_id=context.business_idea_id, version=version),
+        context.__dict__,
+        getattr(settings, 'ANALYSIS_CONTEXT_CACHE_TTL', 600)
+    )
+    return context, version
+
+
+def load_analysis_context(business_idea_id: str, version: str) -> AnalysisContext:
+    """
+    Load the context an agent task was dispatched with.
+    
+    On a cache miss the context is rebuilt from the database and cached again for
+    the sibling tasks. If the idea changed since dispatch the current input is used.
+    """
+    cached = cache.get(CONTEXT_KEY.format(business_idea_id=business_idea_id, version=version))
+    if cached is not None:
+        return AnalysisContext(**cached)
+    
+    business_idea = BusinessIdea.objects.get(id=business_idea_id)
+    context, current_version = prime_analysis_context(business_idea)
+    
+    if current_version != version:
+        logger.warning(f"Context for {business_idea_id} changed since dispatch "
+                       f"({version} -> {current_version}), using current input")
+    
+    return context
@@ -0,0 +1,246 @@
+"""
+Per-User Fair Share for Analysis Dispatch
+
+Analyses used to go straight onto the shared queues, so one user bulk-submitting
+hundreds of ideas starved everyone else. The orchestrator now admits an analysis
+only while its submitter is below the concurrency cap of their priority tier and
+the platform is below ``ANALYSIS_GLOBAL_CONCURRENCY``; otherwise the idea waits
+in an ``AnalysisQueueEntry``. Freed slots are handed out by weighted fair
+queuing: the waiting user with the fewest running analyses per unit of tier
+weight goes next. Submissions deferred by admission control wait in the same
+queue with a ``not_before`` time.
+"""
+
+import logging
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+
+from analysis_engine.models import AnalysisQueueEntry, BusinessIdea
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIER = 'standard'
+
+
+def get_priority_tier(user) -> str:
+    """Priority tier of the user an analysis runs for"""
+    if user is None:
+        return DEFAULT_TIER
+    if user.is_staff or user.is_superuser:
+        return 'staff'
+    if user.groups.filter(name=getattr(settings, 'ANALYSIS_PAID_GROUP', 'paid')).exists():
+        return 'paid'
+    return DEFAULT_TIER
+
+
+def get_tier_settings(tier: str) -> Dict[str, Any]:
+    """Weight, per-user concurrency cap and message priority of a tier"""
+    tiers = getattr(settings, 'ANALYSIS_PRIORITY_TIERS', {})
+    return tiers.get(tier) or tiers.get(DEFAULT_TIER) or {'weight': 1, 'max_concurrent': 2, 'priority': 6}
+
+
+def get_running_counts(exclude_idea_id: Optional[str] = None) -> Dict[Optional[int], int]:
+    """Analyses currently running per submitting user"""
+    running = BusinessIdea.objects.filter(status='ANALYZING')
+    if exclude_idea_id:
+        running = running.exclude(id=exclude_idea_id)
+    return {
+        row['submitted_by']: row['count']
+        for row in running.values('submitted_by').annotate(count=Count('id'))
+    }
+
+
+def has_capacity(user_id: Optional[int], tier: str, running: Dict[Optional[int], int]) -> bool:
+    """Whether one more analysis for ``user_id`` fits the tier cap and the global cap"""
+    if sum(running.values()) >= getattr(settings, 'ANALYSIS_GLOBAL_CONCURRENCY', 20):
+        return False
+    return running.get(user_id, 0) < get_tier_settings(tier)['max_concurrent']
+
+
+def slot_still_free(business_idea_id, user_id: Optional[int], tier: str) -> bool:
+    """
+    Whether an idea already marked ``ANALYZING`` fits the caps next to the other running ones.
+    
+    Slots are claimed by marking the idea running first and checking the caps
+    afterwards, so of two concurrent claims at least one counts the other and the
+    caps are never exceeded; a claim that finds them full backs out. Under a race
+    both may back out, leaving the slot to the next dispatch.
+    """
+    return has_capacity(user_id, tier, get_running_counts(exclude_idea_id=business_idea_id))
+
+
+def admit_analysis(business_idea: BusinessIdea, tier: str, agent_types: Optional[List[str]] = None,
+                   skip_triage: bool = False) -> Optional[AnalysisQueueEntry]:
+    """
+    Admission check at dispatch time.
+    
+    Returns None when the analysis may start now; the idea is then already
+    counted as running (see ``slot_still_free``). Otherwise the idea is marked
+    ``QUEUE`` and the returned entry holds it until ``select_entries_to_dispatch``
+    picks it. A user's ideas are admitted in submission order, so a new idea also
+    waits while older ones of the same user are queued.
+    """
+    # A repeated request for an idea that is already waiting keeps its place
+    waiting = AnalysisQueueEntry.objects.filter(business_idea=business_idea, status='WAITING').first()
+    if waiting:
+        return waiting
+    
+    user = business_idea.submitted_by
+    user_id = user.id if user else None
+    
+    if AnalysisQueueEntry.objects.filter(user_id=user_id, status='WAITING').exists():
+        return enqueue_analysis(business_idea, tier, agent_types=agent_types, skip_triage=skip_triage)
+    
+    BusinessIdea.objects.filter(id=business_idea.id).update(status='ANALYZING', updated_at=timezone.now())
+    if slot_still_free(business_idea.id, user_id, tier):
+        business_idea.status = 'ANALYZING'
+        return None
+    
+    return enqueue_analysis(business_idea, tier, agent_types=agent_types, skip_triage=skip_triage)
+
+
+def enqueue_analysis(business_idea: BusinessIdea, tier: str, agent_types: Optional[List[str]] = None,
+                     skip_triage: bool = False, not_before: Optional[datetime] = None) -> AnalysisQueueEntry:
+    """Hold the idea in the fair-share queue, not dispatched before ``not_before`` if given"""
+    entry = AnalysisQueueEntry.objects.create(
+        business_idea=business_idea,
+        user=business_idea.submitted_by,
+        priority_tier=tier,
+        agent_types=agent_types,
+        skip_triage=skip_triage,
+        not_before=not_before
+    )
+    business_idea.status = 'QUEUE'
+    business_idea.save(update_fields=['status', 'updated_at'])
+    return entry
+
+
+def _fair_share_order(waiting: Dict[Optional[int], deque], running: Dict[Optional[int], int],
+                      enforce_caps: bool = True) -> Iterator[AnalysisQueueEntry]:
+    """
+    Yield waiting entries by weighted fair queuing, counting each as running once picked.
+    
+    Each round the user with the lowest running/weight ratio gets the next slot;
+    ties go to the higher-priority tier, then the oldest entry. With
+    ``enforce_caps`` users at their tier cap are skipped.
+    """
+    def share(user_id):
+        tier = get_tier_settings(waiting[user_id][0].priority_tier)
+        return (running[user_id] / tier['weight'], tier['priority'], waiting[user_id][0].created_at)
+    
+    while True:
+        candidates = [
+            user_id for user_id, entries in waiting.items()
+            if entries and (not enforce_caps
+                            or running[user_id] < get_tier_settings(entries[0].priority_tier)['max_concurrent'])
+        ]
+        if not candidates:
+            return
+        
+        user_id = min(candidates, key=share)
+        running[user_id] += 1
+        yield waiting[user_id].popleft()
+
+
+def _waiting_by_user(pending: Optional[AnalysisQueueEntry] = None) -> Dict[Optional[int], deque]:
+    """Dispatchable waiting entries per user in submission order, with ``pending`` ranked among them"""
+    now = timezone.now()
+    entries = AnalysisQueueEntry.objects.filter(status='WAITING').filter(
+        Q(not_before__isnull=True) | Q(not_before__lte=now)
+    ).order_by('created_at')
+    if pending and pending.pk:
+        entries = entries.exclude(id=pending.pk)
+    
+    entries = list(entries)
+    if pending:
+        entries.append(pending)
+        entries.sort(key=lambda entry: entry.created_at)
+    
+    waiting = defaultdict(deque)
+    for entry in entries:
+        waiting[entry.user_id].append(entry)
+    return waiting
+
+
+def select_entries_to_dispatch() -> List[AnalysisQueueEntry]:
+    """Pick the waiting analyses that fit the free slots, by weighted fair queuing"""
+    running = defaultdict(int, get_running_counts())
+    free_slots = getattr(settings, 'ANALYSIS_GLOBAL_CONCURRENCY', 20) - sum(running.values())
+    if free_slots <= 0:
+        return []
+    return list(islice(_fair_share_order(_waiting_by_user(), running), free_slots))
+
+
+def get_dispatch_position(entry: AnalysisQueueEntry) -> int:
+    """
+    Number of waiting analyses fair share dispatches before ``entry``.
+    
+    ``entry`` may be unsaved (with ``created_at`` set), to rank a submission
+    before it is queued. Caps are not enforced: a capped user only waits for
+    their own analyses to finish, and running counts grow as entries are
+    picked, which orders later rounds the same way dispatch will.
+    """
+    running = defaultdict(int, get_running_counts(exclude_idea_id=entry.business_idea_id))
+    for position, dispatched in enumerate(_fair_share_order(_waiting_by_user(entry), running, enforce_caps=False)):
+        if dispatched is entry:
+            return position
+    return 0
+
+
+def get_fair_share_metrics() -> Dict[str, Any]:
+    """Per-user running analyses, queue depth and queue wait times"""
+    now = timezone.now()
+    running = get_running_counts()
+    
+    queued = {
+        row['user']: row
+        for row in AnalysisQueueEntry.objects.filter(status='WAITING')
+        .values('user')
+        .annotate(queue_depth=Count('id'), oldest=Min('created_at'))
+    }
+    waited = {
+        row['user']: row
+        for row in AnalysisQueueEntry.objects.filter(
+            status='DISPATCHED',
+            dispatched_at__gte=now - timedelta(hours=24)
+        )
+        .values('user')
+        .annotate(
+            dispatched=Count('id'),
+            average_wait=Avg(ExpressionWrapper(F('dispatched_at') - F('created_at'), output_field=DurationField()))
+        )
+    }
+    
+    user_ids = set(running) | set(queued) | set(waited)
+    usernames = dict(User.objects.filter(id__in=[user_id for user_id in user_ids if user_id])
+                     .values_list('id', 'username'))
+    
+    users = []
+    for user_id in user_ids:
+        queue_row = queued.get(user_id, {})
+        wait_row = waited.get(user_id, {})
+        average_wait = wait_row.get('average_wait')
+        users.append({
+            'user_id': user_id,
+            'username': usernames.get(user_id),
+            'running': running.get(user_id, 0),
+            'queue_depth': queue_row.get('queue_depth', 0),
+            'oldest_wait_seconds': round((now - queue_row['oldest']).total_seconds(), 1) if queue_row else 0,
+            'dispatched_24h': wait_row.get('dispatched', 0),
+            'average_wait_seconds_24h': round(average_wait.total_seconds(), 1) if average_wait else 0,
+        })
+    users.sort(key=lambda row: (-row['queue_depth'], -row['running']))
+    
+    return {
+        'global_limit': getattr(settings, 'ANALYSIS_GLOBAL_CONCURRENCY', 20),
+        'running': sum(running.values()),
+        'queued': sum(row['queue_depth'] for row in users),
+        'users': users,
+    }
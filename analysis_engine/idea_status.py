@@ -0,0 +1,99 @@
+"""
+Cached Status Snapshots for Idea Polling
+
+Every open idea page polls its status every few seconds. The snapshot (idea
+status, report counts and per-agent status) is built from two queries and kept
+in the shared cache together with a strong ETag, so unchanged polls are answered
+with 304 from the cache without querying the database. Saves of ideas and agent
+reports drop the snapshot (see ``analysis_engine.signals``); bulk ``update()``s
+don't send signals and are picked up when the short TTL expires.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import JSONField, OuterRef, Subquery
+
+from analysis_engine.models import AgentReport, AnalysisWorkflow, BusinessIdea
+from analysis_engine.tasks import ANALYSIS_AGENT_TYPES
+
+IDEA_STATUS_KEY = 'analysis:idea-status:{business_idea_id}'
+
+
+def with_scheduled_agents(queryset):
+    """Annotate ideas with the agent types of their latest workflow"""
+    latest_workflow = AnalysisWorkflow.objects.filter(
+        business_idea=OuterRef('pk')
+    ).order_by('-created_at').values('agent_types')[:1]
+    return queryset.annotate(scheduled_agents=Subquery(latest_workflow, output_field=JSONField()))
+
+
+def get_cached_idea_status(business_idea_id, user_id: int) -> Optional[Dict[str, Any]]:
+    """Cached snapshot ({'etag', 'payload'}) of an idea owned by ``user_id``, if any"""
+    snapshot = cache.get(IDEA_STATUS_KEY.format(business_idea_id=business_idea_id))
+    if snapshot and snapshot['user_id'] == user_id:
+        return snapshot
+    return None
+
+
+def build_idea_status(business_idea: BusinessIdea) -> Dict[str, Any]:
+    """
+    Build and cache the status snapshot of an idea.
+    
+    ``business_idea`` should come from ``with_scheduled_agents`` so progress is
+    measured against the agents actually scheduled. The reports (one per agent type)
+    are read in a single query and counted in the same pass.
+    """
+    scheduled_agents: List[str] = getattr(business_idea, 'scheduled_agents', None) or ANALYSIS_AGENT_TYPES
+    reports = list(AgentReport.objects.filter(business_idea=business_idea).values_list(
+        'agent_type', 'status', 'agent_score', 'created_at', 'completed_at'
+    ))
+    
+    counts = {'COMPLETED': 0, 'FAILED': 0, 'IN_PROGRESS': 0}
+    agent_status = {}
+    for agent_type, status, score, created_at, _ in reports:
+        if agent_type in scheduled_agents and status in counts:
+            counts[status] += 1
+        agent_status[agent_type] = {
+            'status': status,
+            'score': score,
+            'created_at': created_at.isoformat() if created_at else None,
+        }
+    for agent_type in scheduled_agents:
+        agent_status.setdefault(agent_type, {'status': 'PENDING', 'score': None, 'created_at': None})
+    
+    payload = {
+        'status': business_idea.status,
+        'overall_score': business_idea.overall_score,
+        'recommendation': business_idea.recommendation,
+        'progress_percentage': round(counts['COMPLETED'] / len(scheduled_agents) * 100, 1),
+        'total_agents': len(scheduled_agents),
+        'completed_reports': counts['COMPLETED'],
+        'failed_reports': counts['FAILED'],
+        'in_progress_reports': counts['IN_PROGRESS'],
+        'agent_status': agent_status,
+        'is_complete': business_idea.status == 'COMPLETED',
+        'last_updated': business_idea.updated_at.isoformat(),
+    }
+    
+    # Strong validator over the idea row version and every report version
+    version = json.dumps([business_idea.updated_at, business_idea.status, sorted(reports)], default=str)
+    snapshot = {
+        'user_id': business_idea.submitted_by_id,
+        'etag': f'"{hashlib.sha1(version.encode("utf-8")).hexdigest()}"',
+        'payload': payload,
+    }
+    cache.set(
+        IDEA_STATUS_KEY.format(business_idea_id=business_idea.id),
+        snapshot,
+        getattr(settings, 'IDEA_STATUS_CACHE_TTL', 5)
+    )
+    return snapshot
+
+
+def invalidate_idea_status(business_idea_id):
+    """Drop the cached snapshot after an idea or one of its reports changed"""
+    cache.delete(IDEA_STATUS_KEY.format(business_idea_id=business_idea_id))
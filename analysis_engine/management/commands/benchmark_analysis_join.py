@@ -0,0 +1,145 @@
+import asyncio
+import statistics
+import time
+from collections import Counter
+from unittest import mock
+
+from celery.contrib.testing.worker import start_worker
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.test.utils import override_settings
+from redis.connection import AbstractConnection
+
+from agent_system.base_agents import AgentResponse
+from ai_company.celery import app
+from analysis_engine.models import AgentReport, BusinessIdea, FinalAnalysisReport
+from analysis_engine.tasks import orchestrate_business_analysis
+
+BENCHMARK_TITLE = '[join benchmark]'
+
+
+class Command(BaseCommand):
+    help = ('Compare the chord and counter joins of the agent fan-out: join latency and '
+            'Redis commands per idea. Needs a reachable REDIS_URL; runs its own worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ideas', type=int, default=20, help='Ideas analysed per join mode')
+        parser.add_argument('--mode', choices=['chord', 'counter', 'both'], default='both')
+        parser.add_argument('--agent-latency', type=float, default=0.0,
+                            help='Simulated seconds per agent call')
+        parser.add_argument('--timeout', type=float, default=120.0,
+                            help='Seconds to wait for all final reports per mode')
+
+    def handle(self, *args, **options):
+        modes = ['chord', 'counter'] if options['mode'] == 'both' else [options['mode']]
+        agent_latency = options['agent_latency']
+
+        async def instant_analysis(agent, context):
+            if agent_latency:
+                await asyncio.sleep(agent_latency)
+            return AgentResponse(
+                success=True,
+                content='{"score": 60, "overall_score": 60}',
+                structured_data={'score': 60, 'overall_score': 60},
+                confidence=80.0,
+                execution_time=agent_latency,
+                token_usage=0,
+                model_used='benchmark'
+            )
+
+        # Every command goes out through send_command, or pack_commands for pipelines
+        commands = Counter()
+        original_send_command = AbstractConnection.send_command
+        original_pack_commands = AbstractConnection.pack_commands
+
+        def counting_send_command(connection, *args, **kwargs):
+            commands[str(args[0]).upper()] += 1
+            return original_send_command(connection, *args, **kwargs)
+
+        def counting_pack_commands(connection, pipeline_commands):
+            pipeline_commands = list(pipeline_commands)
+            for command in pipeline_commands:
+                commands[str(command[0]).upper()] += 1
+            return original_pack_commands(connection, pipeline_commands)
+
+        always_eager = app.conf.task_always_eager
+        app.conf.task_always_eager = False
+
+        results = {}
+        try:
+            with mock.patch('agent_system.base_agents.BaseAIAgent.analyze', instant_analysis), \
+                    mock.patch.object(AbstractConnection, 'send_command', counting_send_command), \
+                    mock.patch.object(AbstractConnection, 'pack_commands', counting_pack_commands), \
+                    start_worker(app, pool='solo', perform_ping_check=False,
+                                 queues=['analysis', 'agents', 'reports']):
+                for mode in modes:
+                    commands.clear()
+                    with override_settings(ANALYSIS_JOIN_MODE=mode, TRIAGE_ENABLED=False,
+                                       EARLY_DECISION_ENABLED=False, MODEL_TIERING_ENABLED=False):
+                        results[mode] = self._run(options['ideas'], options['timeout'])
+                    results[mode]['commands'] = dict(commands)
+        except ConnectionError as e:
+            raise CommandError(f"Redis is not reachable at {settings.REDIS_URL}: {e}")
+        finally:
+            app.conf.task_always_eager = always_eager
+            BusinessIdea.objects.filter(title__startswith=BENCHMARK_TITLE).delete()
+
+        self._report(results, options['ideas'])
+
+    def _run(self, idea_count, timeout):
+        """Analyse ``idea_count`` ideas and wait until each has a final report"""
+        cache.clear()
+        ideas = [
+            BusinessIdea.objects.create(
+                title=f"{BENCHMARK_TITLE} {index}",
+                description='Synthetic idea for the join benchmark'
+            )
+            for index in range(idea_count)
+        ]
+
+        started = time.monotonic()
+        for idea in ideas:
+            orchestrate_business_analysis.delay(str(idea.id))
+
+        idea_ids = [idea.id for idea in ideas]
+        while FinalAnalysisReport.objects.filter(business_idea_id__in=idea_ids).count() < idea_count:
+            if time.monotonic() - started > timeout:
+                raise CommandError(f"Timed out waiting for final reports after {timeout}s")
+            time.sleep(0.1)
+        elapsed = time.monotonic() - started
+
+        # Join latency: last agent report written -> final report created
+        last_agent_finished = {
+            row['business_idea_id']: row['last_completed']
+            for row in AgentReport.objects.filter(business_idea_id__in=idea_ids)
+            .values('business_idea_id').annotate(last_completed=Max('completed_at'))
+        }
+        join_latencies = [
+            (report.created_at - last_agent_finished[report.business_idea_id]).total_seconds() * 1000
+            for report in FinalAnalysisReport.objects.filter(business_idea_id__in=idea_ids)
+        ]
+
+        BusinessIdea.objects.filter(id__in=idea_ids).delete()
+        return {'elapsed': elapsed, 'join_latencies': join_latencies}
+
+    def _report(self, results, idea_count):
+        self.stdout.write(f"Join benchmark: {idea_count} ideas per mode, solo worker")
+        self.stdout.write(f"{'mode':<10}{'p50 join ms':>14}{'p95 join ms':>14}"
+                          f"{'redis cmds/idea':>18}{'wall s':>10}")
+        for mode, result in results.items():
+            latencies = sorted(result['join_latencies'])
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            # Idle BRPOP polling depends on wall time, not on the join, so it is excluded
+            join_commands = sum(
+                count for command, count in result['commands'].items() if command != 'BRPOP'
+            )
+            self.stdout.write(
+                f"{mode:<10}{statistics.median(latencies):>14.1f}{p95:>14.1f}"
+                f"{join_commands / idea_count:>18.1f}{result['elapsed']:>10.1f}"
+            )
+        for mode, result in results.items():
+            top = Counter(result['commands']).most_common(8)
+            self.stdout.write(f"{mode} top commands: " + ', '.join(f"{name}={count}" for name, count in top))
+
@@ -0,0 +1,111 @@
+import uuid
+
+from celery import current_app
+from django.core.management.base import BaseCommand, CommandError
+from kombu.serialization import dumps
+
+from analysis_engine.context_cache import build_analysis_context, get_context_version
+from analysis_engine.models import BusinessIdea
+from analysis_engine.tasks import (
+    ANALYSIS_AGENT_TYPES, analyze_with_agent, create_final_analysis_report
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure the broker and result-backend bytes one analysis moves through Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idea', help='Business idea id to measure (default: a synthetic idea)')
+        parser.add_argument('--description-length', type=int, default=2000,
+                            help='Description length of the synthetic idea')
+
+    def handle(self, *args, **options):
+        if options['idea']:
+            try:
+                business_idea = BusinessIdea.objects.get(id=options['idea'])
+            except BusinessIdea.DoesNotExist:
+                raise CommandError(f"Business idea {options['idea']} not found")
+        else:
+            business_idea = BusinessIdea(
+                id=uuid.uuid4(),
+                title='Synthetic idea for payload measurement',
+                description='x' * options['description_length'],
+                industry='TECH',
+                target_market='Small businesses',
+                estimated_budget=250000
+            )
+
+        business_idea_id = str(business_idea.id)
+        context = build_analysis_context(business_idea)
+
+        # Previous payloads: the full context in every agent task and result dicts
+        # passed through the chord
+        legacy = self._measure(
+            business_idea_id,
+            agent_args=lambda agent_type: (business_idea_id, agent_type, context.__dict__),
+            agent_result=lambda agent_type: {
+                'agent_type': agent_type,
+                'success': True,
+                'score': 75,
+                'report_id': str(uuid.uuid4())
+            }
+        )
+
+        # Current payloads: idea id + context version, minimal status tuples
+        context_version = get_context_version(context)
+        current = self._measure(
+            business_idea_id,
+            agent_args=lambda agent_type: (business_idea_id, agent_type, context_version),
+            agent_result=lambda agent_type: (agent_type, 'COMPLETED')
+        )
+
+        self.stdout.write(f"Payload bytes per analysis ({len(ANALYSIS_AGENT_TYPES)} agents, "
+                          f"description {len(business_idea.description)} chars):")
+        self.stdout.write(f"{'':<26}{'before':>10}{'after':>10}")
+        for key, label in [
+            ('agent_messages', 'Agent task messages'),
+            ('agent_results', 'Agent results (set+get)'),
+            ('callback_message', 'Chord callback message'),
+            ('total', 'Total'),
+        ]:
+            self.stdout.write(f"{label:<26}{legacy[key]:>10}{current[key]:>10}")
+
+        reduction = (1 - current['total'] / legacy['total']) * 100 if legacy['total'] else 0
+        self.stdout.write(self.style.SUCCESS(f"Reduction: {reduction:.1f}%"))
+
+    def _measure(self, business_idea_id, agent_args, agent_result):
+        """Serialize the messages one analysis puts on the broker, as Celery would"""
+        callback = create_final_analysis_report.s(business_idea_id, rerun_agent_types=None)
+
+        agent_messages = 0
+        results = []
+        for agent_type in ANALYSIS_AGENT_TYPES:
+            agent_messages += self._message_size(
+                analyze_with_agent.name, agent_args(agent_type), {}, chord=callback
+            )
+            results.append(agent_result(agent_type))
+
+        # Each result is written by the worker and read back when the chord joins
+        agent_results = sum(self._encoded_size(result) for result in results) * 2
+
+        callback_message = self._message_size(
+            callback.task, (results,) + tuple(callback.args), dict(callback.kwargs)
+        )
+
+        return {
+            'agent_messages': agent_messages,
+            'agent_results': agent_results,
+            'callback_message': callback_message,
+            'total': agent_messages + agent_results + callback_message,
+        }
+
+    def _message_size(self, task_name, args, kwargs, chord=None):
+        message = current_app.amqp.as_task_v2(
+            str(uuid.uuid4()), task_name, args=args, kwargs=kwargs,
+            chord=chord, group_id=str(uuid.uuid4()) if chord else None
+        )
+        return self._encoded_size(message.body) + self._encoded_size(message.headers)
+
+    def _encoded_size(self, payload):
+        _, _, data = dumps(payload, serializer='json')
+        return len(data.encode('utf-8') if isinstance(data, str) else data)
@@ -0,0 +1,28 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_engine.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily analytics rollups from the idea and report tables. '
+            'Run once after deploying them; the nightly beat task keeps them reconciled.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild ideas submitted and reports created on or after '
+                                             'this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['since']}")
+
+        started = time.monotonic()
+        counts = rebuild_rollups(since)
+        self.stdout.write(f"Rebuilt {counts['idea_rollups']} idea rollups and {counts['agent_rollups']} "
+                          f"agent rollups in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analysis_engine.search import install_search_indexes
+
+
+class Command(BaseCommand):
+    help = ('Recreate any missing full-text search tables, triggers or columns and repopulate the '
+            'SQLite search index from the idea and report tables.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        install_search_indexes()
+        self.stdout.write(f"Rebuilt the search index in {time.monotonic() - started:.1f}s")
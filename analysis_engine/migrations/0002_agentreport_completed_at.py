@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentreport",
+            name="completed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the latest run of this agent finished",
+                null=True,
+            ),
+        ),
+    ]
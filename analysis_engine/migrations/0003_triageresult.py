@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0002_agentreport_completed_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TriageResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "viability_score",
+                    models.IntegerField(help_text="Coarse viability score 1-100"),
+                ),
+                (
+                    "threshold",
+                    models.IntegerField(
+                        help_text="Threshold in effect when the idea was screened"
+                    ),
+                ),
+                ("passed", models.BooleanField(default=True)),
+                ("rationale", models.TextField(blank=True)),
+                ("red_flags", models.JSONField(blank=True, default=list)),
+                ("llm_model_used", models.CharField(blank=True, max_length=50)),
+                ("token_usage", models.IntegerField(blank=True, null=True)),
+                (
+                    "cost_estimate",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=8, null=True
+                    ),
+                ),
+                ("execution_time", models.DurationField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("full_analysis_requested", models.BooleanField(default=False)),
+                ("full_analysis_score", models.IntegerField(blank=True, null=True)),
+                (
+                    "business_idea",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="triage",
+                        to="analysis_engine.businessidea",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["passed"], name="analysis_en_passed_e64556_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0003_triageresult"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="finalanalysisreport",
+            name="early_decision_reason",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="finalanalysisreport",
+            name="is_early_decision",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="agentreport",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("IN_PROGRESS", "In Progress"),
+                    ("COMPLETED", "Completed"),
+                    ("FAILED", "Failed"),
+                    ("RETRYING", "Retrying"),
+                    ("CANCELLED", "Cancelled"),
+                ],
+                default="PENDING",
+                max_length=20,
+            ),
+        ),
+    ]
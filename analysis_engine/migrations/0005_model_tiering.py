@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0004_early_decision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentreport",
+            name="difficulty_score",
+            field=models.IntegerField(
+                blank=True, help_text="Estimated idea difficulty 0-100", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentreport",
+            name="model_tier",
+            field=models.CharField(
+                blank=True, help_text="Model tier chosen for this run", max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentreport",
+            name="parse_failed",
+            field=models.BooleanField(
+                default=False, help_text="Response had no parseable JSON"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="agentreport",
+            index=models.Index(
+                fields=["agent_type", "model_tier"],
+                name="analysis_en_agent_t_05865c_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0005_model_tiering"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisWorkflow",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("agent_types", models.JSONField(default=list)),
+                (
+                    "selective",
+                    models.BooleanField(
+                        default=False, help_text="Selective re-run of some agents"
+                    ),
+                ),
+                ("pending_count", models.PositiveIntegerField(default=0)),
+                ("finalized", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finalized_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "business_idea",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="workflows",
+                        to="analysis_engine.businessidea",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["business_idea", "finalized"],
+                        name="analysis_en_busines_01e0b7_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0007_analysisqueueentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReaperAction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("REQUEUED_AGENT", "Requeued agent"),
+                            ("FAILED_AGENT", "Failed agent after max attempts"),
+                            ("RELEASED_TASK", "Released task of a finished workflow"),
+                            ("REQUEUED_REPORT", "Requeued final report"),
+                            ("FAILED_ANALYSIS", "Failed analysis"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("agent_type", models.CharField(blank=True, max_length=20)),
+                ("task_id", models.CharField(blank=True, max_length=255)),
+                ("attempt", models.PositiveSmallIntegerField(default=0)),
+                ("detail", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="analysistask",
+            name="attempt",
+            field=models.PositiveSmallIntegerField(
+                default=1, help_text="Dispatch of this agent within its workflow"
+            ),
+        ),
+        migrations.AddField(
+            model_name="analysistask",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="analysistask",
+            name="worker",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="analysistask",
+            name="workflow",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="tasks",
+                to="analysis_engine.analysisworkflow",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="analysistask",
+            index=models.Index(
+                fields=["status", "lease_expires_at"],
+                name="analysis_en_status_6841b2_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reaperaction",
+            name="business_idea",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reaper_actions",
+                to="analysis_engine.businessidea",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reaperaction",
+            name="workflow",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="analysis_engine.analysisworkflow",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reaperaction",
+            index=models.Index(
+                fields=["action", "created_at"], name="analysis_en_action_f2d6f9_idx"
+            ),
+        ),
+    ]
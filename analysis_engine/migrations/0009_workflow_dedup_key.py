@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0008_task_leases"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysisworkflow",
+            name="dedup_key",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name="analysisworkflow",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("finalized", False), models.Q(("dedup_key", ""), _negated=True)
+                ),
+                fields=("dedup_key",),
+                name="unique_inflight_workflow",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0009_workflow_dedup_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentreport",
+            name="is_partial",
+            field=models.BooleanField(
+                default=False, help_text="Output truncated at the task time limit"
+            ),
+        ),
+    ]
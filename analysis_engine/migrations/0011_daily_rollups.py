@@ -0,0 +1,218 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:33
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("analysis_engine", "0010_agentreport_is_partial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyAgentRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateField(
+                        help_text="Submission date of the idea in the project time zone"
+                    ),
+                ),
+                (
+                    "industry",
+                    models.CharField(
+                        choices=[
+                            ("TECH", "Technology"),
+                            ("HEALTHCARE", "Healthcare"),
+                            ("FINANCE", "Finance"),
+                            ("EDUCATION", "Education"),
+                            ("RETAIL", "Retail"),
+                            ("MANUFACTURING", "Manufacturing"),
+                            ("SERVICES", "Services"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "agent_type",
+                    models.CharField(
+                        choices=[
+                            ("CEO", "Chief Executive Officer"),
+                            ("MARKET_RESEARCH", "Market Research Analyst"),
+                            ("FINANCIAL", "Financial Analyst"),
+                            ("MARKETING", "Marketing Strategist"),
+                            ("TECH_LEAD", "Technical Lead"),
+                            ("RISK_ANALYST", "Risk Analyst"),
+                            ("LEGAL", "Legal Advisor"),
+                            ("HR", "Human Resources"),
+                            ("OPERATIONS", "Operations Manager"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("IN_PROGRESS", "In Progress"),
+                            ("COMPLETED", "Completed"),
+                            ("FAILED", "Failed"),
+                            ("RETRYING", "Retrying"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("report_count", models.PositiveIntegerField(default=0)),
+                ("score_sum", models.BigIntegerField(default=0)),
+                ("score_count", models.PositiveIntegerField(default=0)),
+                (
+                    "confidence_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("confidence_count", models.PositiveIntegerField(default=0)),
+                ("token_sum", models.BigIntegerField(default=0)),
+                ("token_count", models.PositiveIntegerField(default=0)),
+                (
+                    "cost_sum",
+                    models.DecimalField(decimal_places=4, default=0, max_digits=14),
+                ),
+                ("cost_count", models.PositiveIntegerField(default=0)),
+                (
+                    "execution_time_sum",
+                    models.DurationField(default=datetime.timedelta),
+                ),
+                ("execution_time_count", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyIdeaRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateField(
+                        help_text="Submission date in the project time zone"
+                    ),
+                ),
+                (
+                    "industry",
+                    models.CharField(
+                        choices=[
+                            ("TECH", "Technology"),
+                            ("HEALTHCARE", "Healthcare"),
+                            ("FINANCE", "Finance"),
+                            ("EDUCATION", "Education"),
+                            ("RETAIL", "Retail"),
+                            ("MANUFACTURING", "Manufacturing"),
+                            ("SERVICES", "Services"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending Analysis"),
+                            ("QUEUE", "In Queue"),
+                            ("ANALYZING", "Being Analyzed"),
+                            ("COMPLETED", "Analysis Complete"),
+                            ("FAILED", "Analysis Failed"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("idea_count", models.PositiveIntegerField(default=0)),
+                (
+                    "score_sum",
+                    models.BigIntegerField(
+                        default=0, help_text="Sum of overall scores"
+                    ),
+                ),
+                (
+                    "score_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Ideas with an overall score"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "day"], name="analysis_en_user_id_45fea2_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyidearollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "user", "industry", "status"),
+                name="unique_daily_idea_rollup",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailyagentrollup",
+            index=models.Index(
+                fields=["user", "day"], name="analysis_en_user_id_426633_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyagentrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "user", "industry", "agent_type", "status"),
+                name="unique_daily_agent_rollup",
+            ),
+        ),
+    ]
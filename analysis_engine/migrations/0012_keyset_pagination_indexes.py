@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0011_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="agentreport",
+            index=models.Index(
+                fields=["created_at", "id"], name="analysis_en_created_1741b6_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="businessidea",
+            index=models.Index(
+                fields=["submitted_at", "id"], name="analysis_en_submitt_aefd68_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="businessidea",
+            index=models.Index(
+                fields=["submitted_by", "submitted_at", "id"],
+                name="analysis_en_submitt_962bd8_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Full-text search indexes: FTS5 tables and triggers on SQLite, generated
+# tsvector columns with GIN indexes on PostgreSQL (see analysis_engine.search)
+
+from django.db import migrations
+
+from analysis_engine.search import install_search_indexes, uninstall_search_indexes
+
+
+def install(apps, schema_editor):
+    install_search_indexes(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0012_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
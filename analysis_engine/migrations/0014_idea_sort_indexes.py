@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0013_search_indexes"),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name="businessidea",
+            new_name="idea_submitted_idx",
+            old_name="analysis_en_submitt_aefd68_idx",
+        ),
+        migrations.RenameIndex(
+            model_name="businessidea",
+            new_name="idea_user_submitted_idx",
+            old_name="analysis_en_submitt_962bd8_idx",
+        ),
+        migrations.AddIndex(
+            model_name="businessidea",
+            index=models.Index(
+                fields=["submitted_by", "status", "submitted_at", "id"],
+                name="idea_user_status_submitted_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="businessidea",
+            index=models.Index(
+                fields=["submitted_by", "overall_score", "id"],
+                name="idea_user_score_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="businessidea",
+            index=models.Index(
+                fields=["submitted_by", "title", "id"], name="idea_user_title_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0014_idea_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="triageresult",
+            name="context_version",
+            field=models.CharField(
+                blank=True,
+                help_text="Fingerprint of the idea input that was screened",
+                max_length=16,
+            ),
+        ),
+    ]
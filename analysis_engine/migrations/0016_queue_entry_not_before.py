@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0015_triage_context_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysisqueueentry",
+            name="not_before",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_engine", "0016_queue_entry_not_before"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dailyagentrollup",
+            name="day",
+            field=models.DateField(
+                help_text="Creation date of the report in the project time zone"
+            ),
+        ),
+    ]
@@ -0,0 +1,268 @@
+"""
+Difficulty-Based Model Tiering
+
+Picks a model tier per (agent, idea) from cheap features of the idea: description
+length, industry, budget and the triage score. Agents whose recent runs on a tier
+fail to produce parseable JSON too often are escalated to the next tier, so the
+large model is reserved for the cases where smaller ones underperform.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q
+
+from analysis_engine.models import AgentReport, BusinessIdea, TriageResult
+
+logger = logging.getLogger(__name__)
+
+# Industries whose analyses need more domain reasoning (regulation, capital intensity)
+COMPLEX_INDUSTRIES = {'FINANCE', 'HEALTHCARE', 'MANUFACTURING'}
+
+
+@dataclass
+class TierDecision:
+    """Model tier chosen for one agent run"""
+    tier: str
+    model: str
+    difficulty: int
+    features: Dict[str, Any] = field(default_factory=dict)
+    escalated_from: Optional[str] = None
+
+
+def get_tier_order() -> List[str]:
+    """Tier names from cheapest to most capable"""
+    return list(getattr(settings, 'MODEL_TIERS', {}).keys())
+
+
+def get_top_tier() -> str:
+    """The baseline tier every other tier is compared against"""
+    return get_tier_order()[-1]
+
+
+def get_tier_model(tier: str) -> str:
+    """Model name configured for a tier"""
+    return settings.MODEL_TIERS[tier]
+
+
+def estimate_difficulty(business_idea: BusinessIdea) -> Dict[str, Any]:
+    """
+    Score how hard an idea is to analyse (0-100) from features that cost no LLM call.
+    
+    Borderline triage scores add difficulty; clear passes or clear rejects do not.
+    """
+    description_length = len(business_idea.description or '')
+    budget = float(business_idea.estimated_budget) if business_idea.estimated_budget else None
+    
+    try:
+        triage_score = business_idea.triage.viability_score
+    except TriageResult.DoesNotExist:
+        triage_score = None
+    
+    difficulty = min(description_length / 2000, 1.0) * 40
+    
+    if business_idea.industry in COMPLEX_INDUSTRIES:
+        difficulty += 20
+    
+    if budget is not None:
+        if budget >= 1_000_000:
+            difficulty += 15
+        elif budget >= 100_000:
+            difficulty += 8
+    
+    if triage_score is not None:
+        difficulty += 25 * (1 - min(abs(triage_score - 50) / 50, 1.0))
+    else:
+        # Without a triage signal assume an average idea
+        difficulty += 12
+    
+    return {
+        'difficulty': int(round(min(difficulty, 100))),
+        'description_length': description_length,
+        'industry': business_idea.industry,
+        'estimated_budget': budget,
+        'triage_score': triage_score,
+    }
+
+
+def get_parse_failure_rates(agent_type: str) -> Dict[str, Dict[str, Any]]:
+    """Parse-failure rate per tier over the agent's most recent complete (not partial) tiered runs"""
+    window = getattr(settings, 'MODEL_TIER_HISTORY_WINDOW', 50)
+    
+    rates = {}
+    for tier in get_tier_order():
+        recent_ids = AgentReport.objects.filter(
+            agent_type=agent_type,
+            model_tier=tier,
+            status='COMPLETED',
+            is_partial=False
+        ).order_by('-completed_at').values('id')[:window]
+        
+        stats = AgentReport.objects.filter(id__in=recent_ids).aggregate(
+            runs=Count('id'),
+            failures=Count('id', filter=Q(parse_failed=True)),
+        )
+        rates[tier] = {
+            'runs': stats['runs'],
+            'failure_rate': stats['failures'] / stats['runs'] if stats['runs'] else 0.0,
+        }
+    
+    return rates
+
+
+def select_model_tier(agent_type: str, business_idea: BusinessIdea) -> TierDecision:
+    """Choose the cheapest tier expected to handle this agent/idea pair"""
+    tiers = get_tier_order()
+    features = estimate_difficulty(business_idea)
+    difficulty = features['difficulty']
+    
+    # Difficulty bands: one upper bound per tier except the top one
+    thresholds = getattr(settings, 'MODEL_TIER_THRESHOLDS', [])
+    index = len(tiers) - 1
+    for position, upper_bound in enumerate(thresholds[:len(tiers) - 1]):
+        if difficulty < upper_bound:
+            index = position
+            break
+    
+    # Some agents never go below a minimum tier
+    minimum_tier = getattr(settings, 'MODEL_TIER_AGENT_MINIMUM', {}).get(agent_type)
+    if minimum_tier in tiers:
+        index = max(index, tiers.index(minimum_tier))
+    
+    chosen_tier = tiers[index]
+    
+    # Escalate while the agent keeps failing to produce parseable output on this tier
+    min_samples = getattr(settings, 'MODEL_TIER_MIN_SAMPLES', 10)
+    max_failure_rate = getattr(settings, 'MODEL_TIER_MAX_PARSE_FAILURE_RATE', 0.2)
+    failure_rates = get_parse_failure_rates(agent_type)
+    while index < len(tiers) - 1:
+        tier_stats = failure_rates[tiers[index]]
+        if tier_stats['runs'] < min_samples or tier_stats['failure_rate'] <= max_failure_rate:
+            break
+        index += 1
+    
+    decision = TierDecision(
+        tier=tiers[index],
+        model=get_tier_model(tiers[index]),
+        difficulty=difficulty,
+        features=features,
+        escalated_from=chosen_tier if tiers[index] != chosen_tier else None
+    )
+    
+    logger.info(f"Routing {agent_type} for {business_idea.id} to {decision.tier} tier "
+                f"({decision.model}, difficulty {difficulty}"
+                f"{f', escalated from {chosen_tier}' if decision.escalated_from else ''})")
+    
+    return decision
+
+
+def is_parse_failure(raw_response: str) -> bool:
+    """
+    Whether the agent had to fall back to text extraction.
+    
+    Mirrors the agents' parse_response: output without a decodable JSON object
+    is handled by the fallback parser.
+    """
+    json_match = re.search(r'\{.*\}', raw_response or '', re.DOTALL)
+    if not json_match:
+        return True
+    try:
+        json.loads(json_match.group())
+    except json.JSONDecodeError:
+        return True
+    return False
+
+
+def get_tiering_savings() -> Dict[str, Any]:
+    """
+    Latency and cost of tiered runs compared with always using the top tier.
+    
+    The top-tier baseline uses the same token counts priced at the top model, and
+    the average top-tier latency of the same agent (falling back to the run's own
+    latency when the agent has no top-tier history yet).
+    """
+    from analysis_engine.tasks import _estimate_cost
+    
+    top_tier = get_top_tier()
+    top_model = get_tier_model(top_tier)
+    
+    tiered_reports = AgentReport.objects.filter(
+        status='COMPLETED'
+    ).exclude(model_tier='')
+    
+    top_tier_latency = {
+        row['agent_type']: row['avg_time']
+        for row in tiered_reports.filter(
+            model_tier=top_tier,
+            execution_time__isnull=False
+        ).values('agent_type').annotate(avg_time=Avg('execution_time'))
+    }
+    
+    tiers = {
+        tier: {
+            'runs': 0, 'parse_failures': 0, 'cost': 0.0, 'baseline_cost': 0.0,
+            'seconds': 0.0, 'baseline_seconds': 0.0,
+        }
+        for tier in get_tier_order()
+    }
+    by_agent = {}
+    
+    for report in tiered_reports.only(
+        'agent_type', 'model_tier', 'parse_failed', 'is_partial', 'token_usage',
+        'cost_estimate', 'execution_time'
+    ).iterator():
+        if report.model_tier not in tiers:
+            continue
+        stats = tiers[report.model_tier]
+        seconds = report.execution_time.total_seconds() if report.execution_time else 0.0
+        baseline_latency = top_tier_latency.get(report.agent_type)
+        
+        stats['runs'] += 1
+        stats['parse_failures'] += int(report.parse_failed and not report.is_partial)
+        stats['cost'] += float(report.cost_estimate or 0)
+        stats['baseline_cost'] += _estimate_cost(top_model, report.token_usage or 0)
+        stats['seconds'] += seconds
+        stats['baseline_seconds'] += baseline_latency.total_seconds() if baseline_latency else seconds
+    
+    for row in tiered_reports.values('agent_type', 'model_tier').annotate(
+        runs=Count('id'),
+        parse_failures=Count('id', filter=Q(parse_failed=True, is_partial=False))
+    ):
+        by_agent.setdefault(row['agent_type'], {})[row['model_tier']] = {
+            'runs': row['runs'],
+            'parse_failure_rate': round(row['parse_failures'] / row['runs'] * 100, 1),
+        }
+    
+    total_cost = sum(stats['cost'] for stats in tiers.values())
+    baseline_cost = sum(stats['baseline_cost'] for stats in tiers.values())
+    total_seconds = sum(stats['seconds'] for stats in tiers.values())
+    baseline_seconds = sum(stats['baseline_seconds'] for stats in tiers.values())
+    
+    return {
+        'top_tier': top_tier,
+        'tiers': {
+            tier: {
+                'model': get_tier_model(tier),
+                'runs': stats['runs'],
+                'parse_failure_rate': (
+                    round(stats['parse_failures'] / stats['runs'] * 100, 1) if stats['runs'] else None
+                ),
+                'cost': round(stats['cost'], 4),
+                'average_seconds': round(stats['seconds'] / stats['runs'], 2) if stats['runs'] else None,
+            }
+            for tier, stats in tiers.items()
+        },
+        'by_agent': by_agent,
+        'savings': {
+            'cost': round(total_cost, 4),
+            'baseline_cost': round(baseline_cost, 4),
+            'cost_saved': round(baseline_cost - total_cost, 4),
+            'agent_seconds': round(total_seconds, 1),
+            'baseline_agent_seconds': round(baseline_seconds, 1),
+            'agent_seconds_saved': round(baseline_seconds - total_seconds, 1),
+        },
+    }
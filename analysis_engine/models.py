@@ -1,8 +1,29 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 import uuid
+from datetime import timedelta
 from django.contrib.auth.models import User
 
 
+class BusinessIdeaQuerySet(models.QuerySet):
+    """Business idea querysets with list-page helpers"""
+    
+    def with_progress(self):
+        """
+        Annotate ``completed_report_count`` for ``progress_percentage`` and join the submitter.
+        
+        The count is a correlated subquery rather than a grouped join, so it is only
+        evaluated for the rows actually fetched (one page) and is dropped from
+        ``count()`` queries.
+        """
+        completed_reports = AgentReport.objects.filter(
+            business_idea=models.OuterRef('pk'), status='COMPLETED'
+        ).order_by().values('business_idea').annotate(count=models.Count('id')).values('count')
+        return self.select_related('submitted_by').annotate(
+            completed_report_count=Coalesce(models.Subquery(completed_reports), 0)
+        )
+
+
 class BusinessIdea(models.Model):
     """Core model representing a business idea to be analyzed"""
     
@@ -47,12 +68,29 @@ class BusinessIdea(models.Model):
     recommendation = models.CharField(max_length=50, blank=True)
     confidence_level = models.CharField(max_length=20, blank=True)
     
+    # Sort keys offered on a user's idea list; each is served by a (submitted_by, key, id) index
+    SORT_CHOICES = [
+        ('-submitted_at', 'Newest First'),
+        ('submitted_at', 'Oldest First'),
+        ('-overall_score', 'Highest Score'),
+        ('title', 'Title A-Z'),
+    ]
+    
+    objects = BusinessIdeaQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-submitted_at']
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['industry']),
             models.Index(fields=['overall_score']),
+            # Keyset pagination of all ideas and of one user's ideas, per sort key and status
+            models.Index(fields=['submitted_at', 'id'], name='idea_submitted_idx'),
+            models.Index(fields=['submitted_by', 'submitted_at', 'id'], name='idea_user_submitted_idx'),
+            models.Index(fields=['submitted_by', 'status', 'submitted_at', 'id'],
+                         name='idea_user_status_submitted_idx'),
+            models.Index(fields=['submitted_by', 'overall_score', 'id'], name='idea_user_score_idx'),
+            models.Index(fields=['submitted_by', 'title', 'id'], name='idea_user_title_idx'),
         ]
 
     def __str__(self):
@@ -66,7 +104,10 @@ class BusinessIdea(models.Model):
     def progress_percentage(self):
         """Calculate analysis progress based on completed reports"""
         total_agents = AgentReport.AGENT_TYPES.__len__()
-        completed_reports = self.agent_reports.count()
+        # Annotated by BusinessIdea.objects.with_progress() on list querysets
+        completed_reports = getattr(self, 'completed_report_count', None)
+        if completed_reports is None:
+            completed_reports = self.agent_reports.filter(status='COMPLETED').count()
         return (completed_reports / total_agents) * 100 if total_agents > 0 else 0
 
 
@@ -97,11 +138,18 @@ class AgentReport(models.Model):
     
     # Execution Details
     created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True, help_text="When the latest run of this agent finished")
     execution_time = models.DurationField(null=True, blank=True)
     llm_model_used = models.CharField(max_length=50, blank=True)
     token_usage = models.IntegerField(null=True, blank=True)
     cost_estimate = models.DecimalField(max_digits=8, decimal_places=4, null=True, blank=True)
     
+    # Model Routing
+    model_tier = models.CharField(max_length=20, blank=True, help_text="Model tier chosen for this run")
+    difficulty_score = models.IntegerField(null=True, blank=True, help_text="Estimated idea difficulty 0-100")
+    parse_failed = models.BooleanField(default=False, help_text="Response had no parseable JSON")
+    is_partial = models.BooleanField(default=False, help_text="Output truncated at the task time limit")
+    
     # Status
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -109,6 +157,7 @@ class AgentReport(models.Model):
         ('COMPLETED', 'Completed'),
         ('FAILED', 'Failed'),
         ('RETRYING', 'Retrying'),
+        ('CANCELLED', 'Cancelled'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     error_message = models.TextField(blank=True)
@@ -119,6 +168,9 @@ class AgentReport(models.Model):
         indexes = [
             models.Index(fields=['agent_type', 'status']),
             models.Index(fields=['business_idea', 'status']),
+            models.Index(fields=['agent_type', 'model_tier']),
+            # Keyset pagination of the report list
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def __str__(self):
@@ -164,6 +216,10 @@ class FinalAnalysisReport(models.Model):
     generated_by_agent = models.CharField(max_length=50, default='CEO')
     total_cost = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
     
+    # Early decision: remaining agents were cancelled after a decisive agent result
+    is_early_decision = models.BooleanField(default=False)
+    early_decision_reason = models.CharField(max_length=255, blank=True)
+    
     class Meta:
         ordering = ['-created_at']
 
@@ -171,10 +227,127 @@ class FinalAnalysisReport(models.Model):
         return f"Final Report: {self.business_idea.title}"
 
 
+class TriageResult(models.Model):
+    """Outcome of the cheap pre-screen run before the full multi-agent analysis"""
+    
+    business_idea = models.OneToOneField(BusinessIdea, on_delete=models.CASCADE, related_name='triage')
+    
+    # Screening outcome
+    viability_score = models.IntegerField(help_text="Coarse viability score 1-100")
+    threshold = models.IntegerField(help_text="Threshold in effect when the idea was screened")
+    passed = models.BooleanField(default=True)
+    rationale = models.TextField(blank=True)
+    red_flags = models.JSONField(default=list, blank=True)
+    context_version = models.CharField(max_length=16, blank=True,
+                                       help_text="Fingerprint of the idea input that was screened")
+    
+    # Execution Details
+    llm_model_used = models.CharField(max_length=50, blank=True)
+    token_usage = models.IntegerField(null=True, blank=True)
+    cost_estimate = models.DecimalField(max_digits=8, decimal_places=4, null=True, blank=True)
+    execution_time = models.DurationField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    # Accuracy tracking: filled in once a full analysis exists for the idea
+    full_analysis_requested = models.BooleanField(default=False)
+    full_analysis_score = models.IntegerField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['passed']),
+        ]
+    
+    def __str__(self):
+        outcome = 'passed' if self.passed else 'screened out'
+        return f"Triage {self.viability_score} ({outcome}) for {self.business_idea.title}"
+    
+    @property
+    def agreed_with_full_analysis(self):
+        """Whether the triage decision matches the full analysis, if one was run"""
+        if self.full_analysis_score is None:
+            return None
+        return self.passed == (self.full_analysis_score >= self.threshold)
+
+
+class AnalysisWorkflow(models.Model):
+    """One dispatch of agent tasks for a business idea and its completion counter"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    business_idea = models.ForeignKey(BusinessIdea, on_delete=models.CASCADE, related_name='workflows')
+    agent_types = models.JSONField(default=list)
+    selective = models.BooleanField(default=False, help_text="Selective re-run of some agents")
+    
+    # Idempotency key: idea id + input fingerprint + agent set. Only one unfinished
+    # workflow may exist per key; repeated requests attach to it.
+    dedup_key = models.CharField(max_length=100, blank=True)
+    
+    # Join state: agents decrement the counter; whoever claims finalization at zero
+    # schedules the final report
+    pending_count = models.PositiveIntegerField(default=0)
+    finalized = models.BooleanField(default=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['business_idea', 'finalized']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(finalized=False) & ~models.Q(dedup_key=''),
+                name='unique_inflight_workflow'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Workflow {self.id} for {self.business_idea.title} ({self.pending_count} pending)"
+
+
+class AnalysisQueueEntry(models.Model):
+    """An analysis held back by per-user fair share until a dispatch slot frees up"""
+    
+    business_idea = models.ForeignKey(BusinessIdea, on_delete=models.CASCADE, related_name='queue_entries')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    priority_tier = models.CharField(max_length=20, default='standard')
+    
+    # Orchestration arguments to dispatch with
+    agent_types = models.JSONField(null=True, blank=True)
+    skip_triage = models.BooleanField(default=False)
+    
+    # Deferred admissions are not dispatched before their estimated start
+    not_before = models.DateTimeField(null=True, blank=True)
+    
+    STATUS_CHOICES = [
+        ('WAITING', 'Waiting'),
+        ('DISPATCHED', 'Dispatched'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='WAITING')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Queued analysis of {self.business_idea.title} ({self.status})"
+
+
 class AnalysisTask(models.Model):
     """Track background tasks for analysis processing"""
     
     business_idea = models.ForeignKey(BusinessIdea, on_delete=models.CASCADE, related_name='analysis_tasks')
+    workflow = models.ForeignKey(AnalysisWorkflow, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='tasks')
     task_id = models.CharField(max_length=255, unique=True)  # Celery task ID
     agent_type = models.CharField(max_length=20, choices=AgentReport.AGENT_TYPES, blank=True)
     
@@ -194,17 +367,127 @@ class AnalysisTask(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Lease: the worker running the task owns it until the lease expires; it renews
+    # the lease while the LLM call is in flight. Expired leases are reaped.
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    attempt = models.PositiveSmallIntegerField(default=1, help_text="Dispatch of this agent within its workflow")
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['task_id']),
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'lease_expires_at']),
         ]
 
     def __str__(self):
         return f"Task {self.task_id} - {self.agent_type} for {self.business_idea.title}"
 
 
+class ReaperAction(models.Model):
+    """What the stuck-analysis reaper did about a lost agent task or analysis"""
+    
+    ACTION_CHOICES = [
+        ('REQUEUED_AGENT', 'Requeued agent'),
+        ('FAILED_AGENT', 'Failed agent after max attempts'),
+        ('RELEASED_TASK', 'Released task of a finished workflow'),
+        ('REQUEUED_REPORT', 'Requeued final report'),
+        ('FAILED_ANALYSIS', 'Failed analysis'),
+    ]
+    
+    business_idea = models.ForeignKey(BusinessIdea, on_delete=models.CASCADE, related_name='reaper_actions')
+    workflow = models.ForeignKey(AnalysisWorkflow, on_delete=models.SET_NULL, null=True, blank=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    agent_type = models.CharField(max_length=20, blank=True)
+    task_id = models.CharField(max_length=255, blank=True)
+    attempt = models.PositiveSmallIntegerField(default=0)
+    detail = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['action', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_action_display()} for {self.business_idea.title}"
+
+
+class DailyIdeaRollup(models.Model):
+    """
+    Ideas submitted on one day by one user, per industry and current status.
+    
+    Maintained from analysis hooks by ``analysis_engine.rollups`` and rebuilt
+    nightly; dashboards and analytics read these instead of the idea table.
+    """
+    
+    day = models.DateField(help_text="Submission date in the project time zone")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    industry = models.CharField(max_length=20, choices=BusinessIdea.INDUSTRY_CHOICES)
+    status = models.CharField(max_length=20, choices=BusinessIdea.STATUS_CHOICES)
+    
+    idea_count = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0, help_text="Sum of overall scores")
+    score_count = models.PositiveIntegerField(default=0, help_text="Ideas with an overall score")
+    
+    class Meta:
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user', 'industry', 'status'], name='unique_daily_idea_rollup'),
+        ]
+    
+    def __str__(self):
+        return f"{self.idea_count} {self.status} {self.industry} ideas on {self.day}"
+
+
+class DailyAgentRollup(models.Model):
+    """
+    Agent reports created on one day for the ideas of one user, per industry,
+    agent type and report status.
+    
+    Sums come with the number of reports that had the value, so averages skip
+    missing values like ``Avg`` does.
+    """
+    
+    day = models.DateField(help_text="Creation date of the report in the project time zone")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    industry = models.CharField(max_length=20, choices=BusinessIdea.INDUSTRY_CHOICES)
+    agent_type = models.CharField(max_length=20, choices=AgentReport.AGENT_TYPES)
+    status = models.CharField(max_length=20, choices=AgentReport.STATUS_CHOICES)
+    
+    report_count = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_count = models.PositiveIntegerField(default=0)
+    confidence_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    confidence_count = models.PositiveIntegerField(default=0)
+    token_sum = models.BigIntegerField(default=0)
+    token_count = models.PositiveIntegerField(default=0)
+    cost_sum = models.DecimalField(max_digits=14, decimal_places=4, default=0)
+    cost_count = models.PositiveIntegerField(default=0)
+    execution_time_sum = models.DurationField(default=timedelta)
+    execution_time_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'user', 'industry', 'agent_type', 'status'],
+                name='unique_daily_agent_rollup'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.report_count} {self.status} {self.agent_type} reports on {self.day}"
+
+
 class IdeaGenerationRequest(models.Model):
     """Request for AI to generate new business ideas"""
     
@@ -0,0 +1,239 @@
+"""
+Keyset (Cursor) Pagination
+
+Long lists are paged by position instead of by offset: a page holds the rows
+that sort after the last row of the previous page on ``(ordering field, pk)``,
+so every page is an index range scan of ``page_size + 1`` rows whatever its depth,
+and rows inserted meanwhile never shift a page. Cursors are opaque tokens
+encoding that position and the direction.
+
+Counting all matching rows is optional: ``approximate_count`` stops counting at
+``PAGINATION_COUNT_LIMIT`` and reports whether it did.
+
+- ``KeysetPaginator``: pages any queryset, for plain Django views
+- ``KeysetPagination``: the same as a DRF pagination class for viewsets
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value: Any, pk: Any, reverse: bool = False) -> str:
+    # str() keeps the full precision of datetimes and decimals; fields parse it back
+    payload = json.dumps([value, pk, reverse], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any, bool]:
+    """``(value, pk, reverse)`` of a cursor; raises ``InvalidCursor`` for anything else"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk, reverse = json.loads(payload)
+    except (TypeError, ValueError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return value, pk, bool(reverse)
+
+
+def approximate_count(queryset, limit: Optional[int] = None) -> Tuple[int, bool]:
+    """
+    Number of rows in ``queryset``, counting at most ``limit`` (``PAGINATION_COUNT_LIMIT``).
+    
+    Returns ``(count, exact)``; when ``exact`` is False there are more than ``count`` rows.
+    """
+    limit = limit or getattr(settings, 'PAGINATION_COUNT_LIMIT', 1000)
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count <= limit
+
+
+@dataclass
+class KeysetPage:
+    """One page of rows with the cursors of its neighbours"""
+    object_list: List[Any]
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+    
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+    
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pages ``queryset`` on ``ordering`` (a field or annotation, ``-`` for descending) with the pk as tie-breaker.
+    
+    The ordering field should be covered by an index ending in the pk, after any
+    equality filters (e.g. ``(submitted_by, submitted_at, id)``). NULLs of a
+    nullable ordering field sort last in both directions.
+    """
+    
+    def __init__(self, queryset, ordering: str, page_size: int):
+        self.queryset = queryset
+        self.descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        try:
+            self.field = queryset.model._meta.get_field(self.field_name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) page the same way
+            if self.field_name not in queryset.query.annotations:
+                raise
+            self.field = queryset.query.annotations[self.field_name].output_field
+        self.pk_field = queryset.model._meta.pk
+        self.page_size = page_size
+    
+    def _order_by(self, descending: bool, nulls_last: bool):
+        nulls = {'nulls_last': True} if nulls_last else {'nulls_first': True}
+        if not self.field.null:
+            nulls = {}
+        field = F(self.field_name).desc(**nulls) if descending else F(self.field_name).asc(**nulls)
+        return [field, '-pk' if descending else 'pk']
+    
+    def _after(self, value, pk, descending: bool, nulls_last: bool) -> Q:
+        """Rows after position ``(value, pk)`` in the given order"""
+        lookup = 'lt' if descending else 'gt'
+        if value is None:
+            after = Q(**{f'{self.field_name}__isnull': True, f'pk__{lookup}': pk})
+            if not nulls_last:
+                after |= Q(**{f'{self.field_name}__isnull': False})
+            return after
+        
+        after = Q(**{f'{self.field_name}__{lookup}': value}) | Q(**{self.field_name: value, f'pk__{lookup}': pk})
+        if nulls_last and self.field.null:
+            after |= Q(**{f'{self.field_name}__isnull': True})
+        return after
+    
+    def _cursor(self, row, reverse: bool) -> str:
+        return encode_cursor(getattr(row, getattr(self.field, 'attname', None) or self.field_name), row.pk, reverse)
+    
+    def page_queryset(self, cursor: Optional[str] = None):
+        """The query of the page at ``cursor`` (one row more than a page, in scan order); raises ``InvalidCursor``"""
+        queryset = self.queryset
+        reverse = False
+        if cursor:
+            raw_value, raw_pk, reverse = decode_cursor(cursor)
+            if raw_pk is None:
+                raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+            try:
+                value = None if raw_value is None else self.field.to_python(raw_value)
+                pk = self.pk_field.to_python(raw_pk)
+            except ValidationError:
+                raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+            # A previous page is the next page in the opposite order, read backwards
+            queryset = queryset.filter(self._after(value, pk, self.descending != reverse, not reverse))
+        
+        return queryset.order_by(*self._order_by(self.descending != reverse, not reverse))[:self.page_size + 1]
+    
+    def get_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        """The page after (or, for a previous-page cursor, before) ``cursor``; raises ``InvalidCursor``"""
+        rows = list(self.page_queryset(cursor))
+        reverse = bool(cursor) and decode_cursor(cursor)[2]
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows)
+        
+        # Either neighbour exists for sure when we came from it; otherwise has_more tells
+        more_after = has_more if not reverse else True
+        more_before = bool(cursor) if not reverse else has_more
+        return KeysetPage(
+            rows,
+            next_cursor=self._cursor(rows[-1], False) if more_after else None,
+            previous_cursor=self._cursor(rows[0], True) if more_before else None,
+        )
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination on ``ordering`` with ``cursor`` links instead of page numbers.
+    
+    ``?page_size=`` picks the page size (up to ``max_page_size``); ``?count=true``
+    adds ``count`` and ``count_exact`` from ``approximate_count``.
+    """
+    ordering = '-created_at'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    
+    def get_page_size(self, request) -> int:
+        page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            return page_size
+        return min(max(requested, 1), self.max_page_size)
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(queryset, self.ordering, self.get_page_size(request))
+        try:
+            self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        
+        self.count = None
+        if request.query_params.get('count', '').lower() == 'true':
+            self.count = approximate_count(queryset)
+        return self.page.object_list
+    
+    def _link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        # The count is taken once, on the page that asked for it
+        url = remove_query_param(self.request.build_absolute_uri(), 'count')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+    
+    def get_paginated_response(self, data):
+        response = {
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+        }
+        if self.count is not None:
+            response['count'], response['count_exact'] = self.count
+        response['results'] = data
+        return Response(response)
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_exact': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+
+class BusinessIdeaPagination(KeysetPagination):
+    ordering = '-submitted_at'
+
+
+class AgentReportPagination(KeysetPagination):
+    ordering = '-created_at'
@@ -0,0 +1,249 @@
+"""
+Daily Analytics Rollups
+
+Dashboards and analytics read per-day totals instead of aggregating the idea and
+report tables on every request, so their cost grows with the number of days and
+users rather than with the number of rows:
+
+- ``DailyIdeaRollup``: ideas per (day, user, industry, status) with score sums
+- ``DailyAgentRollup``: the reports of those ideas per (day, user, industry,
+  agent type, status) with score, confidence, token, cost and execution-time sums
+
+Idea rollups are keyed by the submission day of the idea and agent rollups by the
+creation day of the report, so a change to one row touches one (user, day) slice.
+
+Rollups are never written while an idea or report is saved. The save hooks (see
+``analysis_engine.signals``) and the bulk ``update()`` calls in the tasks only
+flag the idea once the transaction commits, without a query, and
+``refresh_idea_rollups`` runs ``ROLLUP_REFRESH_DELAY`` seconds later to look up
+the slices of the idea and its reports. Each slice is then recounted by
+``refresh_daily_rollups`` after another delay, coalesced per slice, so a burst
+of changes costs one recount per slice. Rollups lag the source tables by about
+twice the delay.
+
+A rollup drifts further only when a change bypasses the hooks (raw SQL, a bulk
+update without a scheduled refresh, an idea moved to another user, the reports
+of a deleted idea) or a refresh is lost because the worker died in between. The
+nightly ``reconcile_daily_rollups`` beat task rebuilds everything from the source
+tables, so such drift lasts less than a day.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from analysis_engine.models import AgentReport, BusinessIdea, DailyAgentRollup, DailyIdeaRollup
+
+ROLLUP_PENDING_KEY = 'analysis:rollups:pending:{user_id}:{day}'
+ROLLUP_IDEA_PENDING_KEY = 'analysis:rollups:pending-idea:{business_idea_id}'
+
+# Summed source columns: (sum field, count field) on the rollup
+IDEA_VALUES = {
+    'overall_score': ('score_sum', 'score_count'),
+}
+
+REPORT_VALUES = {
+    'agent_score': ('score_sum', 'score_count'),
+    'confidence': ('confidence_sum', 'confidence_count'),
+    'token_usage': ('token_sum', 'token_count'),
+    'cost_estimate': ('cost_sum', 'cost_count'),
+    'execution_time': ('execution_time_sum', 'execution_time_count'),
+}
+
+def _sums(total_field: str, values: Dict[str, Tuple[str, str]]) -> Dict[str, Any]:
+    sums = {total_field: Count('id')}
+    for source, (sum_field, count_field) in values.items():
+        sums[sum_field] = Sum(source)
+        sums[count_field] = Count(source)
+    return sums
+
+
+IDEA_SUMS = _sums('idea_count', IDEA_VALUES)
+AGENT_SUMS = _sums('report_count', REPORT_VALUES)
+
+# Report averages over completed reports: (sum field, count field)
+REPORT_AVERAGES = {
+    'average_score': ('score_sum', 'score_count'),
+    'average_confidence': ('confidence_sum', 'confidence_count'),
+    'average_tokens': ('token_sum', 'token_count'),
+    'average_cost': ('cost_sum', 'cost_count'),
+    'average_execution_time': ('execution_time_sum', 'execution_time_count'),
+}
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _build_rollups(model, rows, **renamed) -> List[Any]:
+    """Rollup instances from grouped rows; sums over nothing but NULLs keep the field default"""
+    return [
+        model(**{renamed.get(key, key): value for key, value in row.items() if value is not None})
+        for row in rows
+    ]
+
+
+def _idea_rollups(ideas) -> List[DailyIdeaRollup]:
+    rows = ideas.annotate(day=TruncDate('submitted_at')).order_by().values(
+        'day', 'submitted_by', 'industry', 'status'
+    ).annotate(**IDEA_SUMS)
+    return _build_rollups(DailyIdeaRollup, rows, submitted_by='user_id')
+
+
+def _agent_rollups(reports) -> List[DailyAgentRollup]:
+    rows = reports.annotate(day=TruncDate('created_at')).order_by().values(
+        'day', 'business_idea__submitted_by', 'business_idea__industry', 'agent_type', 'status'
+    ).annotate(**AGENT_SUMS)
+    return _build_rollups(
+        DailyAgentRollup, rows,
+        business_idea__submitted_by='user_id',
+        business_idea__industry='industry'
+    )
+
+
+def refresh_rollup_slice(user_id: Optional[int], day: date):
+    """Recount the rollups of the ideas ``user_id`` submitted and the reports created for them on ``day``"""
+    # Changes committed from here on schedule another recount
+    cache.delete(ROLLUP_PENDING_KEY.format(user_id=user_id, day=day))
+    
+    ideas = BusinessIdea.objects.filter(
+        submitted_by=user_id,
+        submitted_at__gte=_day_start(day),
+        submitted_at__lt=_day_start(day + timedelta(days=1))
+    )
+    reports = AgentReport.objects.filter(
+        business_idea__submitted_by=user_id,
+        created_at__gte=_day_start(day),
+        created_at__lt=_day_start(day + timedelta(days=1))
+    )
+    
+    with transaction.atomic():
+        DailyIdeaRollup.objects.filter(user=user_id, day=day).delete()
+        DailyAgentRollup.objects.filter(user=user_id, day=day).delete()
+        DailyIdeaRollup.objects.bulk_create(_idea_rollups(ideas))
+        DailyAgentRollup.objects.bulk_create(_agent_rollups(reports))
+
+
+def rebuild_rollups(since: Optional[date] = None) -> Dict[str, int]:
+    """Recount every rollup (of ideas submitted and reports created from ``since`` on) from the source tables"""
+    ideas = BusinessIdea.objects.all()
+    reports = AgentReport.objects.all()
+    idea_rollups = DailyIdeaRollup.objects.all()
+    agent_rollups = DailyAgentRollup.objects.all()
+    if since:
+        ideas = ideas.filter(submitted_at__gte=_day_start(since))
+        reports = reports.filter(created_at__gte=_day_start(since))
+        idea_rollups = idea_rollups.filter(day__gte=since)
+        agent_rollups = agent_rollups.filter(day__gte=since)
+    
+    with transaction.atomic():
+        idea_rollups.delete()
+        agent_rollups.delete()
+        created_ideas = DailyIdeaRollup.objects.bulk_create(_idea_rollups(ideas), batch_size=1000)
+        created_agents = DailyAgentRollup.objects.bulk_create(_agent_rollups(reports), batch_size=1000)
+    
+    return {'idea_rollups': len(created_ideas), 'agent_rollups': len(created_agents)}
+
+
+def schedule_slice_refresh(user_id: Optional[int], day: date):
+    """Recount one (user, day) slice once the current transaction commits"""
+    def schedule():
+        from analysis_engine.tasks import refresh_daily_rollups
+        
+        delay = getattr(settings, 'ROLLUP_REFRESH_DELAY', 5)
+        # One recount per slice however many changes land before it runs
+        if cache.add(ROLLUP_PENDING_KEY.format(user_id=user_id, day=day), True, delay + 60):
+            refresh_daily_rollups.apply_async(args=[user_id, day.isoformat()], countdown=delay)
+    
+    transaction.on_commit(schedule)
+
+
+def schedule_rollup_refresh(business_idea: BusinessIdea):
+    """Recount the slices of ``business_idea`` and its reports once the current transaction commits"""
+    schedule_rollup_refresh_by_id(business_idea.id)
+
+
+def schedule_rollup_refresh_by_id(business_idea_id):
+    """
+    ``schedule_rollup_refresh`` for an idea known by id.
+    
+    Runs no query: saves call this from their hooks, so the writing transaction
+    and its commit stay as they were. ``refresh_idea_rollups`` looks the slices
+    up later, once per idea however many changes land before it runs.
+    """
+    def schedule():
+        from analysis_engine.tasks import refresh_idea_rollups
+        
+        delay = getattr(settings, 'ROLLUP_REFRESH_DELAY', 5)
+        if cache.add(ROLLUP_IDEA_PENDING_KEY.format(business_idea_id=business_idea_id), True, delay + 60):
+            refresh_idea_rollups.apply_async(args=[str(business_idea_id)], countdown=delay)
+    
+    transaction.on_commit(schedule)
+
+
+def schedule_idea_slice_refreshes(business_idea_id) -> Set[Tuple[Optional[int], date]]:
+    """Schedule recounts of the slices an idea and its reports are counted in, and return them"""
+    # Changes committed from here on schedule another lookup
+    cache.delete(ROLLUP_IDEA_PENDING_KEY.format(business_idea_id=business_idea_id))
+    
+    business_idea = BusinessIdea.objects.filter(id=business_idea_id).values('submitted_by', 'submitted_at').first()
+    if not business_idea:
+        return set()
+    
+    days = {timezone.localdate(business_idea['submitted_at'])}
+    days.update(timezone.localdate(day) for day in AgentReport.objects.filter(
+        business_idea_id=business_idea_id
+    ).datetimes('created_at', 'day'))
+    
+    slices = {(business_idea['submitted_by'], day) for day in days}
+    for user_id, day in sorted(slices, key=lambda item: item[1]):
+        schedule_slice_refresh(user_id, day)
+    return slices
+
+
+def idea_stats(rollups) -> Dict[str, Any]:
+    """Idea counts per status, the total and the average score of completed ideas over ``rollups``"""
+    rows = list(rollups.order_by('status').values('status').annotate(
+        ideas=Sum('idea_count'),
+        scores=Sum('score_sum'),
+        scored=Sum('score_count'),
+    ))
+    by_status = {row['status']: row['ideas'] for row in rows}
+    completed = next((row for row in rows if row['status'] == 'COMPLETED'), None)
+    
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'average_score': completed['scores'] / completed['scored'] if completed and completed['scored'] else None,
+    }
+
+
+def report_stats(rollups) -> Dict[str, Dict[str, Any]]:
+    """Report counts and averages of completed reports per agent type over ``rollups``"""
+    completed = Q(status='COMPLETED')
+    sums = {}
+    for average, (sum_field, count_field) in REPORT_AVERAGES.items():
+        sums[f'{average}_sum'] = Sum(sum_field, filter=completed)
+        sums[f'{average}_count'] = Sum(count_field, filter=completed)
+    
+    rows = rollups.order_by().values('agent_type').annotate(
+        total=Sum('report_count'),
+        successful=Coalesce(Sum('report_count', filter=completed), 0),
+        failed=Coalesce(Sum('report_count', filter=Q(status='FAILED')), 0),
+        **sums
+    )
+    
+    stats = {}
+    for row in rows:
+        entry = {key: row[key] for key in ['agent_type', 'total', 'successful', 'failed']}
+        for average in REPORT_AVERAGES:
+            count = row[f'{average}_count']
+            entry[average] = row[f'{average}_sum'] / count if count else None
+        stats[row['agent_type']] = entry
+    return stats
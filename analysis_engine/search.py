@@ -0,0 +1,241 @@
+"""
+Full-Text Search for Ideas and Reports
+
+Idea titles/descriptions and report content are searched through a full-text
+index instead of ``LIKE '%...%'`` scans:
+
+- SQLite: an external-content FTS5 table per model (porter stemming), kept in
+  sync by insert/update/delete triggers; ranked with ``bm25`` and highlighted
+  with ``snippet``
+- PostgreSQL: a generated, weighted ``tsvector`` column with a GIN index, ranked
+  with ``ts_rank_cd`` and highlighted with ``ts_headline``
+- Other databases fall back to ``icontains`` without ranking
+
+Triggers and generated columns cover bulk ``update()``s as well as saves. Django
+rebuilds SQLite tables when some migrations alter them, which drops the
+triggers; ``ensure_search_indexes`` runs after every ``migrate`` and reinstalls
+and repopulates whatever is missing. ``rebuild_search_index`` repopulates on demand.
+
+Queries are reduced to word tokens that must all match, the last one as a
+prefix, so user input never reaches the query syntax of either engine.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from django.db import connection as default_connection
+from django.db.models import FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+logger = logging.getLogger(__name__)
+
+# Control characters around matches in highlights; replaced after HTML-escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+# Search terms beyond this many are ignored
+MAX_TERMS = 10
+
+TEXT_SEARCH_CONFIG = 'english'
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """Full-text index over text columns of one table, each with a bm25 weight and a tsvector weight"""
+    table: str
+    columns: Tuple[Tuple[str, float, str], ...]
+    
+    @property
+    def fts_table(self) -> str:
+        return f'{self.table}_search'
+    
+    @property
+    def column_names(self) -> List[str]:
+        return [column for column, _, _ in self.columns]
+
+
+IDEA_SEARCH = SearchIndex('analysis_engine_businessidea', (('title', 10.0, 'A'), ('description', 1.0, 'B')))
+REPORT_SEARCH = SearchIndex('analysis_engine_agentreport', (('report_content', 1.0, 'A'),))
+
+SEARCH_INDEXES = [IDEA_SEARCH, REPORT_SEARCH]
+
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def _fts5_query(terms: List[str]) -> str:
+    return ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def _tsquery(terms: List[str]) -> str:
+    return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+
+def _tsvector(index: SearchIndex) -> str:
+    return ' || '.join(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce({column}, '')), '{weight}')"
+        for column, _, weight in index.columns
+    )
+
+
+def search_filter(index: SearchIndex, query: str, field: str = 'pk') -> Q:
+    """Rows whose ``field`` is the id of a row of ``index`` matching every term of ``query``"""
+    terms = search_terms(query)
+    if not terms:
+        return Q(pk__in=[])
+    
+    vendor = default_connection.vendor
+    if vendor == 'sqlite':
+        matches = RawSQL(
+            f"SELECT id FROM {index.table} WHERE rowid IN "
+            f"(SELECT rowid FROM {index.fts_table} WHERE {index.fts_table} MATCH %s)",
+            [_fts5_query(terms)]
+        )
+    elif vendor == 'postgresql':
+        matches = RawSQL(
+            f"SELECT id FROM {index.table} WHERE search_vector @@ to_tsquery('{TEXT_SEARCH_CONFIG}', %s)",
+            [_tsquery(terms)]
+        )
+    else:
+        prefix = '' if field == 'pk' else f'{field}__'
+        condition = Q()
+        for term in terms:
+            condition &= Q(*[(f'{prefix}{column}__icontains', term) for column in index.column_names],
+                           _connector=Q.OR)
+        return condition
+    return Q(**{f'{field}__in': matches})
+
+
+def search_annotations(index: SearchIndex, query: str) -> Dict[str, object]:
+    """``search_rank`` (higher is better) and ``search_highlight`` for rows of ``index`` itself"""
+    terms = search_terms(query)
+    vendor = default_connection.vendor
+    if not terms or vendor not in ('sqlite', 'postgresql'):
+        return {
+            'search_rank': Value(0.0, output_field=FloatField()),
+            'search_highlight': Value('', output_field=TextField()),
+        }
+    
+    if vendor == 'sqlite':
+        match = f"FROM {index.fts_table} WHERE {index.fts_table} MATCH %s AND rowid = {index.table}.rowid"
+        weights = ', '.join(str(weight) for _, weight, _ in index.columns)
+        return {
+            # bm25 is lower for better matches
+            'search_rank': RawSQL(f"SELECT -bm25({index.fts_table}, {weights}) {match}",
+                                  [_fts5_query(terms)], output_field=FloatField()),
+            'search_highlight': RawSQL(
+                f"SELECT snippet({index.fts_table}, -1, char(2), char(3), '…', 24) {match}",
+                [_fts5_query(terms)], output_field=TextField()
+            ),
+        }
+    
+    document = " || ' ' || ".join(f"coalesce({index.table}.{column}, '')" for column in index.column_names)
+    return {
+        'search_rank': RawSQL(
+            f"ts_rank_cd({index.table}.search_vector, to_tsquery('{TEXT_SEARCH_CONFIG}', %s))",
+            [_tsquery(terms)], output_field=FloatField()
+        ),
+        'search_highlight': RawSQL(
+            f"ts_headline('{TEXT_SEARCH_CONFIG}', {document}, to_tsquery('{TEXT_SEARCH_CONFIG}', %s), %s)",
+            [_tsquery(terms), f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=24, MinWords=8'],
+            output_field=TextField()
+        ),
+    }
+
+
+def search(queryset, index: SearchIndex, query: str):
+    """``queryset`` narrowed to rows matching ``query``, with ``search_rank`` and ``search_highlight``"""
+    return queryset.filter(search_filter(index, query)).annotate(**search_annotations(index, query))
+
+
+def search_ideas(queryset, query: str):
+    return search(queryset, IDEA_SEARCH, query)
+
+
+def search_reports(queryset, query: str):
+    return search(queryset, REPORT_SEARCH, query)
+
+
+def highlight_html(highlight: str) -> SafeString:
+    """HTML of a ``search_highlight`` with matches wrapped in ``<mark>``"""
+    return mark_safe(escape(highlight or '').replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def _sqlite_statements(index: SearchIndex) -> List[str]:
+    columns = ', '.join(index.column_names)
+    new_values = ', '.join(f'new.{column}' for column in index.column_names)
+    old_values = ', '.join(f'old.{column}' for column in index.column_names)
+    delete_old = (f"INSERT INTO {index.fts_table}({index.fts_table}, rowid, {columns}) "
+                  f"VALUES ('delete', old.rowid, {old_values});")
+    insert_new = f"INSERT INTO {index.fts_table}(rowid, {columns}) VALUES (new.rowid, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index.fts_table} USING fts5("
+        f"{columns}, content='{index.table}', content_rowid='rowid', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {index.fts_table}_insert AFTER INSERT ON {index.table} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {index.fts_table}_delete AFTER DELETE ON {index.table} "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {index.fts_table}_update AFTER UPDATE OF {columns} ON {index.table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _postgresql_statements(index: SearchIndex) -> List[str]:
+    return [
+        f"ALTER TABLE {index.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({_tsvector(index)}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {index.table}_search_idx ON {index.table} USING gin (search_vector)",
+    ]
+
+
+def install_search_indexes(connection=None):
+    """Create the search tables, triggers or columns that are missing and populate them"""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES:
+            if connection.vendor == 'sqlite':
+                for statement in _sqlite_statements(index):
+                    cursor.execute(statement)
+                cursor.execute(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                # Generated columns are computed for existing rows when added
+                for statement in _postgresql_statements(index):
+                    cursor.execute(statement)
+
+
+def uninstall_search_indexes(connection=None):
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES:
+            if connection.vendor == 'sqlite':
+                for suffix in ['insert', 'delete', 'update']:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {index.fts_table}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {index.fts_table}")
+            elif connection.vendor == 'postgresql':
+                cursor.execute(f"DROP INDEX IF EXISTS {index.table}_search_idx")
+                cursor.execute(f"ALTER TABLE {index.table} DROP COLUMN IF EXISTS search_vector")
+
+
+def ensure_search_indexes(connection=None) -> bool:
+    """Reinstall the SQLite search triggers if a table rebuild dropped them; returns whether it did"""
+    connection = connection or default_connection
+    if connection.vendor != 'sqlite':
+        return False
+    
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = set(cursor.fetchall())
+    installed = [index for index in SEARCH_INDEXES if ('table', index.fts_table) in existing]
+    # Indexes that were never installed (or were migrated away) are left alone
+    if all(('trigger', f'{index.fts_table}_{suffix}') in existing
+           for index in installed for suffix in ['insert', 'delete', 'update']):
+        return False
+    
+    logger.warning("Search index triggers missing; reinstalling and rebuilding the search index")
+    install_search_indexes(connection)
+    return True
@@ -9,7 +9,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     BusinessIdea, AgentReport, FinalAnalysisReport, 
-    AnalysisTask, IdeaGenerationRequest
+    AnalysisTask, IdeaGenerationRequest, TriageResult
 )
 
 
@@ -104,6 +104,7 @@ class AgentReportSerializer(serializers.ModelSerializer):
             'report_content', 'structured_data', 'agent_score', 'confidence',
             'created_at', 'execution_time', 'execution_time_seconds',
             'llm_model_used', 'token_usage', 'cost_estimate',
+            'model_tier', 'difficulty_score', 'parse_failed', 'is_partial',
             'status', 'status_display', 'error_message'
         ]
         read_only_fields = ['id', 'created_at']
@@ -145,9 +146,25 @@ class FinalAnalysisReportSerializer(serializers.ModelSerializer):
             'risk_assessment', 'technical_feasibility', 'market_score',
             'financial_score', 'technical_score', 'risk_score', 'overall_score',
             'final_recommendation', 'final_recommendation_display',
-            'confidence_level', 'created_at', 'generated_by_agent', 'total_cost'
+            'confidence_level', 'created_at', 'generated_by_agent', 'total_cost',
+            'is_early_decision', 'early_decision_reason'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'is_early_decision', 'early_decision_reason']
+
+
+class TriageResultSerializer(serializers.ModelSerializer):
+    """Serializer for triage pre-screen results"""
+    
+    agreed_with_full_analysis = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = TriageResult
+        fields = [
+            'viability_score', 'threshold', 'passed', 'rationale', 'red_flags',
+            'llm_model_used', 'token_usage', 'cost_estimate', 'created_at',
+            'full_analysis_requested', 'full_analysis_score', 'agreed_with_full_analysis'
+        ]
+        read_only_fields = fields
 
 
 class AnalysisTaskSerializer(serializers.ModelSerializer):
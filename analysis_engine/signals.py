@@ -0,0 +1,45 @@
+"""
+Signal Handlers for the Analysis Engine
+"""
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from analysis_engine.idea_status import invalidate_idea_status
+from analysis_engine.models import AgentReport, BusinessIdea
+from analysis_engine.rollups import schedule_rollup_refresh_by_id, schedule_slice_refresh
+from analysis_engine.search import ensure_search_indexes
+
+
+@receiver(post_save, sender=BusinessIdea)
+@receiver(post_delete, sender=BusinessIdea)
+def invalidate_status_on_idea_change(sender, instance, **kwargs):
+    invalidate_idea_status(instance.id)
+
+
+@receiver(post_save, sender=AgentReport)
+@receiver(post_delete, sender=AgentReport)
+def invalidate_status_on_report_change(sender, instance, **kwargs):
+    invalidate_idea_status(instance.business_idea_id)
+
+
+@receiver(post_save, sender=BusinessIdea)
+@receiver(post_save, sender=AgentReport)
+@receiver(post_delete, sender=AgentReport)
+def refresh_rollups_on_change(sender, instance, **kwargs):
+    schedule_rollup_refresh_by_id(instance.pk if sender is BusinessIdea else instance.business_idea_id)
+
+
+@receiver(post_delete, sender=BusinessIdea)
+def refresh_rollups_on_idea_delete(sender, instance, **kwargs):
+    # The idea can no longer be looked up, so its slice is recounted directly
+    schedule_slice_refresh(instance.submitted_by_id, timezone.localdate(instance.submitted_at))
+
+
+@receiver(post_migrate)
+def reinstall_search_triggers(sender, using, **kwargs):
+    # SQLite table rebuilds during migrations drop the search triggers
+    if sender.name == 'analysis_engine':
+        ensure_search_indexes(connections[using])
@@ -5,69 +5,207 @@ This module contains the background tasks that coordinate the AI agents
 to perform comprehensive business analysis.
 """
 
+import copy
+import hashlib
 import logging
-import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
 from celery import shared_task, group, chain, chord
 from django.utils import timezone
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from django.conf import settings
 
 from analysis_engine.models import (
-    BusinessIdea, AgentReport, FinalAnalysisReport, 
-    AnalysisTask, IdeaGenerationRequest
+    BusinessIdea, AgentReport, FinalAnalysisReport, AnalysisWorkflow, 
+    AnalysisTask, AnalysisQueueEntry, IdeaGenerationRequest, TriageResult, ReaperAction
 )
 from agent_system.base_agents import AnalysisContext, communication_hub
-from agent_system.business_agents import initialize_agents
+from agent_system.extended_agents import initialize_all_agents
+from analysis_engine.model_routing import select_model_tier, is_parse_failure
+from analysis_engine.context_cache import (
+    build_analysis_context, get_context_version, prime_analysis_context, load_analysis_context
+)
+from analysis_engine.cancellation import (
+    AnalysisCancelled, request_cancellation, get_cancellation,
+    clear_cancellation, revoke_tasks, raise_if_cancelled
+)
+from analysis_engine.agent_runtime import run_agent_coroutine
+from analysis_engine.fair_share import (
+    admit_analysis, get_priority_tier, get_tier_settings, select_entries_to_dispatch, slot_still_free
+)
+from analysis_engine.rollups import (
+    rebuild_rollups, refresh_rollup_slice, schedule_idea_slice_refreshes, schedule_rollup_refresh,
+    schedule_rollup_refresh_by_id
+)
+from agent_system.telemetry import ExecutionRecord, record_execution
 
 logger = logging.getLogger(__name__)
 
+# Agents fanned out for every full analysis; the CEO report is built from their output
+ANALYSIS_AGENT_TYPES = ['MARKET_RESEARCH', 'FINANCIAL', 'MARKETING', 'TECH_LEAD', 'RISK_ANALYST']
+
+# AnalysisTask states after which an agent task counts as done for its workflow
+FINAL_TASK_STATUSES = ['SUCCESS', 'FAILURE', 'REVOKED']
+
+# Serializes dispatch_queued_analyses runs so a free slot is handed out only once
+DISPATCH_LOCK_KEY = 'analysis:dispatch:lock'
+
 
 @shared_task(bind=True, max_retries=3)
-def orchestrate_business_analysis(self, business_idea_id: str):
+def orchestrate_business_analysis(self, business_idea_id: str, agent_types: Optional[List[str]] = None,
+                                  skip_triage: bool = False, queue_entry_id: Optional[int] = None):
     """
     Main orchestration task that coordinates all agents to analyze a business idea.
     This is the "CEO" of our task system.
+    
+    When ``agent_types`` is given only those agents are re-run (selective mode) and
+    the final report is regenerated only if at least one of them produced a new report.
+    
+    With ``TRIAGE_ENABLED`` a full analysis is preceded by a cheap triage call; ideas
+    scoring below ``TRIAGE_THRESHOLD`` get a lightweight report and skip the fan-out
+    unless ``skip_triage`` is set.
+    
+    With ``ANALYSIS_FAIR_SHARE_ENABLED`` the analysis only starts if its submitter's
+    priority tier and the platform have a free slot; otherwise it is queued and
+    ``dispatch_queued_analyses`` re-sends it later with ``queue_entry_id`` set.
+    
+    Requests are idempotent: the idea id plus a fingerprint of its input and the
+    agent set form a dedup key, and a request whose key already has an unfinished
+    workflow attaches to it instead of starting a second fan-out. The decision is
+    recorded on this task's ``AnalysisTask`` row.
     """
+    workflow = None
     try:
         # Get the business idea
-        business_idea = BusinessIdea.objects.get(id=business_idea_id)
+        business_idea = BusinessIdea.objects.select_related('submitted_by').get(id=business_idea_id)
+        if business_idea.status == 'CANCELLED':
+            # Sent before the user cancelled; a new run resets the status first
+            logger.info(f"Skipping orchestration of cancelled analysis {business_idea.title}")
+            return f"Analysis of {business_idea.title} was cancelled"
+        
+        selective = agent_types is not None
+        scheduled_agents = list(agent_types) if selective else ANALYSIS_AGENT_TYPES
+        
+        if not scheduled_agents:
+            logger.info(f"No agents selected for re-run of {business_idea.title}")
+            return f"Nothing to re-run for {business_idea.title}"
+        
+        # Create analysis context; agent tasks load it from the shared cache by version
+        context, context_version = prime_analysis_context(business_idea)
+        
+        # Idempotency: a double submit or repeated re-run joins the analysis in flight
+        dedup_key = _orchestration_key(business_idea_id, context_version, scheduled_agents)
+        inflight = AnalysisWorkflow.objects.filter(dedup_key=dedup_key, finalized=False).first()
+        if inflight:
+            return _attach_to_workflow(self.request.id, business_idea, inflight)
+        
+        # Per-user fair share: hold the analysis back while the user or the platform is at capacity
+        priority_tier = get_priority_tier(business_idea.submitted_by)
+        if queue_entry_id is None and getattr(settings, 'ANALYSIS_FAIR_SHARE_ENABLED', True):
+            queue_entry = admit_analysis(business_idea, priority_tier, agent_types=agent_types,
+                                         skip_triage=skip_triage)
+            if queue_entry:
+                logger.info(f"Queued analysis of {business_idea.title} ({priority_tier} tier) "
+                            f"until a fair-share slot frees up")
+                return f"Analysis of {business_idea.title} queued"
+        message_priority = get_tier_settings(priority_tier)['priority']
+        
         business_idea.status = 'ANALYZING'
         business_idea.save()
         
-        logger.info(f"Starting analysis orchestration for: {business_idea.title}")
-        
-        # Create analysis context
-        context = AnalysisContext(
-            business_idea_id=str(business_idea.id),
-            title=business_idea.title,
-            description=business_idea.description,
-            industry=business_idea.industry,
-            target_market=business_idea.target_market or "",
-            estimated_budget=float(business_idea.estimated_budget) if business_idea.estimated_budget else None,
-            additional_data={}
-        )
+        # A new run must not be cancelled by a flag left over from a previous one
+        clear_cancellation(business_idea_id)
+        
+        logger.info(f"Starting {'selective ' if selective else ''}analysis orchestration for: "
+                    f"{business_idea.title} ({', '.join(scheduled_agents)})")
+        
+        # Cheap pre-screen before paying for the full fan-out
+        if not selective and not skip_triage and getattr(settings, 'TRIAGE_ENABLED', False):
+            triage = _run_triage(business_idea, context)
+            if triage and not triage.passed:
+                _create_triage_report(business_idea, triage)
+                _release_analysis_slot()
+                logger.info(f"{business_idea.title} screened out by triage "
+                            f"(score {triage.viability_score} < {triage.threshold})")
+                return f"Triage screened out {business_idea.title}"
         
-        # Create parallel tasks for each agent type
-        agent_tasks = group([
-            analyze_with_agent.s(business_idea_id, 'MARKET_RESEARCH', context.__dict__),
-            analyze_with_agent.s(business_idea_id, 'FINANCIAL', context.__dict__),
-            analyze_with_agent.s(business_idea_id, 'MARKETING', context.__dict__),
-            analyze_with_agent.s(business_idea_id, 'TECH_LEAD', context.__dict__),
-            analyze_with_agent.s(business_idea_id, 'RISK_ANALYST', context.__dict__),
-        ])
-        
-        # Chain: run all agent analyses, then create final report
-        analysis_workflow = chord(agent_tasks)(
-            create_final_analysis_report.s(business_idea_id)
+        # The workflow row tracks how many agents are still outstanding
+        join_mode = getattr(settings, 'ANALYSIS_JOIN_MODE', 'counter')
+        workflow = AnalysisWorkflow(
+            business_idea=business_idea,
+            agent_types=scheduled_agents,
+            selective=selective,
+            pending_count=len(scheduled_agents),
+            dedup_key=dedup_key
         )
         
+        # Create parallel tasks for each agent type. Task ids are fixed up front and
+        # recorded so queued siblings can be revoked on an early decision.
+        agent_signatures = []
+        for agent_type in scheduled_agents:
+            signature = analyze_with_agent.s(business_idea_id, agent_type, context_version, str(workflow.id))
+            signature.set(priority=message_priority)
+            if join_mode == 'counter':
+                # Completion is tracked by the workflow counter, not the result backend
+                signature.set(ignore_result=True)
+            signature.freeze()
+            agent_signatures.append(signature)
+        
+        try:
+            with transaction.atomic():
+                workflow.save()
+                
+                AgentReport.objects.filter(
+                    business_idea=business_idea,
+                    agent_type__in=scheduled_agents
+                ).update(status='IN_PROGRESS')
+                schedule_rollup_refresh(business_idea)
+                
+                AnalysisTask.objects.bulk_create([
+                    AnalysisTask(
+                        business_idea=business_idea,
+                        workflow=workflow,
+                        task_id=signature.id,
+                        agent_type=signature.args[1],
+                        status='PENDING'
+                    )
+                    for signature in agent_signatures
+                ])
+        except IntegrityError:
+            # A concurrent request with the same key created its workflow first
+            inflight = AnalysisWorkflow.objects.filter(dedup_key=dedup_key, finalized=False).first()
+            if inflight is None:
+                raise
+            return _attach_to_workflow(self.request.id, business_idea, inflight)
+        
+        agent_tasks = group(agent_signatures)
+        
+        if join_mode == 'counter':
+            # The last agent to finish schedules the final report (see _complete_workflow_member)
+            analysis_workflow = agent_tasks.apply_async()
+        else:
+            # Chain: run all agent analyses, then create final report
+            analysis_workflow = chord(agent_tasks)(
+                create_final_analysis_report.s(
+                    business_idea_id,
+                    rerun_agent_types=scheduled_agents if selective else None,
+                    workflow_id=str(workflow.id)
+                )
+            )
+        
         # Track the workflow
         AnalysisTask.objects.create(
             business_idea=business_idea,
+            workflow=workflow,
             task_id=analysis_workflow.id,
             agent_type='',  # This is the orchestrator
-            status='STARTED'
+            status='STARTED',
+            result=f"Started workflow {workflow.id} (dedup key {dedup_key})"
         )
         
         logger.info(f"Analysis workflow {analysis_workflow.id} started for {business_idea.title}")
@@ -85,129 +223,179 @@ def orchestrate_business_analysis(self, business_idea_id: str):
                 business_idea.save()
             except:
                 pass
+        if workflow is not None:
+            # Close a workflow whose fan-out failed so the retry is not deduplicated into it
+            AnalysisWorkflow.objects.filter(id=workflow.id, finalized=False).update(
+                finalized=True, finalized_at=timezone.now()
+            )
+        _release_analysis_slot()
         raise self.retry(countdown=60, exc=e)
 
 
 @shared_task(bind=True, max_retries=2)
-def analyze_with_agent(self, business_idea_id: str, agent_type: str, context_dict: Dict[str, Any]):
+def analyze_with_agent(self, business_idea_id: str, agent_type: str, context_version: str,
+                       workflow_id: Optional[str] = None):
     """
     Task that runs analysis with a specific agent type.
+    
+    Only the idea id and context version travel through the broker; the context is
+    loaded from the shared cache. The chord result is a minimal
+    ``(agent_type, report_status)`` tuple.
+    
+    Persistence is deferred to the end of the run: one read of the report row and
+    one transaction writing only the result fields (see ``_save_agent_result``).
+    The same transaction decrements the workflow counter once the run is final.
+    
+    At the start the task takes a lease on its ``AnalysisTask`` row and renews it
+    while the LLM call is in flight; ``reap_stuck_analyses`` requeues tasks whose
+    lease expired because their worker died.
+    
+    The agent gets a deadline just short of the task's soft time limit, which bounds
+    its LLM call and output budget. Celery does not enforce time limits in the
+    threads pool of the agents queue, so the deadline, enforced by the agent itself,
+    is what ends a slow call. Output that streamed in before it is saved as a
+    partial report instead of retrying the whole call.
     """
+    started_at = timezone.now()
+    deadline = _agent_deadline(self)
+    agent = None
+    tier_decision = None
     try:
         logger.info(f"Starting {agent_type} analysis for {business_idea_id}")
+        _claim_task_lease(self.request.id, started_at, self.request.hostname)
         
-        # Get business idea and create/update agent report
-        business_idea = BusinessIdea.objects.get(id=business_idea_id)
-        
-        agent_report, created = AgentReport.objects.get_or_create(
-            business_idea=business_idea,
-            agent_type=agent_type,
-            defaults={'status': 'IN_PROGRESS'}
-        )
-        
-        if not created:
-            agent_report.status = 'IN_PROGRESS'
-            agent_report.save()
-        
-        # Track the task
-        AnalysisTask.objects.create(
-            business_idea=business_idea,
-            task_id=self.request.id,
-            agent_type=agent_type,
-            status='STARTED'
-        )
+        # Siblings may have been cancelled while this task was still queued
+        cancellation = get_cancellation(business_idea_id)
+        if cancellation:
+            return _mark_agent_cancelled(self.request.id, business_idea_id, agent_type,
+                                         cancellation.get('reason', ''), workflow_id)
         
         # Initialize agents if not already done
-        initialize_agents()
+        initialize_all_agents()
         
-        # Create analysis context
-        context = AnalysisContext(**context_dict)
+        # Load the analysis context this task was dispatched with
+        context = load_analysis_context(business_idea_id, context_version)
         
         # Get the appropriate agent
         agent = _get_agent_by_type(agent_type)
         if not agent:
             raise ValueError(f"No agent found for type: {agent_type}")
         
-        # Run the analysis (this is async, so we need to handle it properly)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Registered agents are shared, so the per-run deadline and routed model are
+        # set on a copy
+        agent = copy.copy(agent)
+        agent.deadline = deadline
         
-        try:
-            result = loop.run_until_complete(agent.analyze(context))
-        finally:
-            loop.close()
-        
-        # Update the agent report with results
-        if result.success:
-            agent_report.report_content = result.content
-            agent_report.structured_data = result.structured_data
-            agent_report.agent_score = result.structured_data.get('score', 
-                                      result.structured_data.get('market_score',
-                                      result.structured_data.get('financial_score', 50)))
-            agent_report.confidence = result.confidence
-            agent_report.llm_model_used = result.model_used
-            agent_report.token_usage = result.token_usage
-            agent_report.status = 'COMPLETED'
-            
-            # Calculate cost estimate (rough estimation)
-            agent_report.cost_estimate = _estimate_cost(result.model_used, result.token_usage)
-            
-        else:
-            agent_report.status = 'FAILED'
-            agent_report.error_message = result.error_message
+        # Route to the cheapest model tier expected to handle this idea
+        if getattr(settings, 'MODEL_TIERING_ENABLED', False):
+            business_idea = BusinessIdea.objects.select_related('triage').get(id=business_idea_id)
+            tier_decision = select_model_tier(agent_type, business_idea)
+            agent.model_preference = tier_decision.model
         
-        agent_report.execution_time = timedelta(seconds=result.execution_time)
-        agent_report.save()
+        # Run the analysis on the process-wide agent event loop
+        result = run_agent_coroutine(
+            agent.analyze(context),
+            model_name=agent.model_preference,
+            check_cancelled=_agent_heartbeat(self.request.id, business_idea_id)
+        )
         
-        # Update task status
-        AnalysisTask.objects.filter(task_id=self.request.id).update(
-            status='SUCCESS' if result.success else 'FAILURE',
-            completed_at=timezone.now()
+        report_values = _agent_report_values(result, tier_decision)
+        # Matched before the save so the early decision is claimed in the same
+        # transaction that counts this agent as done
+        early_decision = _early_decision_reason(agent_type, result.structured_data) if result.success else None
+        agent_report = _save_agent_result(
+            self.request.id, business_idea_id, agent_type, report_values,
+            task_status='SUCCESS' if result.success else 'FAILURE',
+            started_at=started_at,
+            workflow_id=workflow_id,
+            early_decision=early_decision
         )
+        record_execution(ExecutionRecord.from_response(
+            agent_type, business_idea_id, result, report_values.get('cost_estimate', 0)
+        ))
         
         logger.info(f"Completed {agent_type} analysis for {business_idea_id}")
-        return {
-            'agent_type': agent_type,
-            'success': result.success,
-            'score': agent_report.agent_score,
-            'report_id': str(agent_report.id)
-        }
         
+        return (agent_type, agent_report.status)
+    
+    except AnalysisCancelled as e:
+        logger.info(f"{agent_type} analysis for {business_idea_id} cancelled: {e.reason}")
+        return _mark_agent_cancelled(self.request.id, business_idea_id, agent_type, e.reason, workflow_id)
+    
     except Exception as e:
         logger.error(f"Failed {agent_type} analysis for {business_idea_id}: {str(e)}")
+        record_execution(ExecutionRecord(
+            agent_type=agent_type,
+            business_idea_id=business_idea_id,
+            status='error',
+            execution_time=(timezone.now() - started_at).total_seconds(),
+            error_message=str(e),
+            error_type=type(e).__name__
+        ))
         
-        # Update agent report status
+        # Update agent report and task status; only the last attempt counts towards
+        # the workflow join
+        final_attempt = self.request.retries >= self.max_retries
         try:
-            agent_report = AgentReport.objects.get(
-                business_idea_id=business_idea_id,
-                agent_type=agent_type
+            _save_agent_result(
+                self.request.id, business_idea_id, agent_type,
+                {'status': 'FAILED', 'error_message': str(e)},
+                task_status='FAILURE' if final_attempt else 'RETRY',
+                started_at=started_at,
+                error_message=str(e),
+                workflow_id=workflow_id
             )
-            agent_report.status = 'FAILED'
-            agent_report.error_message = str(e)
-            agent_report.save()
         except:
             pass
         
-        # Update task status
-        AnalysisTask.objects.filter(task_id=self.request.id).update(
-            status='FAILURE',
-            error_message=str(e),
-            completed_at=timezone.now()
-        )
-        
         raise self.retry(countdown=30, exc=e)
 
 
 @shared_task(bind=True)
-def create_final_analysis_report(self, agent_results: List[Dict], business_idea_id: str):
+def create_final_analysis_report(self, agent_results: Optional[List[Tuple[str, str]]], business_idea_id: str,
+                                 rerun_agent_types: Optional[List[str]] = None,
+                                 early_decision: Optional[str] = None,
+                                 workflow_id: Optional[str] = None):
     """
     Creates the final comprehensive analysis report by combining all agent reports.
     This is executed after all individual agent analyses are complete.
+    
+    After a selective re-run (``rerun_agent_types`` set) the existing final report is
+    kept as-is unless one of the re-run agents completed successfully.
+    
+    ``early_decision`` carries the reason when a short-circuit rule cancelled the
+    remaining agents; the report is then built from the reports available so far.
+    
+    With the counter join (``ANALYSIS_JOIN_MODE='counter'``) there are no chord
+    results; ``agent_results`` is None and the re-run check reads the reports of
+    the workflow instead.
     """
     try:
+        if early_decision is None and get_cancellation(business_idea_id):
+            # The early-decision path (or a user cancellation) already owns this idea
+            logger.info(f"Skipping chord final report for cancelled analysis {business_idea_id}")
+            return {'business_idea_id': business_idea_id, 'skipped': True}
+        
         logger.info(f"Creating final analysis report for {business_idea_id}")
         
         business_idea = BusinessIdea.objects.get(id=business_idea_id)
+        if business_idea.status == 'CANCELLED':
+            logger.info(f"Skipping final report for cancelled analysis {business_idea.title}")
+            return {'business_idea_id': business_idea_id, 'skipped': True}
+        
+        if rerun_agent_types is not None and not _final_report_needs_refresh(
+            business_idea, rerun_agent_types, workflow_id
+        ):
+            business_idea.status = 'COMPLETED'
+            business_idea.save()
+            logger.info(f"Selective re-run of {', '.join(rerun_agent_types)} produced no new reports; "
+                        f"keeping existing final report for {business_idea.title}")
+            return {
+                'business_idea_id': business_idea_id,
+                'overall_score': business_idea.overall_score,
+                'recommendation': business_idea.recommendation,
+                'regenerated': False
+            }
         
         # Get all completed agent reports
         agent_reports = AgentReport.objects.filter(
@@ -219,41 +407,29 @@ def create_final_analysis_report(self, agent_results: List[Dict], business_idea_
             raise ValueError("No completed agent reports found")
         
         # Initialize agents to get CEO agent
-        initialize_agents()
+        initialize_all_agents()
         ceo_agent = communication_hub.agents.get('CEO')
         
         if not ceo_agent:
             raise ValueError("CEO agent not available")
         
         # Prepare context with all agent insights
-        context = AnalysisContext(
-            business_idea_id=str(business_idea.id),
-            title=business_idea.title,
-            description=business_idea.description,
-            industry=business_idea.industry,
-            target_market=business_idea.target_market or "",
-            estimated_budget=float(business_idea.estimated_budget) if business_idea.estimated_budget else None,
-            additional_data={
-                'agent_reports': [
-                    {
-                        'agent_type': report.agent_type,
-                        'content': report.report_content,
-                        'structured_data': report.structured_data,
-                        'score': report.agent_score
-                    }
-                    for report in agent_reports
-                ]
-            }
-        )
+        context = build_analysis_context(business_idea)
+        context.additional_data = {
+            'agent_reports': [
+                {
+                    'agent_type': report.agent_type,
+                    'content': report.report_content,
+                    'structured_data': report.structured_data,
+                    'score': report.agent_score
+                }
+                for report in agent_reports
+            ],
+            'early_decision': early_decision or ''
+        }
         
         # Generate final summary using CEO agent
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(ceo_agent.analyze(context))
-        finally:
-            loop.close()
+        result = run_agent_coroutine(ceo_agent.analyze(context), model_name=ceo_agent.model_preference)
         
         if not result.success:
             raise ValueError(f"CEO analysis failed: {result.error_message}")
@@ -272,7 +448,9 @@ def create_final_analysis_report(self, agent_results: List[Dict], business_idea_
                 'final_recommendation': _map_recommendation(structured_data.get('recommendation', 'MODIFY')),
                 'confidence_level': str(result.confidence),
                 'generated_by_agent': 'CEO',
-                'total_cost': sum(float(r.cost_estimate or 0) for r in agent_reports)
+                'total_cost': sum(float(r.cost_estimate or 0) for r in agent_reports),
+                'is_early_decision': bool(early_decision),
+                'early_decision_reason': early_decision or ''
             }
         )
         
@@ -284,8 +462,17 @@ def create_final_analysis_report(self, agent_results: List[Dict], business_idea_
             final_report.overall_score = structured_data.get('overall_score', 50)
             final_report.final_recommendation = _map_recommendation(structured_data.get('recommendation', 'MODIFY'))
             final_report.confidence_level = str(result.confidence)
+            final_report.generated_by_agent = 'CEO'
+            final_report.total_cost = sum(float(r.cost_estimate or 0) for r in agent_reports)
+            final_report.is_early_decision = bool(early_decision)
+            final_report.early_decision_reason = early_decision or ''
             final_report.save()
         
+        # Record the full-analysis outcome against the triage decision for accuracy tracking
+        TriageResult.objects.filter(business_idea=business_idea).update(
+            full_analysis_score=final_report.overall_score
+        )
+        
         # Update business idea with final results
         business_idea.status = 'COMPLETED'
         business_idea.overall_score = final_report.overall_score
@@ -314,6 +501,125 @@ def create_final_analysis_report(self, agent_results: List[Dict], business_idea_
             pass
         
         raise
+    
+    finally:
+        _release_analysis_slot()
+
+
+@shared_task
+def dispatch_queued_analyses():
+    """
+    Start queued analyses for which a fair-share slot is free.
+    
+    Runs whenever an analysis finishes and periodically from beat as a safety net.
+    Each picked entry is claimed and its idea counted as running before the
+    orchestrator is sent, so the next run does not hand out the same slot; an
+    entry whose slot a concurrent admission took meanwhile goes back to waiting.
+    """
+    if not cache.add(DISPATCH_LOCK_KEY, True, 60):
+        logger.debug("Queued analysis dispatch already running")
+        return 0
+    
+    dispatched = 0
+    try:
+        for entry in select_entries_to_dispatch():
+            with transaction.atomic():
+                claimed = AnalysisQueueEntry.objects.filter(id=entry.id, status='WAITING').update(
+                    status='DISPATCHED',
+                    dispatched_at=timezone.now()
+                )
+                if not claimed:
+                    continue
+                BusinessIdea.objects.filter(id=entry.business_idea_id).update(status='ANALYZING')
+                schedule_rollup_refresh_by_id(entry.business_idea_id)
+            
+            if not slot_still_free(entry.business_idea_id, entry.user_id, entry.priority_tier):
+                # The entry keeps its place for the next dispatch
+                with transaction.atomic():
+                    AnalysisQueueEntry.objects.filter(id=entry.id).update(status='WAITING', dispatched_at=None)
+                    BusinessIdea.objects.filter(id=entry.business_idea_id).update(status='QUEUE')
+                    schedule_rollup_refresh_by_id(entry.business_idea_id)
+                continue
+            
+            orchestrate_business_analysis.apply_async(
+                args=[str(entry.business_idea_id)],
+                kwargs={
+                    'agent_types': entry.agent_types,
+                    'skip_triage': entry.skip_triage,
+                    'queue_entry_id': entry.id,
+                },
+                priority=get_tier_settings(entry.priority_tier)['priority']
+            )
+            dispatched += 1
+    finally:
+        cache.delete(DISPATCH_LOCK_KEY)
+    
+    if dispatched:
+        logger.info(f"Dispatched {dispatched} queued analyses")
+    return dispatched
+
+
+@shared_task
+def reap_stuck_analyses():
+    """
+    Recover analyses whose worker died mid-run.
+    
+    Runs periodically from beat:
+    
+    - Agent tasks whose lease expired (or that sat queued or retrying for longer
+      than ``ANALYSIS_REAPER_PENDING_TIMEOUT``) are revoked and only that agent is
+      requeued, up to ``ANALYSIS_REAPER_MAX_ATTEMPTS`` dispatches; after that the
+      agent is failed and counted as done so the final report can still be built.
+    - Finished workflows whose final report never landed get it requeued.
+    - Ideas left ``ANALYZING`` without any workflow are failed so they stop counting
+      as in progress and can be re-analysed.
+    
+    Every action is recorded as a ``ReaperAction`` for operators.
+    """
+    now = timezone.now()
+    pending_cutoff = now - timedelta(seconds=getattr(settings, 'ANALYSIS_REAPER_PENDING_TIMEOUT', 7200))
+    
+    lost_tasks = AnalysisTask.objects.filter(
+        Q(status='STARTED', lease_expires_at__lt=now)
+        | Q(status='PENDING', created_at__lt=pending_cutoff)
+        | Q(status='RETRY', completed_at__lt=pending_cutoff)
+    ).exclude(agent_type='').select_related('workflow', 'business_idea__submitted_by')
+    
+    actions = 0
+    for task in lost_tasks:
+        actions += _reap_agent_task(task, now)
+    
+    actions += _reap_unreported_workflows(now)
+    actions += _reap_orphaned_analyses(now)
+    
+    if actions:
+        logger.warning(f"Reaper took {actions} actions on stuck analyses")
+    return actions
+
+
+@shared_task
+def refresh_idea_rollups(business_idea_id: str):
+    """Schedule recounts of the rollup slices an idea and its reports are counted in"""
+    return len(schedule_idea_slice_refreshes(business_idea_id))
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_daily_rollups(self, user_id: Optional[int], day: str):
+    """Recount one (user, day) slice of the analytics rollups after an idea or report changed"""
+    try:
+        refresh_rollup_slice(user_id, date.fromisoformat(day))
+    except IntegrityError as exc:
+        # A concurrent recount of the same slice inserted its rows first
+        raise self.retry(exc=exc, countdown=getattr(settings, 'ROLLUP_REFRESH_DELAY', 5))
+
+
+@shared_task
+def reconcile_daily_rollups():
+    """Rebuild the analytics rollups from the idea and report tables (nightly beat)"""
+    counts = rebuild_rollups()
+    logger.info(f"Reconciled analytics rollups: {counts['idea_rollups']} idea rows, "
+                f"{counts['agent_rollups']} agent rows")
+    return counts
 
 
 @shared_task
@@ -337,11 +643,656 @@ def generate_business_ideas(request_id: str):
         raise
 
 
+def select_agents_for_rerun(business_idea: BusinessIdea, failed: bool = True,
+                            stale_after: Optional[timedelta] = None,
+                            agent_types: Optional[List[str]] = None) -> List[str]:
+    """
+    Pick the analysis agents that should be re-run for a business idea.
+    
+    Agents are selected when they are explicitly listed, when their report failed
+    (or was cancelled or never produced), or when their last completed run is older than ``stale_after``.
+    """
+    selected = set()
+    
+    if agent_types:
+        selected.update(t for t in agent_types if t in ANALYSIS_AGENT_TYPES)
+    
+    if failed or stale_after is not None:
+        reports = {
+            report['agent_type']: report
+            for report in AgentReport.objects.filter(
+                business_idea=business_idea,
+                agent_type__in=ANALYSIS_AGENT_TYPES
+            ).values('agent_type', 'status', 'completed_at')
+        }
+        stale_before = timezone.now() - stale_after if stale_after is not None else None
+        
+        for agent_type in ANALYSIS_AGENT_TYPES:
+            report = reports.get(agent_type)
+            if failed and (report is None or report['status'] in ('FAILED', 'CANCELLED')):
+                selected.add(agent_type)
+            elif (stale_before is not None and report is not None and report['status'] == 'COMPLETED'
+                  and (report['completed_at'] is None or report['completed_at'] < stale_before)):
+                selected.add(agent_type)
+    
+    # Keep the canonical agent order so task fan-out is deterministic
+    return [agent_type for agent_type in ANALYSIS_AGENT_TYPES if agent_type in selected]
+
+
+def cancel_business_analysis(business_idea: BusinessIdea, reason: str = 'Cancelled by user') -> Dict[str, int]:
+    """
+    Stop a queued or running analysis.
+    
+    Sets the cancellation flag, revokes agent tasks still waiting in the broker and
+    drops the idea from the fair-share queue. Running agent tasks poll the flag
+    while their LLM call is in flight and abort it, closing the HTTP request and
+    freeing the inference server slot within ``CANCELLATION_POLL_INTERVAL``.
+    Reports, task rows and workflows are marked in one transaction, so late
+    finishes of running agents are not counted and no final report is built.
+    """
+    business_idea_id = str(business_idea.id)
+    now = timezone.now()
+    request_cancellation(business_idea_id, reason, kind='cancelled')
+    
+    with transaction.atomic():
+        open_tasks = AnalysisTask.objects.select_for_update().filter(
+            business_idea=business_idea,
+            status__in=['PENDING', 'STARTED', 'RETRY']
+        )
+        queued_ids = []
+        running_ids = []
+        for task_id, task_status in open_tasks.values_list('task_id', 'status'):
+            (running_ids if task_status == 'STARTED' else queued_ids).append(task_id)
+        
+        open_tasks.update(status='REVOKED', error_message=reason, completed_at=now)
+        reports = AgentReport.objects.filter(
+            business_idea=business_idea,
+            status__in=['PENDING', 'IN_PROGRESS', 'RETRYING']
+        ).update(status='CANCELLED', error_message=reason)
+        schedule_rollup_refresh(business_idea)
+        AnalysisWorkflow.objects.filter(
+            business_idea=business_idea,
+            finalized=False
+        ).update(finalized=True, finalized_at=now)
+        dequeued = AnalysisQueueEntry.objects.filter(
+            business_idea=business_idea,
+            status='WAITING'
+        ).update(status='CANCELLED')
+        
+        was_running = business_idea.status == 'ANALYZING'
+        business_idea.status = 'CANCELLED'
+        business_idea.save(update_fields=['status', 'updated_at'])
+        if was_running:
+            _release_analysis_slot()
+    
+    revoke_tasks(queued_ids)
+    
+    logger.info(f"Cancelled analysis of {business_idea.title}: {len(queued_ids)} queued agent tasks revoked, "
+                f"{len(running_ids)} running ones signalled ({reason})")
+    return {
+        'revoked_tasks': len(queued_ids),
+        'signalled_tasks': len(running_ids),
+        'cancelled_reports': reports,
+        'dequeued': dequeued,
+    }
+
+
+def _final_report_needs_refresh(business_idea: BusinessIdea, rerun_agent_types: List[str],
+                                workflow_id: Optional[str]) -> bool:
+    """A final report must be (re)built if none exists or a re-run agent produced a new report"""
+    if not FinalAnalysisReport.objects.filter(business_idea=business_idea).exists():
+        return True
+    
+    workflow = AnalysisWorkflow.objects.filter(id=workflow_id).only('created_at').first()
+    completed_reports = AgentReport.objects.filter(
+        business_idea=business_idea,
+        agent_type__in=rerun_agent_types,
+        status='COMPLETED'
+    )
+    if workflow:
+        completed_reports = completed_reports.filter(completed_at__gte=workflow.created_at)
+    return completed_reports.exists()
+
+
+def _run_triage(business_idea: BusinessIdea, context: AnalysisContext) -> Optional[TriageResult]:
+    """
+    Run the triage pre-screen for a business idea.
+    
+    An existing triage result is reused so retries and re-analyses don't pay for it
+    again, as long as it screened the current input (same context version); after
+    the title, description or other input changed the idea is screened again.
+    Returns None when triage could not be run, in which case the caller falls back
+    to the full analysis.
+    """
+    context_version = get_context_version(context)
+    existing = TriageResult.objects.filter(business_idea=business_idea).first()
+    if existing and existing.context_version == context_version:
+        return existing
+    
+    initialize_all_agents()
+    triage_agent = communication_hub.agents.get('Triage')
+    if not triage_agent:
+        logger.warning("Triage agent not available, running full analysis")
+        return None
+    
+    result = run_agent_coroutine(triage_agent.analyze(context), model_name=triage_agent.model_preference)
+    
+    if not result.success:
+        logger.warning(f"Triage failed for {business_idea.title}, running full analysis: {result.error_message}")
+        return None
+    
+    threshold = getattr(settings, 'TRIAGE_THRESHOLD', 30)
+    score = result.structured_data.get('viability_score', 50)
+    
+    if existing:
+        logger.info(f"Input of {business_idea.title} changed since triage; replacing the stale verdict")
+        existing.delete()
+    
+    return TriageResult.objects.create(
+        business_idea=business_idea,
+        viability_score=score,
+        threshold=threshold,
+        passed=score >= threshold,
+        rationale=result.structured_data.get('rationale', ''),
+        red_flags=result.structured_data.get('red_flags', []),
+        context_version=context_version,
+        llm_model_used=result.model_used,
+        token_usage=result.token_usage,
+        cost_estimate=_estimate_cost(result.model_used, result.token_usage),
+        execution_time=timedelta(seconds=result.execution_time)
+    )
+
+
+def _create_triage_report(business_idea: BusinessIdea, triage: TriageResult):
+    """Create the lightweight final report for an idea screened out by triage"""
+    with transaction.atomic():
+        FinalAnalysisReport.objects.update_or_create(
+            business_idea=business_idea,
+            defaults={
+                'executive_summary': triage.rationale or 'Screened out by the triage pre-screen.',
+                'key_findings': triage.red_flags,
+                'recommendations': ['Request a full analysis if you believe the screening missed something.'],
+                'overall_score': triage.viability_score,
+                'final_recommendation': 'REJECT',
+                'confidence_level': 'LOW',
+                'generated_by_agent': 'TRIAGE',
+                'total_cost': triage.cost_estimate,
+            }
+        )
+        
+        business_idea.status = 'COMPLETED'
+        business_idea.overall_score = triage.viability_score
+        business_idea.recommendation = 'REJECT'
+        business_idea.confidence_level = 'LOW'
+        business_idea.save()
+
+
+def _orchestration_key(business_idea_id: str, context_version: str, agent_types: List[str]) -> str:
+    """Idempotency key of an orchestration request: idea id, input fingerprint and agent set"""
+    agents = hashlib.sha1(','.join(sorted(agent_types)).encode('utf-8')).hexdigest()[:8]
+    return f"{business_idea_id}:{context_version}:{agents}"
+
+
+def _attach_to_workflow(request_id: Optional[str], business_idea: BusinessIdea,
+                        workflow: AnalysisWorkflow) -> str:
+    """Record that an orchestration request joined an in-flight workflow instead of starting one"""
+    now = timezone.now()
+    AnalysisTask.objects.update_or_create(
+        task_id=request_id or str(uuid.uuid4()),
+        defaults={
+            'business_idea': business_idea,
+            'workflow': workflow,
+            'agent_type': '',
+            'status': 'SUCCESS',
+            'result': f"Deduplicated: attached to in-flight workflow {workflow.id} (dedup key {workflow.dedup_key})",
+            'started_at': now,
+            'completed_at': now,
+        }
+    )
+    if business_idea.status != 'ANALYZING':
+        BusinessIdea.objects.filter(id=business_idea.id).update(status='ANALYZING', updated_at=now)
+        schedule_rollup_refresh(business_idea)
+    
+    logger.info(f"Duplicate analysis request for {business_idea.title} attached to workflow {workflow.id}")
+    return f"Attached to in-flight analysis of {business_idea.title}"
+
+
+def _agent_deadline(task) -> Optional[float]:
+    """
+    ``time.monotonic()`` by which an agent task must have its LLM answer.
+    
+    Taken from the task's soft time limit (per-call, per-task or the app default)
+    minus ``AGENT_DEADLINE_MARGIN``, which leaves time to save the result. Only the
+    configured value is used: the threads pool never raises the limit itself.
+    """
+    soft_limit = (task.request.timelimit or (None, None))[1] or task.soft_time_limit \
+        or task.app.conf.task_soft_time_limit
+    if not soft_limit:
+        return None
+    margin = getattr(settings, 'AGENT_DEADLINE_MARGIN', 15)
+    return time.monotonic() + max(soft_limit - margin, 1)
+
+
+def _agent_report_values(result, tier_decision=None) -> Dict[str, Any]:
+    """AgentReport fields for the outcome of one agent run"""
+    if result.success:
+        report_values = {
+            'report_content': result.content,
+            'structured_data': result.structured_data,
+            'agent_score': result.structured_data.get('score',
+                           result.structured_data.get('market_score',
+                           result.structured_data.get('financial_score', 50))),
+            'confidence': result.confidence,
+            'llm_model_used': result.model_used,
+            'token_usage': result.token_usage,
+            # Output cut off at the deadline is incomplete, not unparseable
+            'parse_failed': not result.partial and is_parse_failure(result.content),
+            'is_partial': result.partial,
+            'status': 'COMPLETED',
+            # Calculate cost estimate (rough estimation)
+            'cost_estimate': _estimate_cost(result.model_used, result.token_usage),
+        }
+    else:
+        report_values = {
+            'status': 'FAILED',
+            'error_message': result.error_message,
+        }
+    
+    report_values.update({
+        'execution_time': timedelta(seconds=result.execution_time),
+        'completed_at': timezone.now(),
+        'model_tier': tier_decision.tier if tier_decision else '',
+        'difficulty_score': tier_decision.difficulty if tier_decision else None,
+    })
+    return report_values
+
+
+def _claim_task_lease(task_id: str, started_at, worker: Optional[str]):
+    """Mark the task started and take the lease on it for this worker"""
+    AnalysisTask.objects.filter(task_id=task_id).exclude(status__in=FINAL_TASK_STATUSES).update(
+        status='STARTED',
+        started_at=started_at,
+        lease_expires_at=started_at + timedelta(seconds=getattr(settings, 'AGENT_LEASE_SECONDS', 120)),
+        worker=worker or ''
+    )
+
+
+def _agent_heartbeat(task_id: str, business_idea_id: str):
+    """
+    Callback polled while the agent call is in flight: checks for cancellation and
+    renews the task lease every ``AGENT_LEASE_RENEW_INTERVAL`` seconds.
+    """
+    renew_interval = getattr(settings, 'AGENT_LEASE_RENEW_INTERVAL', 30)
+    last_renewal = time.monotonic()
+    
+    def heartbeat():
+        nonlocal last_renewal
+        raise_if_cancelled(business_idea_id)
+        if time.monotonic() - last_renewal >= renew_interval:
+            lease_seconds = getattr(settings, 'AGENT_LEASE_SECONDS', 120)
+            AnalysisTask.objects.filter(task_id=task_id, status='STARTED').update(
+                lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds)
+            )
+            last_renewal = time.monotonic()
+    
+    return heartbeat
+
+
+def _reap_agent_task(task: AnalysisTask, now) -> int:
+    """Revoke one lost agent task and requeue or fail its agent"""
+    workflow = task.workflow
+    business_idea = task.business_idea
+    lost_reason = (f"Lease expired on {task.worker or 'unknown worker'}" if task.status == 'STARTED'
+                   else f"Stuck in {task.status} since {task.created_at:%Y-%m-%d %H:%M}")
+    requeue = None
+    
+    with transaction.atomic():
+        # Claiming the row also keeps a late finish of the lost run from being counted
+        claimed = AnalysisTask.objects.filter(id=task.id, status=task.status).update(
+            status='REVOKED',
+            completed_at=now,
+            error_message=lost_reason
+        )
+        if not claimed:
+            return 0
+        
+        if workflow is None or workflow.finalized:
+            action, detail = 'RELEASED_TASK', f"{lost_reason}; workflow already finished"
+        elif task.attempt >= getattr(settings, 'ANALYSIS_REAPER_MAX_ATTEMPTS', 3):
+            AgentReport.objects.filter(
+                business_idea=business_idea,
+                agent_type=task.agent_type
+            ).exclude(status='COMPLETED').update(
+                status='FAILED',
+                error_message=f"{lost_reason}; gave up after {task.attempt} attempts"
+            )
+            schedule_rollup_refresh(business_idea)
+            _complete_workflow_member(str(workflow.id))
+            action, detail = 'FAILED_AGENT', f"{lost_reason}; gave up after {task.attempt} attempts"
+        else:
+            _, context_version = prime_analysis_context(business_idea)
+            requeue = analyze_with_agent.s(
+                str(business_idea.id), task.agent_type, context_version, str(workflow.id)
+            ).set(priority=get_tier_settings(get_priority_tier(business_idea.submitted_by))['priority'])
+            if getattr(settings, 'ANALYSIS_JOIN_MODE', 'counter') == 'counter':
+                requeue.set(ignore_result=True)
+            requeue.freeze()
+            AnalysisTask.objects.create(
+                business_idea=business_idea,
+                workflow=workflow,
+                task_id=requeue.id,
+                agent_type=task.agent_type,
+                status='PENDING',
+                attempt=task.attempt + 1
+            )
+            transaction.on_commit(requeue.apply_async)
+            action, detail = 'REQUEUED_AGENT', f"{lost_reason}; requeued as {requeue.id}"
+        
+        ReaperAction.objects.create(
+            business_idea=business_idea,
+            workflow=workflow,
+            action=action,
+            agent_type=task.agent_type,
+            task_id=task.task_id,
+            attempt=task.attempt,
+            detail=detail
+        )
+    
+    revoke_tasks([task.task_id])
+    logger.warning(f"Reaper: {action} {task.agent_type} for {business_idea.title}: {detail}")
+    return 1
+
+
+def _reap_unreported_workflows(now) -> int:
+    """Requeue the final report of finished workflows whose idea is still analysing"""
+    report_timeout = timedelta(seconds=getattr(settings, 'ANALYSIS_REAPER_REPORT_TIMEOUT', 900))
+    max_attempts = getattr(settings, 'ANALYSIS_REAPER_MAX_ATTEMPTS', 3)
+    
+    actions = 0
+    workflows = AnalysisWorkflow.objects.filter(
+        finalized=True,
+        finalized_at__lt=now - report_timeout,
+        business_idea__status='ANALYZING'
+    ).select_related('business_idea')
+    for workflow in workflows:
+        business_idea = workflow.business_idea
+        if business_idea.workflows.filter(created_at__gt=workflow.created_at).exists():
+            continue  # A newer run owns the idea
+        
+        previous = ReaperAction.objects.filter(workflow=workflow, action='REQUEUED_REPORT')
+        if previous.filter(created_at__gte=now - report_timeout).exists():
+            continue  # Give the last requeue time to finish
+        
+        attempt = previous.count() + 1
+        if attempt > max_attempts:
+            _fail_stuck_analysis(business_idea, workflow, f"Final report not created after {max_attempts} requeues")
+        else:
+            ReaperAction.objects.create(
+                business_idea=business_idea,
+                workflow=workflow,
+                action='REQUEUED_REPORT',
+                attempt=attempt,
+                detail=f"Workflow finished at {workflow.finalized_at:%Y-%m-%d %H:%M} without a final report"
+            )
+            create_final_analysis_report.delay(
+                None,
+                str(business_idea.id),
+                rerun_agent_types=workflow.agent_types if workflow.selective else None,
+                workflow_id=str(workflow.id)
+            )
+            logger.warning(f"Reaper: requeued final report for {business_idea.title} (attempt {attempt})")
+        actions += 1
+    
+    return actions
+
+
+def _reap_orphaned_analyses(now) -> int:
+    """Fail ideas marked as analysing that never got a workflow (lost orchestration)"""
+    cutoff = now - timedelta(seconds=getattr(settings, 'ANALYSIS_REAPER_ORPHAN_TIMEOUT', 3600))
+    orphaned = BusinessIdea.objects.filter(status='ANALYZING', updated_at__lt=cutoff).filter(
+        ~Exists(AnalysisWorkflow.objects.filter(
+            business_idea=OuterRef('pk'),
+            created_at__gte=OuterRef('updated_at')
+        ))
+    )
+    
+    actions = 0
+    for business_idea in orphaned:
+        _fail_stuck_analysis(
+            business_idea, None,
+            f"No agent workflow started since {business_idea.updated_at:%Y-%m-%d %H:%M}"
+        )
+        actions += 1
+    return actions
+
+
+def _fail_stuck_analysis(business_idea: BusinessIdea, workflow: Optional[AnalysisWorkflow], reason: str):
+    """Mark an unrecoverable analysis failed so it no longer counts as in progress"""
+    with transaction.atomic():
+        AgentReport.objects.filter(
+            business_idea=business_idea,
+            status__in=['PENDING', 'IN_PROGRESS', 'RETRYING']
+        ).update(status='FAILED', error_message=reason)
+        BusinessIdea.objects.filter(id=business_idea.id).update(status='FAILED', updated_at=timezone.now())
+        schedule_rollup_refresh(business_idea)
+        ReaperAction.objects.create(
+            business_idea=business_idea,
+            workflow=workflow,
+            action='FAILED_ANALYSIS',
+            detail=reason
+        )
+        _release_analysis_slot()
+    logger.warning(f"Reaper: failed stuck analysis of {business_idea.title}: {reason}")
+
+
+def _release_analysis_slot():
+    """Hand the fair-share slot of a finished or failed analysis to the queue"""
+    if getattr(settings, 'ANALYSIS_FAIR_SHARE_ENABLED', True):
+        transaction.on_commit(lambda: dispatch_queued_analyses.delay())
+
+
+def _match_early_decision_rule(agent_type: str, structured_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the first configured early-decision rule matched by an agent's output"""
+    comparisons = {
+        'lt': lambda actual, expected: actual < expected,
+        'lte': lambda actual, expected: actual <= expected,
+        'gt': lambda actual, expected: actual > expected,
+        'gte': lambda actual, expected: actual >= expected,
+        'eq': lambda actual, expected: actual == expected,
+    }
+    
+    for rule in getattr(settings, 'EARLY_DECISION_RULES', []):
+        if rule.get('agent_type') != agent_type:
+            continue
+        
+        value = structured_data
+        for key in rule['field'].split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        
+        compare = comparisons.get(rule.get('op'))
+        if value is None or compare is None:
+            continue
+        try:
+            if compare(float(value), float(rule['value'])):
+                return rule
+        except (TypeError, ValueError):
+            continue
+    
+    return None
+
+
+def _early_decision_reason(agent_type: str, structured_data: Dict[str, Any]) -> Optional[str]:
+    """The reason to short-circuit the analysis when an agent's output is decisive"""
+    if not getattr(settings, 'EARLY_DECISION_ENABLED', False):
+        return None
+    
+    rule = _match_early_decision_rule(agent_type, structured_data)
+    if not rule:
+        return None
+    return f"{rule.get('reason') or 'Early decision'} ({agent_type} {rule['field']} {rule['op']} {rule['value']})"
+
+
+def _claim_early_decision(business_idea_id: str, reason: str, current_task_id: str,
+                          workflow_id: Optional[str] = None):
+    """
+    Short-circuit the analysis from inside the transaction saving the decisive result.
+    
+    Finalizing the workflow is the claim: it is a conditional update, so the first
+    decisive agent wins, and the counter join of the same transaction (or of any
+    later sibling) finds the workflow finalized and schedules no report of its
+    own. After the commit the cancellation flag stops running siblings, queued
+    ones are revoked and the early-decision report is scheduled.
+    """
+    if workflow_id and not AnalysisWorkflow.objects.filter(id=workflow_id, finalized=False).update(
+        finalized=True, finalized_at=timezone.now()
+    ):
+        return  # The workflow already finished or was cancelled
+    
+    def cancel_siblings():
+        if not request_cancellation(business_idea_id, reason, kind='early_decision'):
+            return  # Another agent (or the user) already cancelled this analysis
+        
+        logger.info(f"Early decision for {business_idea_id}: {reason}")
+        
+        queued_siblings = AnalysisTask.objects.filter(
+            business_idea_id=business_idea_id,
+            status='PENDING'
+        ).exclude(task_id=current_task_id)
+        revoke_tasks(list(queued_siblings.values_list('task_id', flat=True)))
+        queued_siblings.update(status='REVOKED', completed_at=timezone.now())
+        
+        # Tasks started without a workflow row still close any open one
+        AnalysisWorkflow.objects.filter(
+            business_idea_id=business_idea_id,
+            finalized=False
+        ).update(finalized=True, finalized_at=timezone.now())
+        
+        create_final_analysis_report.delay([], business_idea_id, early_decision=reason)
+    
+    transaction.on_commit(cancel_siblings)
+
+
+def _save_agent_result(task_id: str, business_idea_id: str, agent_type: str,
+                       report_values: Dict[str, Any], task_status: str,
+                       started_at=None, error_message: str = '',
+                       workflow_id: Optional[str] = None,
+                       early_decision: Optional[str] = None) -> AgentReport:
+    """
+    Persist the outcome of an agent run.
+    
+    One read of the report row (large text columns deferred) and one transaction
+    that writes only ``report_values`` plus the task status, instead of full-row
+    saves of the report around the LLM call. A final outcome also counts the agent
+    as done in its workflow, after claiming the ``early_decision`` if one is given.
+    """
+    agent_report = AgentReport.objects.filter(
+        business_idea_id=business_idea_id,
+        agent_type=agent_type
+    ).only('id', 'business_idea_id', 'agent_type').first()
+    
+    with transaction.atomic():
+        if agent_report:
+            for field_name, value in report_values.items():
+                setattr(agent_report, field_name, value)
+            agent_report.save(update_fields=list(report_values))
+        else:
+            agent_report = AgentReport.objects.create(
+                business_idea_id=business_idea_id,
+                agent_type=agent_type,
+                **report_values
+            )
+        
+        # The orchestrator pre-creates the task row; tasks started any other way get one here.
+        # A row already in a final state means this run was a redelivery and must not be
+        # counted twice.
+        task_values = {
+            'status': task_status,
+            'started_at': started_at,
+            'completed_at': timezone.now(),
+            'error_message': error_message,
+        }
+        updated = AnalysisTask.objects.filter(task_id=task_id).exclude(
+            status__in=FINAL_TASK_STATUSES
+        ).update(**task_values)
+        if not updated and not AnalysisTask.objects.filter(task_id=task_id).exists():
+            AnalysisTask.objects.create(
+                business_idea_id=business_idea_id,
+                task_id=task_id,
+                agent_type=agent_type,
+                **task_values
+            )
+            updated = 1
+        
+        if updated and task_status in FINAL_TASK_STATUSES:
+            if early_decision:
+                _claim_early_decision(business_idea_id, early_decision, task_id, workflow_id)
+            _complete_workflow_member(workflow_id)
+    
+    return agent_report
+
+
+def _complete_workflow_member(workflow_id: Optional[str]):
+    """
+    Count one agent of a workflow as done and schedule the final report after the last one.
+    
+    The decrement is an atomic ``F()`` update and finalization is claimed with a
+    conditional update, so exactly one agent triggers the report even when several
+    finish at the same moment. The report is scheduled after the surrounding
+    transaction commits.
+    """
+    if not workflow_id:
+        return
+    
+    AnalysisWorkflow.objects.filter(id=workflow_id, pending_count__gt=0).update(
+        pending_count=F('pending_count') - 1
+    )
+    claimed = AnalysisWorkflow.objects.filter(
+        id=workflow_id,
+        pending_count=0,
+        finalized=False
+    ).update(finalized=True, finalized_at=timezone.now())
+    
+    if claimed and getattr(settings, 'ANALYSIS_JOIN_MODE', 'counter') == 'counter':
+        workflow = AnalysisWorkflow.objects.only('business_idea_id', 'agent_types', 'selective').get(id=workflow_id)
+        transaction.on_commit(lambda: create_final_analysis_report.delay(
+            None,
+            str(workflow.business_idea_id),
+            rerun_agent_types=workflow.agent_types if workflow.selective else None,
+            workflow_id=workflow_id
+        ))
+
+
+def _mark_agent_cancelled(task_id: str, business_idea_id: str, agent_type: str, reason: str,
+                          workflow_id: Optional[str] = None) -> Tuple[str, str]:
+    """Record a cancelled agent run and return its chord result"""
+    with transaction.atomic():
+        AgentReport.objects.filter(
+            business_idea_id=business_idea_id,
+            agent_type=agent_type
+        ).exclude(status='COMPLETED').update(status='CANCELLED', error_message=reason)
+        schedule_rollup_refresh_by_id(business_idea_id)
+        
+        updated = AnalysisTask.objects.filter(task_id=task_id).exclude(
+            status__in=FINAL_TASK_STATUSES
+        ).update(
+            status='REVOKED',
+            error_message=reason,
+            completed_at=timezone.now()
+        )
+        if updated:
+            _complete_workflow_member(workflow_id)
+    
+    return (agent_type, 'CANCELLED')
+
+
 def _get_agent_by_type(agent_type: str):
     """Get agent instance by type"""
     agent_mapping = {
         'MARKET_RESEARCH': 'MarketResearchAgent',
         'FINANCIAL': 'FinancialAnalyst',
+        'MARKETING': 'MarketingStrategist',
+        'TECH_LEAD': 'TechnicalLead',
+        'RISK_ANALYST': 'RiskAnalyst',
         'CEO': 'CEO',
         # Add more mappings as needed
     }
@@ -359,6 +1310,7 @@ def _estimate_cost(model_name: str, token_usage: int) -> float:
         'gpt-4-turbo-preview': 0.00003,
         'gpt-4': 0.00006,
         'gpt-3.5-turbo': 0.000002,
+        'gpt-4o-mini': 0.0000006,
         'claude-3-sonnet': 0.000015,
         'claude-3-opus': 0.000075,
     }
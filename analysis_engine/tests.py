@@ -0,0 +1,1369 @@
+"""
+Tests for the Analysis Engine
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from agent_system.base_agents import AgentResponse
+from analysis_engine.admission import evaluate_admission, get_queue_estimate, submit_for_analysis
+from analysis_engine.agent_runtime import AgentRuntime, get_provider_for_model
+from analysis_engine.cancellation import AnalysisCancelled, get_cancellation, raise_if_cancelled, request_cancellation
+from analysis_engine.context_cache import (
+    build_analysis_context, get_context_version, load_analysis_context, prime_analysis_context
+)
+from analysis_engine.fair_share import (
+    admit_analysis, get_fair_share_metrics, get_running_counts, select_entries_to_dispatch
+)
+from analysis_engine.model_routing import estimate_difficulty, get_parse_failure_rates, select_model_tier
+from analysis_engine.models import (
+    BusinessIdea, AgentReport, AnalysisQueueEntry, AnalysisTask, AnalysisWorkflow, ReaperAction,
+    DailyAgentRollup, DailyIdeaRollup, IdeaGenerationRequest, TriageResult
+)
+from analysis_engine.pagination import KeysetPaginator, approximate_count
+from analysis_engine.rollups import rebuild_rollups, schedule_rollup_refresh
+from analysis_engine.search import highlight_html, search_ideas, search_reports
+from analysis_engine.time_series import idea_activity_series, parse_series_range
+from analysis_engine.tasks import (
+    _agent_report_values, _match_early_decision_rule, _orchestration_key, _run_triage, analyze_with_agent,
+    orchestrate_business_analysis, reap_stuck_analyses, refresh_idea_rollups, select_agents_for_rerun
+)
+
+
+def fake_analysis(self, context):
+    """Stand-in for BaseAIAgent.analyze that returns a canned successful response"""
+    async def respond():
+        return AgentResponse(
+            success=True,
+            content='{"financial_score": 72}',
+            structured_data={'financial_score': 72},
+            confidence=80.0,
+            execution_time=0.5,
+            token_usage=1200,
+            model_used='gpt-3.5-turbo'
+        )
+    return respond()
+
+
+class SelectiveRerunTests(TestCase):
+    """Choosing which agents a re-run covers"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('rerun', password='secret')
+        self.client.force_login(self.user)
+        self.business_idea = BusinessIdea.objects.create(
+            title='Tool library',
+            description='Rent tools by the day',
+            submitted_by=self.user,
+            status='COMPLETED'
+        )
+        now = timezone.now()
+        for agent_type, report_status, completed_at in [
+            ('MARKET_RESEARCH', 'COMPLETED', now),
+            ('FINANCIAL', 'FAILED', None),
+            ('MARKETING', 'COMPLETED', now - timedelta(days=3)),
+            ('TECH_LEAD', 'CANCELLED', None),
+        ]:
+            AgentReport.objects.create(business_idea=self.business_idea, agent_type=agent_type,
+                                       status=report_status, completed_at=completed_at)
+    
+    def test_selection(self):
+        self.assertEqual(select_agents_for_rerun(self.business_idea),
+                         ['FINANCIAL', 'TECH_LEAD', 'RISK_ANALYST'])
+        self.assertEqual(select_agents_for_rerun(self.business_idea, failed=False, stale_after=timedelta(hours=24)),
+                         ['MARKETING'])
+        self.assertEqual(select_agents_for_rerun(self.business_idea, failed=False,
+                                                 agent_types=['TECH_LEAD', 'MARKET_RESEARCH', 'UNKNOWN']),
+                         ['MARKET_RESEARCH', 'TECH_LEAD'])
+    
+    @mock.patch('analysis_engine.views.orchestrate_business_analysis.delay')
+    def test_endpoint_parses_failed_flag(self, delay):
+        url = f'/api/business-ideas/{self.business_idea.id}/rerun_agents/'
+        cases = [
+            ({'failed': 'false', 'stale_hours': '24'}, 'multipart', ['MARKETING']),
+            ({'failed': False, 'agent_types': ['FINANCIAL']}, 'json', ['FINANCIAL']),
+            ({'failed': 'true', 'stale_hours': '24'}, 'multipart',
+             ['FINANCIAL', 'MARKETING', 'TECH_LEAD', 'RISK_ANALYST']),
+            ({}, 'json', ['FINANCIAL', 'TECH_LEAD', 'RISK_ANALYST']),
+        ]
+        for data, content_format, expected in cases:
+            with self.subTest(data=data):
+                BusinessIdea.objects.filter(id=self.business_idea.id).update(status='COMPLETED')
+                if content_format == 'json':
+                    response = self.client.post(url, data, content_type='application/json')
+                else:
+                    response = self.client.post(url, data)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['agent_types'], expected)
+                delay.assert_called_with(str(self.business_idea.id), agent_types=expected)
+        
+        BusinessIdea.objects.filter(id=self.business_idea.id).update(status='COMPLETED')
+        response = self.client.post(url, {'failed': 'maybe'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TriageReuseTests(TestCase):
+    """A triage verdict is reused only for the input it screened"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('triage', password='secret')
+        self.client.force_login(self.user)
+        self.business_idea = BusinessIdea.objects.create(
+            title='Drone deliveries',
+            description='Deliver groceries by drone',
+            submitted_by=self.user
+        )
+        self.triage_agent = mock.Mock(model_preference='gpt-3.5-turbo')
+        self.triage_agent.analyze.side_effect = self.screen
+        self.scores = iter([20, 70])
+    
+    def screen(self, context):
+        async def respond():
+            return AgentResponse(
+                success=True, content='', structured_data={'viability_score': next(self.scores)},
+                confidence=80.0, execution_time=0.2, token_usage=300, model_used='gpt-3.5-turbo'
+            )
+        return respond()
+    
+    def triage(self):
+        with mock.patch('analysis_engine.tasks.initialize_all_agents'), \
+                mock.patch.dict('analysis_engine.tasks.communication_hub.agents', {'Triage': self.triage_agent}):
+            return _run_triage(self.business_idea, build_analysis_context(self.business_idea))
+    
+    def test_edited_idea_is_screened_again(self):
+        first = self.triage()
+        self.assertEqual(self.triage().id, first.id)
+        self.assertEqual(self.triage_agent.analyze.call_count, 1)
+        
+        self.business_idea.description = 'Deliver prescriptions to rural clinics by drone'
+        self.business_idea.save()
+        second = self.triage()
+        
+        self.assertEqual(self.triage_agent.analyze.call_count, 2)
+        self.assertEqual((second.viability_score, second.passed), (70, True))
+        self.assertEqual(TriageResult.objects.get(business_idea=self.business_idea).id, second.id)
+    
+    @mock.patch('analysis_engine.views.orchestrate_business_analysis.delay')
+    def test_full_analysis_queues_the_idea(self, delay):
+        self.triage()
+        response = self.client.post(f'/api/business-ideas/{self.business_idea.id}/full_analysis/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.business_idea.refresh_from_db()
+        self.assertEqual(self.business_idea.status, 'QUEUE')
+        self.assertTrue(TriageResult.objects.get(business_idea=self.business_idea).full_analysis_requested)
+        delay.assert_called_once_with(str(self.business_idea.id), skip_triage=True)
+        self.assertEqual(self.client.post(f'/api/business-ideas/{self.business_idea.id}/full_analysis/').status_code,
+                         400)
+
+
+def analysis_returning(structured_data):
+    """Stand-in for BaseAIAgent.analyze returning ``structured_data``"""
+    def analyze(self, context):
+        async def respond():
+            return AgentResponse(
+                success=True, content=json.dumps(structured_data), structured_data=structured_data,
+                confidence=80.0, execution_time=0.5, token_usage=1000, model_used='gpt-3.5-turbo'
+            )
+        return respond()
+    return analyze
+
+
+@override_settings(MODEL_TIERING_ENABLED=False, EARLY_DECISION_ENABLED=True, AGENT_TELEMETRY_ENABLED=False,
+                   ANALYSIS_JOIN_MODE='counter')
+class EarlyDecisionTests(TestCase):
+    """Decisive agent output cancels the remaining agents"""
+    
+    def setUp(self):
+        cache.clear()
+        self.business_idea = BusinessIdea.objects.create(
+            title='Ice hotel', description='Seasonal hotel built from ice', status='ANALYZING'
+        )
+        _, self.context_version = prime_analysis_context(self.business_idea)
+        self.workflow = AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=['FINANCIAL', 'MARKETING', 'RISK_ANALYST'],
+            pending_count=3
+        )
+        for task_id, agent_type in [('fin', 'FINANCIAL'), ('mkt', 'MARKETING'), ('risk', 'RISK_ANALYST')]:
+            AnalysisTask.objects.create(business_idea=self.business_idea, workflow=self.workflow,
+                                        task_id=task_id, agent_type=agent_type, status='PENDING')
+    
+    def run_agent(self, task_id, agent_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return analyze_with_agent.apply(
+                args=[str(self.business_idea.id), agent_type, self.context_version, str(self.workflow.id)],
+                task_id=task_id
+            ).get()
+    
+    def test_rules_match_configured_thresholds(self):
+        self.assertEqual(_match_early_decision_rule('FINANCIAL', {'financial_score': 15})['op'], 'lte')
+        self.assertIsNone(_match_early_decision_rule('FINANCIAL', {'financial_score': 16}))
+        self.assertIsNone(_match_early_decision_rule('FINANCIAL', {'financial_score': 'n/a'}))
+        self.assertIsNone(_match_early_decision_rule('MARKETING', {'financial_score': 5}))
+        self.assertIsNotNone(_match_early_decision_rule('RISK_ANALYST', {'risk_assessment': {'risk_score': 95}}))
+        self.assertIsNone(_match_early_decision_rule('RISK_ANALYST', {'risk_score': 95}))
+    
+    @mock.patch('analysis_engine.tasks.revoke_tasks')
+    @mock.patch('analysis_engine.tasks.create_final_analysis_report.delay')
+    def test_decisive_agent_cancels_remaining_agents(self, schedule_report, revoke):
+        with mock.patch('agent_system.base_agents.BaseAIAgent.analyze', analysis_returning({'financial_score': 10})):
+            self.assertEqual(self.run_agent('fin', 'FINANCIAL'), ('FINANCIAL', 'COMPLETED'))
+        
+        self.assertCountEqual(revoke.call_args.args[0], ['mkt', 'risk'])
+        self.assertEqual(set(AnalysisTask.objects.exclude(task_id='fin').values_list('status', flat=True)), {'REVOKED'})
+        self.workflow.refresh_from_db()
+        self.assertTrue(self.workflow.finalized)
+        self.assertEqual(get_cancellation(str(self.business_idea.id))['kind'], 'early_decision')
+        schedule_report.assert_called_once()
+        self.assertIn('FINANCIAL financial_score lte 15', schedule_report.call_args.kwargs['early_decision'])
+        
+        # A sibling whose message was already delivered stops before calling its model
+        analyze = mock.Mock(side_effect=AssertionError('agent should not run'))
+        with mock.patch('agent_system.base_agents.BaseAIAgent.analyze', analyze):
+            self.assertEqual(self.run_agent('risk', 'RISK_ANALYST'), ('RISK_ANALYST', 'CANCELLED'))
+        analyze.assert_not_called()
+        schedule_report.assert_called_once()
+    
+    @mock.patch('analysis_engine.tasks.create_final_analysis_report.delay')
+    def test_decisive_last_agent_sends_only_the_early_decision_report(self, schedule_report):
+        with mock.patch('agent_system.base_agents.BaseAIAgent.analyze', analysis_returning({'financial_score': 60})):
+            self.run_agent('fin', 'FINANCIAL')
+            self.run_agent('mkt', 'MARKETING')
+        with mock.patch('agent_system.base_agents.BaseAIAgent.analyze',
+                        analysis_returning({'risk_assessment': {'risk_score': 95}})):
+            self.run_agent('risk', 'RISK_ANALYST')
+        
+        # The counter join of the last agent finds the workflow already claimed by the early decision
+        schedule_report.assert_called_once()
+        self.assertTrue(schedule_report.call_args.kwargs['early_decision'])
+        self.workflow.refresh_from_db()
+        self.assertEqual((self.workflow.pending_count, self.workflow.finalized), (0, True))
+    
+    @mock.patch('analysis_engine.tasks.create_final_analysis_report.delay')
+    def test_indecisive_output_lets_siblings_run(self, schedule_report):
+        with mock.patch('agent_system.base_agents.BaseAIAgent.analyze', analysis_returning({'financial_score': 60})):
+            self.run_agent('fin', 'FINANCIAL')
+        
+        self.assertIsNone(get_cancellation(str(self.business_idea.id)))
+        self.assertEqual(AnalysisTask.objects.get(task_id='mkt').status, 'PENDING')
+        schedule_report.assert_not_called()
+
+
+@override_settings(MODEL_TIER_THRESHOLDS=[35, 65], MODEL_TIER_AGENT_MINIMUM={'FINANCIAL': 'medium'},
+                   MODEL_TIER_MIN_SAMPLES=10, MODEL_TIER_MAX_PARSE_FAILURE_RATE=0.2)
+class ModelTieringTests(TestCase):
+    """Difficulty-based model tier selection"""
+    
+    def setUp(self):
+        self.easy = BusinessIdea.objects.create(title='Dog walking', description='x' * 100)
+        self.hard = BusinessIdea.objects.create(
+            title='Neobank', description='x' * 2000, industry='FINANCE', estimated_budget=2_000_000
+        )
+    
+    def test_difficulty_features(self):
+        self.assertEqual(estimate_difficulty(self.easy)['difficulty'], 14)
+        self.assertEqual(estimate_difficulty(self.hard)['difficulty'], 87)
+        
+        # A borderline triage score is harder than a clear pass
+        TriageResult.objects.create(business_idea=self.hard, viability_score=50, threshold=30)
+        self.assertEqual(estimate_difficulty(BusinessIdea.objects.get(id=self.hard.id))['difficulty'], 100)
+        TriageResult.objects.create(business_idea=self.easy, viability_score=100, threshold=30)
+        self.assertEqual(estimate_difficulty(BusinessIdea.objects.get(id=self.easy.id))['difficulty'], 2)
+    
+    def test_tier_follows_difficulty_and_agent_minimum(self):
+        self.assertEqual(select_model_tier('MARKETING', self.easy).tier, 'small')
+        self.assertEqual(select_model_tier('FINANCIAL', self.easy).tier, 'medium')
+        decision = select_model_tier('MARKETING', self.hard)
+        self.assertEqual((decision.tier, decision.model), ('large', settings.MODEL_TIERS['large']))
+        self.assertIsNone(decision.escalated_from)
+    
+    def test_tier_escalates_on_parse_failures(self):
+        for index in range(10):
+            AgentReport.objects.create(
+                business_idea=BusinessIdea.objects.create(title=f'Past idea {index}', description='Past'),
+                agent_type='MARKETING', status='COMPLETED', model_tier='small',
+                parse_failed=index < 3, completed_at=timezone.now()
+            )
+        
+        decision = select_model_tier('MARKETING', self.easy)
+        self.assertEqual((decision.tier, decision.escalated_from), ('medium', 'small'))
+        
+        # Too few runs to judge a tier
+        AgentReport.objects.filter(agent_type='MARKETING', parse_failed=False).first().delete()
+        self.assertEqual(select_model_tier('MARKETING', self.easy).tier, 'small')
+
+
+class AnalysisContextCacheTests(TestCase):
+    """Agent tasks load the context by version from the shared cache"""
+    
+    def setUp(self):
+        cache.clear()
+        self.business_idea = BusinessIdea.objects.create(
+            title='Rooftop farms', description='Vegetables grown on office roofs', estimated_budget=50000
+        )
+    
+    def test_hit_miss_and_database_fallback(self):
+        context, version = prime_analysis_context(self.business_idea)
+        self.assertEqual(version, get_context_version(build_analysis_context(self.business_idea)))
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(load_analysis_context(str(self.business_idea.id), version), context)
+        
+        # A miss reads the idea once and caches the context again for the siblings
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(load_analysis_context(str(self.business_idea.id), version), context)
+        with self.assertNumQueries(0):
+            load_analysis_context(str(self.business_idea.id), version)
+    
+    def test_changed_input_gets_a_new_version(self):
+        _, version = prime_analysis_context(self.business_idea)
+        self.business_idea.description = 'Vegetables and bees on office roofs'
+        self.business_idea.save()
+        
+        _, new_version = prime_analysis_context(self.business_idea)
+        self.assertNotEqual(new_version, version)
+        
+        # A task dispatched with the old version falls back to the current input
+        cache.clear()
+        context = load_analysis_context(str(self.business_idea.id), version)
+        self.assertEqual(context.description, 'Vegetables and bees on office roofs')
+
+
+@override_settings(AGENT_RUNTIME_MAX_CONCURRENCY=3, AGENT_PROVIDER_CONCURRENCY={'openai': 2, 'default': 5})
+class AgentRuntimeTests(SimpleTestCase):
+    """Shared per-process event loop for agent calls"""
+    
+    def test_calls_from_many_threads_share_the_loop_within_limits(self):
+        runtime = AgentRuntime()
+        running = {'openai': 0, 'anthropic': 0}
+        peaks = {'openai': 0, 'anthropic': 0, 'total': 0}
+        loops = set()
+        
+        async def llm_call(provider):
+            loops.add(asyncio.get_running_loop())
+            running[provider] += 1
+            peaks[provider] = max(peaks[provider], running[provider])
+            peaks['total'] = max(peaks['total'], sum(running.values()))
+            await asyncio.sleep(0.02)
+            running[provider] -= 1
+            return provider
+        
+        providers = ['openai'] * 6 + ['anthropic'] * 4
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(providers)) as pool:
+            results = list(pool.map(lambda provider: runtime.run(llm_call(provider), provider=provider), providers))
+        
+        self.assertEqual(results, providers)
+        self.assertEqual(len(loops), 1)
+        self.assertEqual(peaks['total'], 3)
+        self.assertLessEqual(peaks['openai'], 2)
+        self.assertEqual(runtime.stats()['in_flight'], {'openai': 0, 'anthropic': 0})
+    
+    def test_cancellation_is_polled_while_the_call_runs(self):
+        runtime = AgentRuntime()
+        polls = []
+        
+        async def llm_call():
+            await asyncio.sleep(0.1)
+            return 'done'
+        
+        self.assertEqual(runtime.run(llm_call(), check_cancelled=lambda: polls.append(1), poll_interval=0.01), 'done')
+        self.assertGreater(len(polls), 2)
+        
+        def cancel_on_third_poll():
+            polls.append(1)
+            if len(polls) >= 3:
+                raise AnalysisCancelled('Stopped')
+        
+        polls.clear()
+        with self.assertRaises(AnalysisCancelled):
+            runtime.run(llm_call(), check_cancelled=cancel_on_third_poll, poll_interval=0.01)
+        self.assertEqual(len(polls), 3)
+    
+    def test_provider_keys(self):
+        self.assertEqual(get_provider_for_model('gpt-4o-mini'), 'openai')
+        self.assertEqual(get_provider_for_model('claude-3-opus'), 'anthropic')
+        self.assertEqual(get_provider_for_model('lmstudio/llama'), 'default')
+
+
+# Execution telemetry is written in batches outside the run being measured
+@override_settings(MODEL_TIERING_ENABLED=False, EARLY_DECISION_ENABLED=False, AGENT_TELEMETRY_ENABLED=False)
+@mock.patch('agent_system.base_agents.BaseAIAgent.analyze', fake_analysis)
+class AgentTaskPersistenceTests(TestCase):
+    """Query budget for persisting one agent run"""
+    
+    # Lease claim on the task row, one read of the report row, then one transaction:
+    # savepoint, report write, task status update, workflow counter decrement,
+    # finalization claim, release. The on-commit hooks add no queries: the status
+    # cache invalidation is cache-only and the rollup refresh is sent to a task.
+    QUERY_BUDGET = 8
+    
+    def setUp(self):
+        cache.clear()
+        self.business_idea = BusinessIdea.objects.create(
+            title='Meal kit delivery',
+            description='Weekly meal kits for busy families',
+            industry='RETAIL'
+        )
+        _, self.context_version = prime_analysis_context(self.business_idea)
+        self.workflow = AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=['FINANCIAL', 'MARKETING'],
+            pending_count=2
+        )
+    
+    def run_agent(self, task_id):
+        # Eager tasks would run the rollup refresh inline; in production it is a broker message
+        with mock.patch('analysis_engine.tasks.refresh_idea_rollups.apply_async') as refresh_rollups:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = analyze_with_agent.apply(
+                    args=[str(self.business_idea.id), 'FINANCIAL', self.context_version, str(self.workflow.id)],
+                    task_id=task_id
+                ).get()
+        refresh_rollups.assert_called_once()
+        return result
+    
+    def test_existing_report_query_budget(self):
+        AgentReport.objects.create(
+            business_idea=self.business_idea,
+            agent_type='FINANCIAL',
+            report_content='x' * 10000,
+            status='IN_PROGRESS'
+        )
+        AnalysisTask.objects.create(
+            business_idea=self.business_idea,
+            task_id='task-1',
+            agent_type='FINANCIAL',
+            status='PENDING'
+        )
+        
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            result = self.run_agent('task-1')
+        
+        self.assertEqual(list(result), ['FINANCIAL', 'COMPLETED'])
+        report = AgentReport.objects.get(business_idea=self.business_idea, agent_type='FINANCIAL')
+        self.assertEqual(report.agent_score, 72)
+        self.assertEqual(report.report_content, '{"financial_score": 72}')
+        self.assertIsNotNone(report.completed_at)
+        
+        task = AnalysisTask.objects.get(task_id='task-1')
+        self.assertEqual(task.status, 'SUCCESS')
+        self.assertIsNotNone(task.started_at)
+    
+    def test_result_write_skips_unchanged_columns(self):
+        AgentReport.objects.create(
+            business_idea=self.business_idea,
+            agent_type='FINANCIAL',
+            report_content='previous report',
+            status='IN_PROGRESS'
+        )
+        
+        with mock.patch.object(AgentReport, 'save', autospec=True, side_effect=AgentReport.save) as save:
+            self.run_agent('task-2')
+        
+        update_fields = save.call_args.kwargs['update_fields']
+        self.assertNotIn('business_idea', update_fields)
+        self.assertNotIn('created_at', update_fields)
+        self.assertIn('report_content', update_fields)
+    
+    def test_new_report_query_budget(self):
+        # First run of an agent: the report is inserted in the same batch
+        AnalysisTask.objects.create(
+            business_idea=self.business_idea,
+            task_id='task-3',
+            agent_type='FINANCIAL',
+            status='PENDING'
+        )
+        
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.run_agent('task-3')
+        
+        self.assertEqual(AgentReport.objects.get(agent_type='FINANCIAL').status, 'COMPLETED')
+        self.assertEqual(AnalysisTask.objects.get(task_id='task-3').status, 'SUCCESS')
+
+
+@override_settings(MODEL_TIERING_ENABLED=False, EARLY_DECISION_ENABLED=False, ANALYSIS_JOIN_MODE='counter')
+@mock.patch('agent_system.base_agents.BaseAIAgent.analyze', fake_analysis)
+class WorkflowCounterTests(TestCase):
+    """Counter-based join of the agent fan-out"""
+    
+    def setUp(self):
+        cache.clear()
+        self.business_idea = BusinessIdea.objects.create(
+            title='Meal kit delivery',
+            description='Weekly meal kits for busy families'
+        )
+        _, self.context_version = prime_analysis_context(self.business_idea)
+        self.workflow = AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=['FINANCIAL', 'MARKETING'],
+            pending_count=2
+        )
+        for task_id, agent_type in [('task-a', 'FINANCIAL'), ('task-b', 'MARKETING')]:
+            AnalysisTask.objects.create(
+                business_idea=self.business_idea,
+                task_id=task_id,
+                agent_type=agent_type,
+                status='PENDING'
+            )
+    
+    def run_agent(self, task_id, agent_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            analyze_with_agent.apply(
+                args=[str(self.business_idea.id), agent_type, self.context_version, str(self.workflow.id)],
+                task_id=task_id
+            ).get()
+    
+    @mock.patch('analysis_engine.tasks.create_final_analysis_report.delay')
+    def test_last_agent_schedules_final_report_once(self, schedule_report):
+        self.run_agent('task-a', 'FINANCIAL')
+        schedule_report.assert_not_called()
+        
+        self.run_agent('task-b', 'MARKETING')
+        # A redelivered message for a finished task must not count again
+        self.run_agent('task-b', 'MARKETING')
+        
+        schedule_report.assert_called_once_with(
+            None,
+            str(self.business_idea.id),
+            rerun_agent_types=None,
+            workflow_id=str(self.workflow.id)
+        )
+        self.workflow.refresh_from_db()
+        self.assertEqual(self.workflow.pending_count, 0)
+        self.assertTrue(self.workflow.finalized)
+
+
+class OrchestrationDedupTests(TestCase):
+    """Idempotency keys on orchestration requests"""
+    
+    def setUp(self):
+        cache.clear()
+        self.business_idea = BusinessIdea.objects.create(
+            title='Pet sitting network',
+            description='Vetted neighbours who look after pets'
+        )
+        _, context_version = prime_analysis_context(self.business_idea)
+        agent_types = ['FINANCIAL', 'MARKETING']
+        self.workflow = AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=agent_types,
+            selective=True,
+            pending_count=2,
+            dedup_key=_orchestration_key(str(self.business_idea.id), context_version, agent_types)
+        )
+    
+    @mock.patch('analysis_engine.tasks.analyze_with_agent.s')
+    def test_repeated_request_attaches_to_inflight_workflow(self, agent_signature):
+        orchestrate_business_analysis.apply(
+            args=[str(self.business_idea.id)],
+            kwargs={'agent_types': ['MARKETING', 'FINANCIAL']},
+            task_id='duplicate-request'
+        ).get()
+        
+        agent_signature.assert_not_called()
+        self.assertEqual(AnalysisWorkflow.objects.filter(business_idea=self.business_idea).count(), 1)
+        decision = AnalysisTask.objects.get(task_id='duplicate-request')
+        self.assertEqual(decision.workflow, self.workflow)
+        self.assertEqual(decision.status, 'SUCCESS')
+        self.assertIn('Deduplicated', decision.result)
+        self.business_idea.refresh_from_db()
+        self.assertEqual(self.business_idea.status, 'ANALYZING')
+
+
+@override_settings(
+    ANALYSIS_FAIR_SHARE_ENABLED=True,
+    ANALYSIS_GLOBAL_CONCURRENCY=3,
+    ANALYSIS_PRIORITY_TIERS={
+        'staff': {'weight': 4, 'max_concurrent': 3, 'priority': 0},
+        'standard': {'weight': 1, 'max_concurrent': 2, 'priority': 6},
+    }
+)
+class FairShareTests(TestCase):
+    """Per-user admission and weighted fair dispatch of analyses"""
+    
+    def setUp(self):
+        self.bulk_user = User.objects.create_user('bulk')
+        self.other_user = User.objects.create_user('other')
+    
+    def create_idea(self, user, status='PENDING'):
+        return BusinessIdea.objects.create(
+            title=f"Idea by {user.username}",
+            description='Subscription box for plants',
+            submitted_by=user,
+            status=status
+        )
+    
+    def test_analysis_over_user_cap_is_queued(self):
+        self.create_idea(self.bulk_user, status='ANALYZING')
+        self.create_idea(self.bulk_user, status='ANALYZING')
+        business_idea = self.create_idea(self.bulk_user)
+        
+        with mock.patch('analysis_engine.tasks.analyze_with_agent') as agent_task:
+            orchestrate_business_analysis.apply(args=[str(business_idea.id)]).get()
+        
+        agent_task.s.assert_not_called()
+        business_idea.refresh_from_db()
+        self.assertEqual(business_idea.status, 'QUEUE')
+        entry = AnalysisQueueEntry.objects.get(business_idea=business_idea)
+        self.assertEqual((entry.status, entry.priority_tier), ('WAITING', 'standard'))
+    
+    def test_concurrent_admissions_do_not_exceed_the_user_cap(self):
+        self.create_idea(self.bulk_user, status='ANALYZING')
+        first, second = self.create_idea(self.bulk_user), self.create_idea(self.bulk_user)
+        
+        def admit_second_meanwhile(**kwargs):
+            # The second submission is admitted between the first one's claim and its cap check
+            if not racing:
+                racing.append(second)
+                racing.append(admit_analysis(second, 'standard'))
+            return get_running_counts(**kwargs)
+        
+        racing = []
+        with mock.patch('analysis_engine.fair_share.get_running_counts', side_effect=admit_second_meanwhile):
+            entry = admit_analysis(first, 'standard')
+        
+        # The second claim counted the first one's, so only the first got the last slot
+        self.assertIsNone(entry)
+        self.assertEqual(racing[1].business_idea, second)
+        self.assertEqual(BusinessIdea.objects.filter(submitted_by=self.bulk_user, status='ANALYZING').count(), 2)
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'QUEUE')
+    
+    def test_freed_slots_are_shared_across_users(self):
+        self.create_idea(self.bulk_user, status='ANALYZING')
+        for user in [self.bulk_user] * 3 + [self.other_user]:
+            AnalysisQueueEntry.objects.create(business_idea=self.create_idea(user, status='QUEUE'), user=user)
+        
+        # Two free slots: the other user goes first, the bulk user is held to their cap
+        selected = select_entries_to_dispatch()
+        
+        self.assertEqual([entry.user_id for entry in selected], [self.other_user.id, self.bulk_user.id])
+        
+        metrics = {row['username']: row for row in get_fair_share_metrics()['users']}
+        self.assertEqual(metrics['bulk']['queue_depth'], 3)
+        self.assertEqual(metrics['bulk']['running'], 1)
+
+
+@override_settings(
+    ANALYSIS_FAIR_SHARE_ENABLED=True,
+    ANALYSIS_GLOBAL_CONCURRENCY=2,
+    ANALYSIS_ADMISSION_MAX_QUEUE=3,
+    ANALYSIS_ADMISSION_DEFAULT_AGENT_SECONDS=60.0
+)
+class AdmissionTests(TestCase):
+    """Queue position, ETA and saturation handling on submission"""
+    
+    def setUp(self):
+        cache.clear()
+        for status in ['ANALYZING', 'ANALYZING', 'QUEUE']:
+            BusinessIdea.objects.create(title='Backlog idea', description='Queued ahead', status=status)
+    
+    def test_eta_counts_queue_and_running_analyses(self):
+        decision = evaluate_admission()
+        
+        # Two slots are busy and one idea waits: this one runs in the second wave
+        self.assertEqual(decision.action, 'queue')
+        self.assertEqual(decision.position, 2)
+        self.assertEqual(decision.estimated_wait_seconds, 240)
+    
+    def test_position_follows_fair_share_order(self):
+        bulk_user = User.objects.create_user('bulk')
+        other_user = User.objects.create_user('other')
+        for _ in range(3):
+            business_idea = BusinessIdea.objects.create(title='Bulk idea', description='One of many',
+                                                        submitted_by=bulk_user, status='QUEUE')
+            AnalysisQueueEntry.objects.create(business_idea=business_idea, user=bulk_user)
+        
+        # The other user is only behind the sent idea and the bulk user's first slot
+        self.assertEqual(evaluate_admission(other_user).position, 3)
+        self.assertEqual(evaluate_admission(bulk_user).position, 5)
+        
+        queued = AnalysisQueueEntry.objects.filter(user=bulk_user).last().business_idea
+        self.assertEqual(get_queue_estimate(queued)['position'], 4)
+    
+    @override_settings(ANALYSIS_ADMISSION_MAX_QUEUE=1, ANALYSIS_ADMISSION_SATURATED_ACTION='defer')
+    def test_saturated_backlog_defers_analysis(self):
+        decision = evaluate_admission()
+        business_idea = BusinessIdea.objects.create(title='Late idea', description='Submitted into a full backlog')
+        
+        with mock.patch('analysis_engine.admission.orchestrate_business_analysis') as orchestrate:
+            submit_for_analysis(business_idea, decision)
+        
+        self.assertTrue(decision.saturated)
+        orchestrate.delay.assert_not_called()
+        business_idea.refresh_from_db()
+        self.assertEqual(business_idea.status, 'QUEUE')
+        entry = AnalysisQueueEntry.objects.get(business_idea=business_idea, status='WAITING')
+        self.assertEqual(entry.not_before, decision.estimated_start)
+        self.assertGreaterEqual(get_queue_estimate(business_idea)['estimated_wait_seconds'],
+                                decision.estimated_wait_seconds - 1)
+    
+    @override_settings(ANALYSIS_ADMISSION_MAX_QUEUE=1, ANALYSIS_ADMISSION_SATURATED_ACTION='defer')
+    def test_deferred_analysis_is_dispatched_after_its_hold(self):
+        business_idea = BusinessIdea.objects.create(title='Late idea', description='Submitted into a full backlog')
+        submit_for_analysis(business_idea, evaluate_admission())
+        BusinessIdea.objects.filter(status='ANALYZING').update(status='COMPLETED')
+        
+        # Slots are free, but the hold has not expired yet
+        self.assertEqual(select_entries_to_dispatch(), [])
+        
+        AnalysisQueueEntry.objects.filter(business_idea=business_idea).update(
+            not_before=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual([entry.business_idea_id for entry in select_entries_to_dispatch()], [business_idea.id])
+
+
+@override_settings(ANALYSIS_REAPER_MAX_ATTEMPTS=2, ANALYSIS_JOIN_MODE='counter')
+class StuckAnalysisReaperTests(TestCase):
+    """Lease expiry handling of the stuck-analysis reaper"""
+    
+    def setUp(self):
+        cache.clear()
+        self.business_idea = BusinessIdea.objects.create(
+            title='Meal kit delivery',
+            description='Weekly meal kits for busy families',
+            status='ANALYZING'
+        )
+        self.workflow = AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=['FINANCIAL', 'MARKETING'],
+            pending_count=2
+        )
+    
+    def create_lost_task(self, task_id, attempt):
+        AgentReport.objects.create(
+            business_idea=self.business_idea,
+            agent_type='FINANCIAL',
+            report_content='',
+            status='IN_PROGRESS'
+        )
+        return AnalysisTask.objects.create(
+            business_idea=self.business_idea,
+            workflow=self.workflow,
+            task_id=task_id,
+            agent_type='FINANCIAL',
+            status='STARTED',
+            worker='celery@dead-host',
+            lease_expires_at=timezone.now() - timedelta(minutes=1),
+            attempt=attempt
+        )
+    
+    @mock.patch('analysis_engine.tasks.revoke_tasks')
+    def test_expired_lease_requeues_only_the_lost_agent(self, revoke):
+        self.create_lost_task('lost-1', attempt=1)
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            reap_stuck_analyses.apply().get()
+        
+        self.assertEqual(len(callbacks), 1)
+        revoke.assert_called_once_with(['lost-1'])
+        self.assertEqual(AnalysisTask.objects.get(task_id='lost-1').status, 'REVOKED')
+        requeued = AnalysisTask.objects.get(status='PENDING')
+        self.assertEqual((requeued.agent_type, requeued.attempt), ('FINANCIAL', 2))
+        self.assertEqual(ReaperAction.objects.get().action, 'REQUEUED_AGENT')
+        
+        # A late finish of the lost run no longer counts towards the workflow
+        self.workflow.refresh_from_db()
+        self.assertEqual(self.workflow.pending_count, 2)
+    
+    @mock.patch('analysis_engine.tasks.revoke_tasks')
+    def test_agent_fails_after_max_attempts(self, revoke):
+        self.create_lost_task('lost-2', attempt=2)
+        
+        reap_stuck_analyses.apply().get()
+        
+        self.assertFalse(AnalysisTask.objects.filter(status='PENDING').exists())
+        report = AgentReport.objects.get(agent_type='FINANCIAL')
+        self.assertEqual(report.status, 'FAILED')
+        self.workflow.refresh_from_db()
+        self.assertEqual(self.workflow.pending_count, 1)
+        self.assertEqual(ReaperAction.objects.get().action, 'FAILED_AGENT')
+
+
+class CancellationTests(TestCase):
+    """Cancel action on running analyses"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.client.force_login(self.user)
+        self.business_idea = BusinessIdea.objects.create(
+            title='Drone deliveries',
+            description='Last-mile parcels by drone',
+            submitted_by=self.user,
+            status='ANALYZING'
+        )
+        self.workflow = AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=['FINANCIAL', 'MARKETING'],
+            pending_count=2
+        )
+        for task_id, agent_type, task_status in [('queued', 'FINANCIAL', 'PENDING'), ('running', 'MARKETING', 'STARTED')]:
+            AnalysisTask.objects.create(
+                business_idea=self.business_idea,
+                workflow=self.workflow,
+                task_id=task_id,
+                agent_type=agent_type,
+                status=task_status
+            )
+            AgentReport.objects.create(business_idea=self.business_idea, agent_type=agent_type, status='IN_PROGRESS')
+    
+    @mock.patch('analysis_engine.tasks.revoke_tasks')
+    def test_cancel_revokes_queued_tasks_and_marks_rows(self, revoke):
+        response = self.client.post(f'/api/business-ideas/{self.business_idea.id}/cancel/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['revoked_tasks'], 1)
+        self.assertEqual(response.json()['signalled_tasks'], 1)
+        revoke.assert_called_once_with(['queued'])
+        self.business_idea.refresh_from_db()
+        self.assertEqual(self.business_idea.status, 'CANCELLED')
+        self.assertFalse(AnalysisTask.objects.exclude(status='REVOKED').exists())
+        self.assertFalse(AgentReport.objects.exclude(status='CANCELLED').exists())
+        self.workflow.refresh_from_db()
+        self.assertTrue(self.workflow.finalized)
+        
+        # The running agent sees the flag on its next poll
+        with self.assertRaises(AnalysisCancelled):
+            raise_if_cancelled(str(self.business_idea.id))
+        # A second cancel has nothing left to stop
+        response = self.client.post(f'/api/business-ideas/{self.business_idea.id}/cancel/')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_cancellation_aborts_inflight_call(self):
+        runtime = AgentRuntime()
+        call_cancelled = []
+        
+        async def slow_llm_call():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                call_cancelled.append(True)
+                raise
+        
+        request_cancellation(str(self.business_idea.id), 'Stopped by user')
+        with self.assertRaises(AnalysisCancelled):
+            runtime.run(
+                slow_llm_call(),
+                check_cancelled=lambda: raise_if_cancelled(str(self.business_idea.id)),
+                poll_interval=0.01
+            )
+        
+        # The coroutine is cancelled on the runtime loop, which closes the HTTP request
+        for _ in range(100):
+            if call_cancelled:
+                break
+            time.sleep(0.01)
+        self.assertEqual(call_cancelled, [True])
+
+
+class IdeaStatusPollingTests(TestCase):
+    """Cached, conditional idea status endpoint"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('poller', password='secret')
+        self.client.force_login(self.user)
+        self.business_idea = BusinessIdea.objects.create(
+            title='Plant subscription',
+            description='Monthly house plants',
+            submitted_by=self.user,
+            status='ANALYZING'
+        )
+        AnalysisWorkflow.objects.create(
+            business_idea=self.business_idea,
+            agent_types=['FINANCIAL', 'MARKETING'],
+            selective=True,
+            pending_count=1
+        )
+        self.report = AgentReport.objects.create(
+            business_idea=self.business_idea,
+            agent_type='FINANCIAL',
+            status='COMPLETED',
+            agent_score=70
+        )
+        self.url = f'/ajax/idea-status/{self.business_idea.id}/'
+    
+    def test_unchanged_poll_is_answered_from_cache(self):
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        # Progress is measured against the two scheduled agents
+        self.assertEqual(data['total_agents'], 2)
+        self.assertEqual(data['progress_percentage'], 50.0)
+        self.assertEqual(set(data['agent_status']), {'FINANCIAL', 'MARKETING'})
+        etag = response['ETag']
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'analysis_engine' in query['sql']])
+        
+        # Saving a report drops the snapshot and changes the validator
+        self.report.agent_score = 75
+        self.report.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ActivityTimeSeriesTests(TestCase):
+    """Calendar-period activity series from one grouped query"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(self.user)
+        for submitted_at, status, score in [
+            (datetime(2026, 1, 31, 23, 30), 'COMPLETED', 60),
+            (datetime(2026, 1, 2, 8, 0), 'COMPLETED', 80),
+            (datetime(2026, 3, 1, 0, 0), 'FAILED', None),
+        ]:
+            business_idea = BusinessIdea.objects.create(
+                title='Bike repair van',
+                description='Mobile bike repairs',
+                submitted_by=self.user,
+                status=status,
+                overall_score=score
+            )
+            BusinessIdea.objects.filter(pk=business_idea.pk).update(
+                submitted_at=timezone.make_aware(submitted_at)
+            )
+        rebuild_rollups()
+    
+    def test_months_follow_the_calendar_and_gaps_are_filled(self):
+        rollups = DailyIdeaRollup.objects.filter(user=self.user)
+        
+        with self.assertNumQueries(1):
+            series = idea_activity_series(rollups, date(2026, 1, 15), date(2026, 3, 10), 'month')
+        
+        self.assertEqual([entry['period'] for entry in series],
+                         [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        self.assertEqual([entry['ideas_submitted'] for entry in series], [2, 0, 1])
+        self.assertEqual([entry['analyses_completed'] for entry in series], [2, 0, 0])
+        self.assertEqual(series[0]['average_score'], 70)
+        self.assertIsNone(series[1]['average_score'])
+    
+    def test_range_parsing(self):
+        self.assertEqual(parse_series_range({}, today=date(2026, 3, 10)),
+                         (date(2025, 10, 1), date(2026, 3, 10), 'month'))
+        for params in [{'granularity': 'year'}, {'start': '2026-13-01'}, {'start': 'soon'},
+                       {'start': '2026-03-01', 'end': '2026-01-01'},
+                       {'start': '2000-01-01', 'end': '2026-01-01', 'granularity': 'day'}]:
+            with self.assertRaises(ValueError):
+                parse_series_range(params)
+    
+    def test_user_analytics_serializes_ideas(self):
+        response = self.client.get('/api/analytics/user_analytics/', {
+            'start': '2026-01-26', 'end': '2026-02-08', 'granularity': 'week'
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['granularity'], 'week')
+        self.assertEqual([entry['period'] for entry in data['activity']], ['2026-01-26', '2026-02-02'])
+        self.assertEqual(data['activity'][0]['ideas_submitted'], 1)
+        self.assertNotIn('monthly_activity', data)
+        self.assertEqual(data['best_performing_idea']['overall_score'], 80)
+        self.assertEqual(len(data['recent_activity']), 3)
+        
+        # Monthly series keep the deprecated alias
+        data = self.client.get('/api/analytics/user_analytics/', {'start': '2026-01-01', 'end': '2026-02-08'}).json()
+        self.assertEqual(data['granularity'], 'month')
+        self.assertEqual([entry['month'] for entry in data['monthly_activity']], ['2026-01', '2026-02'])
+        self.assertEqual(data['monthly_activity'][0]['ideas_submitted'], data['activity'][0]['ideas_submitted'])
+        
+        response = self.client.get('/api/analytics/user_analytics/', {'granularity': 'hour'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DailyRollupTests(TestCase):
+    """Rollups kept current by hooks and served to the dashboards"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('rollups', password='secret')
+        self.client.force_login(self.user)
+    
+    def rollup_values(self):
+        return (
+            sorted(DailyIdeaRollup.objects.values_list('user', 'industry', 'status', 'idea_count', 'score_sum')),
+            sorted(DailyAgentRollup.objects.values_list('agent_type', 'status', 'report_count', 'execution_time_sum')),
+        )
+    
+    def test_hooks_recount_the_changed_slice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            business_idea = BusinessIdea.objects.create(
+                title='Drone surveys',
+                description='Roof inspections by drone',
+                submitted_by=self.user,
+                industry='SERVICES',
+                status='ANALYZING'
+            )
+            AgentReport.objects.create(
+                business_idea=business_idea,
+                agent_type='FINANCIAL',
+                status='COMPLETED',
+                agent_score=70,
+                execution_time=timedelta(seconds=12)
+            )
+        self.assertEqual(self.rollup_values(), (
+            [(self.user.id, 'SERVICES', 'ANALYZING', 1, 0)],
+            [('FINANCIAL', 'COMPLETED', 1, timedelta(seconds=12))],
+        ))
+        
+        # A status change moves the idea between rollup rows
+        with self.captureOnCommitCallbacks(execute=True):
+            business_idea.status = 'COMPLETED'
+            business_idea.overall_score = 64
+            business_idea.save()
+        incremental = self.rollup_values()
+        self.assertEqual(incremental[0], [(self.user.id, 'SERVICES', 'COMPLETED', 1, 64)])
+        
+        # The nightly rebuild agrees with the incremental recounts
+        rebuild_rollups()
+        self.assertEqual(self.rollup_values(), incremental)
+    
+    def test_report_saves_leave_rollups_to_the_refresh_task(self):
+        business_idea = BusinessIdea.objects.create(title='Bike repair', description='Mobile bike repair',
+                                                    submitted_by=self.user, industry='SERVICES')
+        BusinessIdea.objects.filter(id=business_idea.id).update(submitted_at=timezone.now() - timedelta(days=3))
+        
+        # The hooks only flag the idea; every save before the refresh runs shares it
+        with mock.patch('analysis_engine.tasks.refresh_idea_rollups.apply_async') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                report = AgentReport.objects.create(business_idea=business_idea, agent_type='RISK_ANALYST',
+                                                    status='IN_PROGRESS')
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+                report.status = 'COMPLETED'
+                report.agent_score = 55
+                report.save(update_fields=['status', 'agent_score'])
+        refresh.assert_called_once_with(args=[str(business_idea.id)], countdown=5)
+        self.assertFalse(DailyAgentRollup.objects.exists())
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_idea_rollups.apply(args=[str(business_idea.id)])
+        
+        # Reports count on the day they were created, not on the idea's submission day
+        self.assertEqual(list(DailyAgentRollup.objects.values_list('day', 'status', 'report_count', 'score_sum')),
+                         [(timezone.localdate(report.created_at), 'COMPLETED', 1, 55)])
+        refreshed = self.rollup_values()
+        rebuild_rollups()
+        self.assertEqual(self.rollup_values(), refreshed)
+    
+    def test_bulk_report_updates_recount_the_report_days(self):
+        business_idea = BusinessIdea.objects.create(title='Bike repair', description='Mobile bike repair',
+                                                    submitted_by=self.user, industry='SERVICES')
+        AgentReport.objects.create(business_idea=business_idea, agent_type='FINANCIAL', status='IN_PROGRESS')
+        BusinessIdea.objects.filter(id=business_idea.id).update(submitted_at=timezone.now() - timedelta(days=3))
+        business_idea.refresh_from_db()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            AgentReport.objects.filter(business_idea=business_idea).update(status='CANCELLED')
+            schedule_rollup_refresh(business_idea)
+        
+        self.assertEqual(list(DailyAgentRollup.objects.values_list('status', 'report_count')), [('CANCELLED', 1)])
+    
+    def test_dashboard_stats_come_from_rollups(self):
+        for score, status in [(80, 'COMPLETED'), (60, 'COMPLETED'), (None, 'ANALYZING')]:
+            business_idea = BusinessIdea.objects.create(
+                title='Tool library',
+                description='Neighbourhood tool lending',
+                submitted_by=self.user,
+                status=status,
+                overall_score=score
+            )
+            AgentReport.objects.create(
+                business_idea=business_idea,
+                agent_type='MARKETING',
+                status='COMPLETED' if score else 'IN_PROGRESS',
+                agent_score=score,
+                confidence=75 if score else None
+            )
+        rebuild_rollups()
+        
+        data = self.client.get('/api/business-ideas/dashboard_stats/').json()
+        self.assertEqual(data['total_ideas'], 3)
+        self.assertEqual(data['recent_ideas_count'], 3)
+        self.assertEqual(data['completed_analyses'], 2)
+        self.assertEqual(data['in_progress'], 1)
+        self.assertEqual(data['average_score'], 70.0)
+        
+        data = self.client.get('/api/agent-reports/performance_metrics/').json()
+        self.assertEqual(data['MARKETING']['total_reports'], 2)
+        self.assertEqual(data['MARKETING']['average_score'], 70.0)
+        self.assertEqual(data['MARKETING']['average_confidence'], 75.0)
+
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints fetch progress and submitters with the page, not per row"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('lists', password='secret', is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+        for index in range(6):
+            business_idea = BusinessIdea.objects.create(
+                title=f'Idea {index}',
+                description='List fixture',
+                submitted_by=self.user,
+                status='COMPLETED',
+                overall_score=50 + index
+            )
+            for agent_type, report_status in [('FINANCIAL', 'COMPLETED'), ('MARKETING', 'FAILED')]:
+                AgentReport.objects.create(business_idea=business_idea, agent_type=agent_type, status=report_status)
+            IdeaGenerationRequest.objects.create(requested_by=self.user)
+        rebuild_rollups()
+    
+    def test_progress_comes_from_the_annotation(self):
+        business_idea = BusinessIdea.objects.with_progress().first()
+        with self.assertNumQueries(0):
+            progress = business_idea.progress_percentage
+        self.assertAlmostEqual(progress, 100 / len(AgentReport.AGENT_TYPES))
+        self.assertEqual(BusinessIdea.objects.first().progress_percentage, progress)
+    
+    def test_list_endpoints_have_a_fixed_query_count(self):
+        # Session and user, then the page with its annotations and joins; offset
+        # pages and the dashboard list also count their rows, analytics read the rollups
+        budgets = {
+            '/api/business-ideas/': 3,
+            '/api/business-ideas/dashboard_stats/': 5,
+            '/api/analytics/user_analytics/': 6,
+            '/api/agent-reports/': 3,
+            '/api/idea-generation/': 4,
+            '/ideas/': 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        
+        data = self.client.get('/api/business-ideas/').json()
+        self.assertAlmostEqual(data['results'][0]['progress_percentage'], 100 / len(AgentReport.AGENT_TYPES))
+        self.assertEqual(data['results'][0]['submitted_by']['username'], 'lists')
+    
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_admin_changelists_have_a_fixed_query_count(self):
+        # Besides the page: session, user, counts, date hierarchy and filter choices
+        budgets = {
+            '/admin/analysis_engine/businessidea/': 8,
+            '/admin/analysis_engine/agentreport/': 9,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk every row exactly once in both directions"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('pages', password='secret')
+        self.client.force_login(self.user)
+        # Shared timestamps and missing scores exercise the pk tie-breaker and NULL handling
+        submitted_at = timezone.now()
+        for index in range(7):
+            business_idea = BusinessIdea.objects.create(
+                title=f'Idea {index}',
+                description='Pagination fixture',
+                submitted_by=self.user,
+                overall_score=[40, 60, None, 60, None, 80, 40][index]
+            )
+            BusinessIdea.objects.filter(id=business_idea.id).update(
+                submitted_at=submitted_at - timedelta(hours=index // 2)
+            )
+            AgentReport.objects.create(business_idea=business_idea, agent_type='FINANCIAL')
+    
+    def walk(self, ordering):
+        ideas = BusinessIdea.objects.filter(submitted_by=self.user)
+        paginator = KeysetPaginator(ideas, ordering, 3)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        
+        backwards = [pages[-1]]
+        while backwards[-1].has_previous():
+            backwards.append(paginator.get_page(backwards[-1].previous_cursor))
+        
+        forward_ids = [idea.id for page in pages for idea in page]
+        self.assertEqual([[idea.id for idea in page] for page in reversed(backwards)],
+                         [[idea.id for idea in page] for page in pages])
+        return forward_ids
+    
+    def test_pages_cover_every_row_in_order(self):
+        for ordering in ['-submitted_at', 'submitted_at', '-overall_score', 'overall_score', 'title']:
+            with self.subTest(ordering=ordering):
+                ids = self.walk(ordering)
+                self.assertEqual(len(ids), 7)
+                self.assertEqual(len(set(ids)), 7)
+        
+        scores = [BusinessIdea.objects.get(id=idea_id).overall_score for idea_id in self.walk('-overall_score')]
+        self.assertEqual(scores, [80, 60, 60, 40, 40, None, None])
+    
+    def test_api_pages_follow_cursor_links(self):
+        data = self.client.get('/api/business-ideas/?page_size=3&count=true').json()
+        self.assertEqual((data['count'], data['count_exact']), (7, True))
+        self.assertIsNone(data['previous'])
+        
+        titles = [idea['title'] for idea in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            titles += [idea['title'] for idea in data['results']]
+        self.assertEqual(titles, list(BusinessIdea.objects.order_by('-submitted_at', '-id').values_list('title', flat=True)))
+        self.assertNotIn('count', data)
+        
+        self.assertEqual(self.client.get('/api/agent-reports/?cursor=bogus').status_code, 404)
+    
+    def test_counts_stop_at_the_limit(self):
+        ideas = BusinessIdea.objects.filter(submitted_by=self.user)
+        self.assertEqual(approximate_count(ideas, limit=5), (5, False))
+        self.assertEqual(approximate_count(ideas, limit=7), (7, True))
+        
+        response = self.client.get('/ideas/?order_by=-overall_score')
+        self.assertEqual(len(response.context['page_obj']), 7)
+        self.assertEqual(response.context['total_count'], 7)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class FullTextSearchTests(TestCase):
+    """Indexed search of ideas and reports, kept in sync by the database"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('search', password='secret', is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+        self.bakery = BusinessIdea.objects.create(
+            title='Neighbourhood bakery subscriptions',
+            description='Fresh bread delivered every morning <b>before</b> work',
+            submitted_by=self.user
+        )
+        self.bikes = BusinessIdea.objects.create(
+            title='Cargo bike courier',
+            description='Same-day deliveries with cargo bikes, including bread for cafes',
+            submitted_by=self.user
+        )
+        AgentReport.objects.create(
+            business_idea=self.bikes, agent_type='RISK_ANALYST', report_content='Insurance premiums for couriers'
+        )
+    
+    def titles(self, queryset):
+        return [idea.title for idea in queryset]
+    
+    def test_matches_are_ranked_and_highlighted(self):
+        results = list(search_ideas(BusinessIdea.objects.all(), 'bread').order_by('-search_rank'))
+        self.assertEqual([idea.id for idea in results], [self.bakery.id, self.bikes.id])
+        
+        # Title matches outweigh description matches; stems and prefixes match too
+        results = list(search_ideas(BusinessIdea.objects.all(), 'deliver bak').order_by('-search_rank'))
+        self.assertEqual(self.titles(results), ['Neighbourhood bakery subscriptions'])
+        self.assertEqual(self.titles(search_ideas(BusinessIdea.objects.all(), '"cargo" (bike*')),
+                         ['Cargo bike courier'])
+        self.assertFalse(search_ideas(BusinessIdea.objects.all(), '!!!').exists())
+        
+        highlight = highlight_html(search_ideas(BusinessIdea.objects.filter(id=self.bakery.id), 'bread')
+                                   .get().search_highlight)
+        self.assertIn('<mark>bread</mark>', highlight)
+        self.assertIn('&lt;b&gt;before&lt;/b&gt;', highlight)
+    
+    def test_index_follows_saves_updates_and_deletes(self):
+        self.bakery.title = 'Artisan pastry club'
+        self.bakery.save()
+        BusinessIdea.objects.filter(id=self.bikes.id).update(description='Parcel logistics')
+        
+        self.assertEqual(self.titles(search_ideas(BusinessIdea.objects.all(), 'pastry')), ['Artisan pastry club'])
+        self.assertEqual(self.titles(search_ideas(BusinessIdea.objects.all(), 'bread')), ['Artisan pastry club'])
+        
+        self.bakery.delete()
+        self.assertFalse(search_ideas(BusinessIdea.objects.all(), 'pastry').exists())
+        self.assertEqual(search_reports(AgentReport.objects.all(), 'insurance').count(), 1)
+    
+    def test_dashboard_and_admin_search(self):
+        response = self.client.get('/ideas/', {'search': 'bread'})
+        ideas = list(response.context['page_obj'])
+        self.assertEqual(response.context['order_by'], '-search_rank')
+        self.assertEqual([idea.id for idea in ideas], [self.bakery.id, self.bikes.id])
+        self.assertContains(response, '<mark>bread</mark>')
+        
+        response = self.client.get('/admin/analysis_engine/businessidea/', {'q': 'bread'})
+        self.assertEqual([idea.id for idea in response.context['cl'].result_list], [self.bakery.id, self.bikes.id])
+        response = self.client.get('/admin/analysis_engine/agentreport/', {'q': 'cargo'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class IdeaSortIndexTests(TestCase):
+    """Every sort key offered on the idea list pages through an index, without sorting"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('sorter', password='secret')
+        self.client.force_login(self.user)
+        for index in range(4):
+            BusinessIdea.objects.create(
+                title=f'Idea {index}',
+                description='Sort fixture',
+                submitted_by=self.user,
+                status=['PENDING', 'COMPLETED'][index % 2],
+                overall_score=[None, 70][index % 2]
+            )
+    
+    def test_sort_keys_use_user_indexes(self):
+        for ordering, _ in BusinessIdea.SORT_CHOICES:
+            for status in [None, 'COMPLETED']:
+                ideas = BusinessIdea.objects.filter(submitted_by=self.user).with_progress()
+                if status:
+                    ideas = ideas.filter(status=status)
+                paginator = KeysetPaginator(ideas, ordering, 1)
+                page = paginator.get_page()
+                for cursor in [None, page.next_cursor, paginator.get_page(page.next_cursor).previous_cursor]:
+                    with self.subTest(ordering=ordering, status=status, cursor=cursor):
+                        plan = paginator.page_queryset(cursor).explain()
+                        self.assertIn('analysis_engine_businessidea USING INDEX idea_user_', plan)
+                        self.assertNotIn('TEMP B-TREE', plan)
+    
+    def test_unknown_sort_keys_fall_back_to_newest(self):
+        for order_by in ['description', 'submitted_by__password', '-search_rank']:
+            response = self.client.get('/ideas/', {'order_by': order_by})
+            self.assertEqual(response.context['order_by'], '-submitted_at')
+            self.assertEqual(len(response.context['page_obj']), 4)
+        
+        response = self.client.get('/ideas/', {'search': 'idea'})
+        self.assertEqual(response.context['order_by'], '-search_rank')
+        response = self.client.get('/ideas/', {'search': 'idea', 'order_by': 'title'})
+        self.assertEqual([idea.title for idea in response.context['page_obj']], [f'Idea {index}' for index in range(4)])
+
+
+class PartialReportTests(TestCase):
+    """Output cut off at the deadline does not count as a parse failure"""
+    
+    def test_partial_reports_are_not_parse_failures(self):
+        partial = AgentResponse(
+            success=True, content='{"score": 40, "summary": "Prom', structured_data={}, confidence=0.0,
+            execution_time=285.0, token_usage=900, model_used='gpt-3.5-turbo', partial=True
+        )
+        values = _agent_report_values(partial)
+        self.assertTrue(values['is_partial'])
+        self.assertFalse(values['parse_failed'])
+        self.assertTrue(_agent_report_values(AgentResponse(**{**partial.__dict__, 'partial': False}))['parse_failed'])
+        
+        for is_partial in [True, True, False]:
+            AgentReport.objects.create(
+                business_idea=BusinessIdea.objects.create(title='Kiosk', description='Coffee kiosk'),
+                agent_type='FINANCIAL', status='COMPLETED',
+                model_tier='small', parse_failed=True, is_partial=is_partial, completed_at=timezone.now()
+            )
+        self.assertEqual(get_parse_failure_rates('FINANCIAL')['small'], {'runs': 1, 'failure_rate': 1.0})
@@ -0,0 +1,121 @@
+"""
+Idea Activity Time Series
+
+Submissions, completed analyses and average scores per calendar day, week or
+month, summed with one ``GROUP BY`` over the database-truncated day of the daily
+idea rollups (``TruncDay``/``TruncWeek``/``TruncMonth``). Periods without ideas
+are filled in Python so every series is contiguous.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Periods covered when no start date is given
+DEFAULT_PERIODS = {'day': 30, 'week': 12, 'month': 6}
+
+
+def period_start(value: date, granularity: str) -> date:
+    """First day of the period containing ``value`` (weeks start on Monday)"""
+    if granularity == 'month':
+        return value.replace(day=1)
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    return value
+
+
+def shift_period(period: date, count: int, granularity: str) -> date:
+    """Start of the period ``count`` periods after ``period`` (before, if negative)"""
+    if granularity == 'month':
+        year, month = divmod(period.year * 12 + period.month - 1 + count, 12)
+        return date(year, month + 1, 1)
+    if granularity == 'week':
+        return period + timedelta(weeks=count)
+    return period + timedelta(days=count)
+
+
+def iter_periods(start: date, end: date, granularity: str) -> Iterator[date]:
+    """Start dates of every period from the one containing ``start`` to the one containing ``end``"""
+    period = period_start(start, granularity)
+    while period <= end:
+        yield period
+        period = shift_period(period, 1, granularity)
+
+
+def parse_series_range(params: Mapping[str, str], today: Optional[date] = None) -> Tuple[date, date, str]:
+    """
+    Read ``start``, ``end`` (ISO dates, inclusive) and ``granularity`` from query params.
+    
+    Missing values default to the last ``DEFAULT_PERIODS`` periods up to today.
+    Raises ``ValueError`` with a message suitable for the client on invalid input.
+    """
+    granularity = params.get('granularity') or 'month'
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    
+    try:
+        end = parse_date(params['end']) if params.get('end') else (today or timezone.localdate())
+        start = parse_date(params['start']) if params.get('start') else None
+    except ValueError:
+        end = start = None
+    if end is None or (params.get('start') and start is None):
+        raise ValueError("start and end must be dates in YYYY-MM-DD format")
+    
+    if start is None:
+        start = shift_period(period_start(end, granularity), 1 - DEFAULT_PERIODS[granularity], granularity)
+    if start > end:
+        raise ValueError("start must not be after end")
+    
+    max_periods = getattr(settings, 'TIME_SERIES_MAX_PERIODS', 400)
+    if shift_period(period_start(start, granularity), max_periods, granularity) <= end:
+        raise ValueError(f"Range covers more than {max_periods} {granularity} periods")
+    
+    return start, end, granularity
+
+
+def idea_activity_series(rollups, start: date, end: date, granularity: str = 'month') -> List[Dict[str, Any]]:
+    """
+    Activity per period from ``start`` to ``end`` over a ``DailyIdeaRollup`` queryset, from one grouped query.
+    
+    Returns one entry per period, oldest first: ``period`` (start date),
+    ``ideas_submitted``, ``analyses_completed`` and ``average_score`` of the
+    completed ideas (``None`` when there are none).
+    """
+    periods = list(iter_periods(start, end, granularity))
+    
+    completed = Q(status='COMPLETED')
+    rows = rollups.filter(
+        day__gte=periods[0],
+        day__lt=shift_period(periods[-1], 1, granularity),
+    ).annotate(
+        period=GRANULARITIES[granularity]('day')
+    ).order_by().values('period').annotate(
+        ideas_submitted=Sum('idea_count'),
+        analyses_completed=Sum('idea_count', filter=completed),
+        completed_scores=Sum('score_sum', filter=completed),
+        completed_scored=Sum('score_count', filter=completed),
+    )
+    by_period = {row['period']: row for row in rows}
+    
+    series = []
+    for period in periods:
+        row = by_period.get(period, {})
+        scored = row.get('completed_scored')
+        series.append({
+            'period': period,
+            'ideas_submitted': row.get('ideas_submitted', 0),
+            'analyses_completed': row.get('analyses_completed') or 0,
+            'average_score': row['completed_scores'] / scored if scored else None,
+        })
+    return series
@@ -10,42 +10,76 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import Throttled, ValidationError
+from rest_framework.fields import BooleanField
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, F, Count, Avg, Sum
 from django.utils import timezone
 from datetime import timedelta
 
-from .models import BusinessIdea, AgentReport, FinalAnalysisReport, IdeaGenerationRequest
+from .models import (
+    BusinessIdea, AgentReport, FinalAnalysisReport, IdeaGenerationRequest, TriageResult,
+    DailyIdeaRollup, DailyAgentRollup
+)
 from .serializers import (
-    BusinessIdeaSerializer, BusinessIdeaCreateSerializer,
+    BusinessIdeaSerializer, BusinessIdeaCreateSerializer, BusinessIdeaListSerializer,
     AgentReportSerializer, FinalAnalysisReportSerializer,
-    IdeaGenerationRequestSerializer
+    IdeaGenerationRequestSerializer, TriageResultSerializer
+)
+from .tasks import (
+    orchestrate_business_analysis, generate_business_ideas,
+    select_agents_for_rerun, cancel_business_analysis, ANALYSIS_AGENT_TYPES
 )
-from .tasks import orchestrate_business_analysis, generate_business_ideas
+from .model_routing import get_tiering_savings
+from .fair_share import get_fair_share_metrics
+from .admission import evaluate_admission, submit_for_analysis, get_queue_estimate
+from .time_series import idea_activity_series, parse_series_range
+from .rollups import idea_stats, report_stats
+from .pagination import AgentReportPagination, BusinessIdeaPagination
+from agent_system.metrics import get_report_stats
 
 logger = logging.getLogger(__name__)
 
+PLATFORM_METRICS_KEY = 'analysis:platform_metrics'
+
 
 class BusinessIdeaViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing business ideas and their analysis.
     """
-    queryset = BusinessIdea.objects.all().order_by('-submitted_at')
+    queryset = BusinessIdea.objects.with_progress().order_by('-submitted_at')
     permission_classes = [IsAuthenticated]
+    pagination_class = BusinessIdeaPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
             return BusinessIdeaCreateSerializer
         return BusinessIdeaSerializer
     
+    def create(self, request, *args, **kwargs):
+        """Create a business idea; the response includes its queue position and ETA"""
+        self.admission = evaluate_admission(request.user)
+        if self.admission.action == 'reject':
+            raise Throttled(
+                wait=self.admission.estimated_wait_seconds,
+                detail='The analysis backlog is full. Please try again later.'
+            )
+        
+        response = super().create(request, *args, **kwargs)
+        response.data['admission'] = self.admission.as_dict()
+        return response
+    
     def perform_create(self, serializer):
         """Create a new business idea and trigger analysis"""
         business_idea = serializer.save(submitted_by=self.request.user)
         
         # Trigger the analysis workflow
         try:
-            orchestrate_business_analysis.delay(str(business_idea.id))
-            logger.info(f"Analysis triggered for business idea: {business_idea.title}")
+            submit_for_analysis(business_idea, self.admission)
+            logger.info(f"Analysis admitted ({self.admission.action}) for business idea: {business_idea.title} "
+                        f"(position {self.admission.position})")
         except Exception as e:
             logger.error(f"Failed to trigger analysis for {business_idea.title}: {str(e)}")
             # Don't fail the creation, just log the error
@@ -73,8 +107,11 @@ class BusinessIdeaViewSet(viewsets.ModelViewSet):
         except FinalAnalysisReport.DoesNotExist:
             pass
         
+        triage = TriageResult.objects.filter(business_idea=business_idea).first()
+        
         return Response({
             'business_idea': BusinessIdeaSerializer(business_idea).data,
+            'triage': TriageResultSerializer(triage).data if triage else None,
             'progress': {
                 'percentage': round(progress_percentage, 1),
                 'total_agents': total_agents,
@@ -85,6 +122,7 @@ class BusinessIdeaViewSet(viewsets.ModelViewSet):
             'agent_reports': AgentReportSerializer(agent_reports, many=True).data,
             'final_report': FinalAnalysisReportSerializer(final_report).data if final_report else None,
             'is_complete': business_idea.status == 'COMPLETED',
+            'queue': get_queue_estimate(business_idea),
             'last_updated': business_idea.updated_at,
         })
     
@@ -125,8 +163,9 @@ class BusinessIdeaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Reset status and trigger new analysis
-        business_idea.status = 'PENDING'
+        # Reset status and trigger new analysis; queued right away so a repeated
+        # request is refused above
+        business_idea.status = 'QUEUE'
         business_idea.save()
         
         # Delete existing reports to start fresh
@@ -144,32 +183,162 @@ class BusinessIdeaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a queued or running analysis and abort its in-flight agent calls"""
+        business_idea = self.get_object()
+        
+        if business_idea.status not in ['ANALYZING', 'QUEUE']:
+            return Response(
+                {'detail': 'No analysis in progress'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        reason = request.data.get('reason') or f"Cancelled by {request.user.username}"
+        summary = cancel_business_analysis(business_idea, reason=str(reason)[:500])
+        
+        return Response({
+            'detail': 'Analysis cancelled',
+            'status': business_idea.status,
+            **summary
+        })
+    
+    @action(detail=True, methods=['post'])
+    def full_analysis(self, request, pk=None):
+        """Run the full multi-agent analysis for an idea that was screened out by triage"""
+        business_idea = self.get_object()
+        
+        if business_idea.status in ['ANALYZING', 'QUEUE']:
+            return Response(
+                {'detail': 'Analysis already in progress'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        TriageResult.objects.filter(business_idea=business_idea).update(full_analysis_requested=True)
+        
+        # Queued right away, like the other entry points, so a repeated request is refused above
+        business_idea.status = 'QUEUE'
+        business_idea.save()
+        
+        try:
+            orchestrate_business_analysis.delay(str(business_idea.id), skip_triage=True)
+            return Response({'detail': 'Full analysis triggered successfully'})
+        except Exception as e:
+            logger.error(f"Failed to trigger full analysis for {business_idea.title}: {str(e)}")
+            return Response(
+                {'detail': 'Failed to trigger full analysis'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=True, methods=['post'])
+    def rerun_agents(self, request, pk=None):
+        """
+        Re-run only a subset of agents instead of the whole analysis.
+        
+        Body parameters:
+        - ``agent_types``: explicit list of agent types to re-run
+        - ``failed``: include agents whose report failed or is missing (default true
+          when nothing else is requested)
+        - ``stale_hours``: include agents whose last completed run is older than this
+        """
+        business_idea = self.get_object()
+        
+        if business_idea.status in ['ANALYZING', 'QUEUE']:
+            return Response(
+                {'detail': 'Analysis already in progress'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        agent_types = request.data.get('agent_types') or []
+        if not isinstance(agent_types, list):
+            return Response(
+                {'detail': 'agent_types must be a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        invalid_types = [t for t in agent_types if t not in ANALYSIS_AGENT_TYPES]
+        if invalid_types:
+            return Response(
+                {'detail': f"Unknown agent types: {', '.join(map(str, invalid_types))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stale_after = None
+        stale_hours = request.data.get('stale_hours')
+        if stale_hours is not None:
+            try:
+                stale_after = timedelta(hours=float(stale_hours))
+            except (TypeError, ValueError):
+                return Response(
+                    {'detail': 'stale_hours must be a number'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        failed = request.data.get('failed')
+        if failed is None:
+            failed = not agent_types and stale_after is None
+        else:
+            # Form and JSON bodies may carry "false"/"0" strings
+            try:
+                failed = BooleanField().to_internal_value(failed)
+            except ValidationError:
+                return Response(
+                    {'detail': 'failed must be a boolean'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        selected = select_agents_for_rerun(
+            business_idea,
+            failed=failed,
+            stale_after=stale_after,
+            agent_types=agent_types
+        )
+        
+        if not selected:
+            return Response({'detail': 'No agents need re-running', 'agent_types': []})
+        
+        business_idea.status = 'QUEUE'
+        business_idea.save()
+        
+        try:
+            orchestrate_business_analysis.delay(str(business_idea.id), agent_types=selected)
+            return Response({
+                'detail': 'Selective re-analysis triggered successfully',
+                'agent_types': selected
+            })
+        except Exception as e:
+            logger.error(f"Failed to trigger selective re-analysis for {business_idea.title}: {str(e)}")
+            return Response(
+                {'detail': 'Failed to trigger re-analysis'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
         """Get dashboard statistics"""
         user_ideas = self.queryset.filter(submitted_by=request.user)
+        user_rollups = DailyIdeaRollup.objects.filter(user=request.user)
+        stats = idea_stats(user_rollups)
+        avg_score = stats['average_score']
         
         # Recent activity (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_ideas = user_ideas.filter(submitted_at__gte=thirty_days_ago)
-        
-        # Status distribution
-        status_distribution = user_ideas.values('status').annotate(count=Count('status'))
-        
-        # Average scores
-        completed_ideas = user_ideas.filter(status='COMPLETED', overall_score__isnull=False)
-        avg_score = completed_ideas.aggregate(avg_score=Avg('overall_score'))['avg_score']
+        thirty_days_ago = timezone.localdate() - timedelta(days=30)
+        recent_ideas_count = user_rollups.filter(day__gte=thirty_days_ago).aggregate(
+            count=Sum('idea_count')
+        )['count'] or 0
         
         # Top performing ideas
+        completed_ideas = user_ideas.filter(status='COMPLETED', overall_score__isnull=False)
         top_ideas = completed_ideas.order_by('-overall_score')[:5]
         
         return Response({
-            'total_ideas': user_ideas.count(),
-            'recent_ideas_count': recent_ideas.count(),
-            'completed_analyses': user_ideas.filter(status='COMPLETED').count(),
-            'in_progress': user_ideas.filter(status='ANALYZING').count(),
+            'total_ideas': stats['total'],
+            'recent_ideas_count': recent_ideas_count,
+            'completed_analyses': stats['by_status'].get('COMPLETED', 0),
+            'in_progress': stats['by_status'].get('ANALYZING', 0),
             'average_score': round(avg_score, 1) if avg_score else None,
-            'status_distribution': list(status_distribution),
+            'status_distribution': [
+                {'status': idea_status, 'count': count} for idea_status, count in stats['by_status'].items()
+            ],
             'top_performing_ideas': BusinessIdeaSerializer(top_ideas, many=True).data,
         })
 
@@ -181,6 +350,7 @@ class AgentReportViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AgentReport.objects.all().order_by('-created_at')
     serializer_class = AgentReportSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AgentReportPagination
     
     def get_queryset(self):
         """Filter reports by user's business ideas"""
@@ -203,22 +373,18 @@ class AgentReportViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def performance_metrics(self, request):
         """Get performance metrics for agents"""
+        agent_stats = report_stats(DailyAgentRollup.objects.filter(user=request.user))
         metrics = {}
         
         for agent_type, agent_name in AgentReport.AGENT_TYPES:
-            agent_reports = self.get_queryset().filter(
-                agent_type=agent_type,
-                status='COMPLETED'
-            )
-            
-            if agent_reports.exists():
-                avg_score = agent_reports.aggregate(avg_score=Avg('agent_score'))['avg_score']
-                avg_confidence = agent_reports.aggregate(avg_conf=Avg('confidence'))['avg_conf']
-                total_reports = agent_reports.count()
+            stats = agent_stats.get(agent_type)
+            if stats and stats['successful']:
+                avg_score = stats['average_score']
+                avg_confidence = stats['average_confidence']
                 
                 metrics[agent_type] = {
                     'agent_name': agent_name,
-                    'total_reports': total_reports,
+                    'total_reports': stats['successful'],
                     'average_score': round(avg_score, 1) if avg_score else None,
                     'average_confidence': round(float(avg_confidence), 1) if avg_confidence else None,
                 }
@@ -230,7 +396,7 @@ class IdeaGenerationViewSet(viewsets.ModelViewSet):
     """
     ViewSet for generating new business ideas using AI.
     """
-    queryset = IdeaGenerationRequest.objects.all().order_by('-created_at')
+    queryset = IdeaGenerationRequest.objects.select_related('requested_by').order_by('-created_at')
     serializer_class = IdeaGenerationRequestSerializer
     permission_classes = [IsAuthenticated]
     
@@ -308,80 +474,176 @@ class AnalyticsViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Platform-wide statistics
-        total_ideas = BusinessIdea.objects.count()
-        completed_analyses = BusinessIdea.objects.filter(status='COMPLETED').count()
-        avg_score = BusinessIdea.objects.filter(
-            status='COMPLETED',
-            overall_score__isnull=False
-        ).aggregate(avg=Avg('overall_score'))['avg']
+        # Volume-dependent statistics come from the daily rollups plus the shared
+        # per-agent report stats, cached briefly for the auto-refreshing status pages
+        platform = cache.get(PLATFORM_METRICS_KEY)
+        if platform is None:
+            platform = self._compute_platform_metrics()
+            cache.set(PLATFORM_METRICS_KEY, platform, getattr(settings, 'METRICS_CACHE_TTL', 15))
+        
+        return Response({
+            **platform,
+            'fair_share': get_fair_share_metrics(),
+        })
+    
+    def _compute_platform_metrics(self):
+        platform_stats = idea_stats(DailyIdeaRollup.objects.all())
+        total_ideas = platform_stats['total']
+        completed_analyses = platform_stats['by_status'].get('COMPLETED', 0)
+        avg_score = platform_stats['average_score']
         
         # Industry distribution
-        industry_dist = BusinessIdea.objects.values('industry').annotate(
-            count=Count('industry')
+        industry_dist = DailyIdeaRollup.objects.order_by().values('industry').annotate(
+            count=Sum('idea_count')
         ).order_by('-count')
         
-        # Agent performance
+        # Agent performance over completed reports
+        report_stats = get_report_stats()
         agent_performance = {}
         for agent_type, agent_name in AgentReport.AGENT_TYPES:
-            reports = AgentReport.objects.filter(
-                agent_type=agent_type,
-                status='COMPLETED'
-            )
-            if reports.exists():
+            stats = report_stats.get(agent_type)
+            if stats and stats['successful']:
                 agent_performance[agent_type] = {
                     'name': agent_name,
-                    'total_reports': reports.count(),
-                    'avg_score': reports.aggregate(avg=Avg('agent_score'))['avg'],
-                    'avg_execution_time': reports.aggregate(
-                        avg=Avg('execution_time')
-                    )['avg'].total_seconds() if reports.aggregate(
-                        avg=Avg('execution_time')
-                    )['avg'] else 0,
+                    'total_reports': stats['successful'],
+                    'avg_score': stats['average_score'],
+                    'avg_execution_time': (stats['average_execution_time'].total_seconds()
+                                           if stats['average_execution_time'] else 0),
                 }
         
-        return Response({
+        return {
             'total_ideas': total_ideas,
             'completed_analyses': completed_analyses,
             'completion_rate': (completed_analyses / total_ideas * 100) if total_ideas > 0 else 0,
             'average_score': round(avg_score, 1) if avg_score else None,
             'industry_distribution': list(industry_dist),
             'agent_performance': agent_performance,
-        })
+        }
     
     @action(detail=False, methods=['get'])
-    def user_analytics(self, request):
-        """Get analytics for the current user"""
-        user_ideas = BusinessIdea.objects.filter(submitted_by=request.user)
-        
-        # Time series data (last 6 months)
-        six_months_ago = timezone.now() - timedelta(days=180)
-        monthly_data = []
-        
-        for i in range(6):
-            month_start = six_months_ago + timedelta(days=30*i)
-            month_end = month_start + timedelta(days=30)
-            
-            month_ideas = user_ideas.filter(
-                submitted_at__gte=month_start,
-                submitted_at__lt=month_end
+    def triage_metrics(self, request):
+        """Get triage accuracy and estimated savings (admin users only)"""
+        if not request.user.is_staff:
+            return Response(
+                {'detail': 'Admin access required'},
+                status=status.HTTP_403_FORBIDDEN
             )
-            
-            monthly_data.append({
-                'month': month_start.strftime('%Y-%m'),
-                'ideas_submitted': month_ideas.count(),
-                'analyses_completed': month_ideas.filter(status='COMPLETED').count(),
-                'avg_score': month_ideas.filter(
-                    status='COMPLETED',
-                    overall_score__isnull=False
-                ).aggregate(avg=Avg('overall_score'))['avg'] or 0,
-            })
+        
+        triage_stats = TriageResult.objects.aggregate(
+            total=Count('id'),
+            screened_out=Count('id', filter=Q(passed=False)),
+            overridden=Count('id', filter=Q(passed=False, full_analysis_requested=True)),
+            avg_score=Avg('viability_score'),
+            triage_cost=Sum('cost_estimate'),
+        )
+        
+        # Accuracy: compare the triage decision with the full analysis where both exist
+        evaluated = TriageResult.objects.filter(full_analysis_score__isnull=False)
+        accuracy_stats = evaluated.aggregate(
+            evaluated=Count('id'),
+            agreed=Count('id', filter=(
+                Q(passed=True, full_analysis_score__gte=F('threshold')) |
+                Q(passed=False, full_analysis_score__lt=F('threshold'))
+            )),
+            false_negatives=Count('id', filter=Q(passed=False, full_analysis_score__gte=F('threshold'))),
+        )
+        
+        # Savings: every screened-out idea that was not overridden skipped the agent
+        # fan-out plus the CEO report, priced at the average full analysis
+        full_analysis_stats = FinalAnalysisReport.objects.filter(generated_by_agent='CEO').aggregate(
+            avg_cost=Avg('total_cost')
+        )
+        avg_agent_time = AgentReport.objects.filter(
+            status='COMPLETED',
+            execution_time__isnull=False
+        ).aggregate(avg=Avg('execution_time'))['avg']
+        
+        skipped_analyses = triage_stats['screened_out'] - triage_stats['overridden']
+        generations_per_analysis = len(ANALYSIS_AGENT_TYPES) + 1
+        avg_full_cost = float(full_analysis_stats['avg_cost'] or 0)
         
         return Response({
-            'monthly_activity': monthly_data,
-            'total_ideas': user_ideas.count(),
-            'best_performing_idea': user_ideas.filter(
-                status='COMPLETED'
-            ).order_by('-overall_score').first(),
-            'recent_activity': user_ideas.order_by('-submitted_at')[:5],
+            'total_triaged': triage_stats['total'],
+            'screened_out': triage_stats['screened_out'],
+            'passed': triage_stats['total'] - triage_stats['screened_out'],
+            'full_analysis_overrides': triage_stats['overridden'],
+            'average_viability_score': round(triage_stats['avg_score'], 1) if triage_stats['avg_score'] else None,
+            'accuracy': {
+                'evaluated': accuracy_stats['evaluated'],
+                'agreement_rate': (
+                    round(accuracy_stats['agreed'] / accuracy_stats['evaluated'] * 100, 1)
+                    if accuracy_stats['evaluated'] else None
+                ),
+                'false_negatives': accuracy_stats['false_negatives'],
+            },
+            'savings': {
+                'analyses_skipped': skipped_analyses,
+                'generations_skipped': skipped_analyses * generations_per_analysis,
+                'estimated_cost_saved': round(skipped_analyses * avg_full_cost, 4),
+                'estimated_agent_seconds_saved': (
+                    round(skipped_analyses * len(ANALYSIS_AGENT_TYPES) * avg_agent_time.total_seconds(), 1)
+                    if avg_agent_time else 0
+                ),
+                'triage_cost': float(triage_stats['triage_cost'] or 0),
+            },
         })
+    
+    @action(detail=False, methods=['get'])
+    def model_tiering(self, request):
+        """Get per-tier usage and savings versus always using the top tier (admin users only)"""
+        if not request.user.is_staff:
+            return Response(
+                {'detail': 'Admin access required'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response(get_tiering_savings())
+    
+    @action(detail=False, methods=['get'])
+    def user_analytics(self, request):
+        """
+        Get analytics for the current user
+        
+        The ``activity`` series covers the last 6 calendar months by default; pass
+        ``start``/``end`` (YYYY-MM-DD) and ``granularity`` (day, week or month)
+        for other ranges. Monthly series are also returned as ``monthly_activity``
+        (deprecated, with the old ``month`` key) for existing clients.
+        """
+        try:
+            start, end, granularity = parse_series_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        user_ideas = BusinessIdea.objects.filter(submitted_by=request.user).with_progress()
+        user_rollups = DailyIdeaRollup.objects.filter(user=request.user)
+        activity = [
+            {
+                'period': entry['period'].isoformat(),
+                'ideas_submitted': entry['ideas_submitted'],
+                'analyses_completed': entry['analyses_completed'],
+                'avg_score': entry['average_score'] or 0,
+            }
+            for entry in idea_activity_series(user_rollups, start, end, granularity)
+        ]
+        
+        best_performing_idea = user_ideas.filter(
+            status='COMPLETED',
+            overall_score__isnull=False
+        ).order_by('-overall_score').first()
+        recent_activity = user_ideas.order_by('-submitted_at')[:5]
+        
+        data = {
+            'granularity': granularity,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'activity': activity,
+            'total_ideas': idea_stats(user_rollups)['total'],
+            'best_performing_idea': (
+                BusinessIdeaListSerializer(best_performing_idea).data if best_performing_idea else None
+            ),
+            'recent_activity': BusinessIdeaListSerializer(recent_activity, many=True).data,
+        }
+        if granularity == 'month':
+            # Deprecated: use ``activity``
+            data['monthly_activity'] = [{'month': entry['period'][:7], **entry} for entry in activity]
+        return Response(data)
@@ -9,18 +9,23 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.http import JsonResponse
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg
+from django.http import JsonResponse, HttpResponseNotModified
+from django.db.models import Sum
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from datetime import timedelta
 import json
 
 from analysis_engine.models import (
     BusinessIdea, AgentReport, FinalAnalysisReport, 
-    IdeaGenerationRequest
+    IdeaGenerationRequest, DailyIdeaRollup, DailyAgentRollup
 )
-from analysis_engine.tasks import orchestrate_business_analysis
+from analysis_engine.admission import evaluate_admission, submit_for_analysis, format_wait
+from analysis_engine.idea_status import build_idea_status, get_cached_idea_status, with_scheduled_agents
+from analysis_engine.time_series import idea_activity_series, parse_series_range
+from analysis_engine.rollups import idea_stats, report_stats
+from analysis_engine.pagination import InvalidCursor, KeysetPaginator, approximate_count
+from analysis_engine.search import highlight_html, search_ideas
 
 
 def home_view(request):
@@ -41,22 +46,20 @@ def dashboard_view(request):
     
     user_ideas = BusinessIdea.objects.filter(submitted_by=request.user)
     
-    # Dashboard statistics
-    total_ideas = user_ideas.count()
-    completed_analyses = user_ideas.filter(status='COMPLETED').count()
-    in_progress = user_ideas.filter(status__in=['ANALYZING', 'QUEUE']).count()
+    # Dashboard statistics from the daily rollups
+    stats = idea_stats(DailyIdeaRollup.objects.filter(user=request.user))
+    total_ideas = stats['total']
+    completed_analyses = stats['by_status'].get('COMPLETED', 0)
+    in_progress = stats['by_status'].get('ANALYZING', 0) + stats['by_status'].get('QUEUE', 0)
+    avg_score = stats['average_score']
     
     # Recent activity
     recent_ideas = user_ideas.order_by('-submitted_at')[:5]
     
-    # Performance metrics
-    completed_ideas = user_ideas.filter(status='COMPLETED', overall_score__isnull=False)
-    avg_score = completed_ideas.aggregate(avg=Avg('overall_score'))['avg']
-    
     # Status distribution for chart
-    status_distribution = user_ideas.values('status').annotate(
-        count=Count('status')
-    ).order_by('status')
+    status_distribution = [
+        {'status': idea_status, 'count': count} for idea_status, count in stats['by_status'].items()
+    ]
     
     # Recent activity timeline
     thirty_days_ago = timezone.now() - timedelta(days=30)
@@ -71,7 +74,7 @@ def dashboard_view(request):
         'in_progress': in_progress,
         'average_score': round(avg_score, 1) if avg_score else None,
         'recent_ideas': recent_ideas,
-        'status_distribution': list(status_distribution),
+        'status_distribution': status_distribution,
         'recent_activity': recent_activity,
         'completion_rate': (completed_analyses / total_ideas * 100) if total_ideas > 0 else 0,
     }
@@ -108,6 +111,14 @@ def submit_idea_view(request):
             except ValueError:
                 errors.append("Invalid budget amount")
         
+        # Admission control: tell the user up front how long the backlog is
+        admission = None
+        if not errors:
+            admission = evaluate_admission(request.user)
+            if admission.action == 'reject':
+                errors.append(f"The analysis backlog is full (estimated wait "
+                              f"{format_wait(admission.estimated_wait_seconds)}). Please try again later.")
+        
         if errors:
             for error in errors:
                 messages.error(request, error)
@@ -124,8 +135,15 @@ def submit_idea_view(request):
             
             # Trigger analysis
             try:
-                orchestrate_business_analysis.delay(str(business_idea.id))
-                messages.success(request, f'Business idea "{title}" submitted successfully! Analysis is starting...')
+                submit_for_analysis(business_idea, admission)
+                if admission.action == 'defer':
+                    messages.warning(request, f'Business idea "{title}" saved. The analysis backlog is full, '
+                                              f'so its analysis starts automatically later; results in '
+                                              f'about {format_wait(admission.estimated_wait_seconds)}.')
+                else:
+                    messages.success(request, f'Business idea "{title}" submitted successfully! '
+                                              f'Position {admission.position} in the queue, results in '
+                                              f'about {format_wait(admission.estimated_wait_seconds)}.')
                 return redirect('dashboard:idea_detail', idea_id=business_idea.id)
             except Exception as e:
                 messages.error(request, f'Failed to start analysis: {str(e)}')
@@ -145,7 +163,7 @@ def submit_idea_view(request):
 def ideas_list_view(request):
     """List all user's business ideas with filtering and pagination"""
     
-    user_ideas = BusinessIdea.objects.filter(submitted_by=request.user)
+    user_ideas = BusinessIdea.objects.filter(submitted_by=request.user).with_progress()
     
     # Filtering
     status_filter = request.GET.get('status')
@@ -159,19 +177,25 @@ def ideas_list_view(request):
         user_ideas = user_ideas.filter(industry=industry_filter)
     
     if search_query:
-        user_ideas = user_ideas.filter(
-            Q(title__icontains=search_query) | 
-            Q(description__icontains=search_query)
-        )
-    
-    # Ordering
-    order_by = request.GET.get('order_by', '-submitted_at')
-    user_ideas = user_ideas.order_by(order_by)
+        user_ideas = search_ideas(user_ideas, search_query)
     
-    # Pagination
-    paginator = Paginator(user_ideas, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Ordering and keyset pagination on (order field, id); only indexed sort keys are accepted,
+    # plus relevance for searches, whose matches the search index has already narrowed down
+    sort_choices = list(BusinessIdea.SORT_CHOICES)
+    if search_query:
+        sort_choices.insert(0, ('-search_rank', 'Best Match'))
+    order_by = request.GET.get('order_by')
+    if order_by not in dict(sort_choices):
+        order_by = sort_choices[0][0]
+    paginator = KeysetPaginator(user_ideas, order_by, 10)
+    try:
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page_obj = paginator.get_page()
+    total_count, total_exact = approximate_count(user_ideas)
+    if search_query:
+        for idea in page_obj:
+            idea.search_snippet = highlight_html(idea.search_highlight)
     
     # Filter options for the template
     status_choices = BusinessIdea.STATUS_CHOICES
@@ -184,6 +208,9 @@ def ideas_list_view(request):
         'industry_filter': industry_filter,
         'search_query': search_query,
         'order_by': order_by,
+        'sort_choices': sort_choices,
+        'total_count': total_count,
+        'total_exact': total_exact,
         'status_choices': status_choices,
         'industry_choices': industry_choices,
     }
@@ -278,38 +305,35 @@ def analytics_view(request):
     """Analytics and insights dashboard"""
     
     user_ideas = BusinessIdea.objects.filter(submitted_by=request.user)
-    
-    # Time-based analytics (last 6 months)
-    six_months_ago = timezone.now() - timedelta(days=180)
-    monthly_data = []
-    
-    for i in range(6):
-        month_start = six_months_ago + timedelta(days=30*i)
-        month_end = month_start + timedelta(days=30)
-        
-        month_ideas = user_ideas.filter(
-            submitted_at__gte=month_start,
-            submitted_at__lt=month_end
-        )
-        
-        completed_month = month_ideas.filter(status='COMPLETED')
-        avg_score = completed_month.aggregate(avg=Avg('overall_score'))['avg']
-        
-        monthly_data.append({
-            'month': month_start.strftime('%B %Y'),
-            'ideas_submitted': month_ideas.count(),
-            'analyses_completed': completed_month.count(),
-            'average_score': round(avg_score, 1) if avg_score else 0,
-        })
+    user_rollups = DailyIdeaRollup.objects.filter(user=request.user)
+    stats = idea_stats(user_rollups)
+    
+    # Calendar-month activity (last 6 months), one grouped query over the rollups
+    start, end, granularity = parse_series_range({})
+    monthly_data = [
+        {
+            'month': entry['period'].strftime('%B %Y'),
+            'ideas_submitted': entry['ideas_submitted'],
+            'analyses_completed': entry['analyses_completed'],
+            'average_score': round(entry['average_score'], 1) if entry['average_score'] else 0,
+        }
+        for entry in idea_activity_series(user_rollups, start, end, granularity)
+    ]
     
     # Industry performance
-    industry_performance = user_ideas.filter(
+    industry_rows = user_rollups.filter(
         status='COMPLETED',
-        overall_score__isnull=False
-    ).values('industry').annotate(
-        count=Count('industry'),
-        avg_score=Avg('overall_score')
-    ).order_by('-avg_score')
+        score_count__gt=0
+    ).order_by().values('industry').annotate(
+        count=Sum('score_count'),
+        scores=Sum('score_sum')
+    )
+    industry_performance = sorted(
+        [{'industry': row['industry'], 'count': row['count'], 'avg_score': row['scores'] / row['count']}
+         for row in industry_rows],
+        key=lambda row: row['avg_score'],
+        reverse=True
+    )
     
     # Top and bottom performing ideas
     completed_ideas = user_ideas.filter(
@@ -321,26 +345,24 @@ def analytics_view(request):
     bottom_ideas = completed_ideas.reverse()[:5]
     
     # Agent performance from user's perspective
-    user_reports = AgentReport.objects.filter(
-        business_idea__submitted_by=request.user,
-        status='COMPLETED'
+    agent_stats = report_stats(DailyAgentRollup.objects.filter(user=request.user))
+    agent_performance = sorted(
+        [{'agent_type': agent_type, 'count': row['successful'],
+          'avg_score': row['average_score'], 'avg_confidence': row['average_confidence']}
+         for agent_type, row in agent_stats.items() if row['successful']],
+        key=lambda row: row['avg_score'] or 0,
+        reverse=True
     )
     
-    agent_performance = user_reports.values('agent_type').annotate(
-        count=Count('agent_type'),
-        avg_score=Avg('agent_score'),
-        avg_confidence=Avg('confidence')
-    ).order_by('-avg_score')
-    
     context = {
         'title': 'Analytics & Insights',
         'monthly_data': monthly_data,
-        'industry_performance': list(industry_performance),
+        'industry_performance': industry_performance,
         'top_ideas': top_ideas,
         'bottom_ideas': bottom_ideas,
-        'agent_performance': list(agent_performance),
-        'total_ideas': user_ideas.count(),
-        'completed_ideas': user_ideas.filter(status='COMPLETED').count(),
+        'agent_performance': agent_performance,
+        'total_ideas': stats['total'],
+        'completed_ideas': stats['by_status'].get('COMPLETED', 0),
     }
     
     return render(request, 'dashboard/analytics.html', context)
@@ -349,53 +371,28 @@ def analytics_view(request):
 # AJAX endpoint for real-time updates
 @login_required
 def idea_status_ajax(request, idea_id):
-    """AJAX endpoint to get real-time status updates for an idea"""
-    
-    business_idea = get_object_or_404(
-        BusinessIdea,
-        id=idea_id,
-        submitted_by=request.user
-    )
-    
-    # Get agent reports progress
-    agent_reports = AgentReport.objects.filter(business_idea=business_idea)
-    total_agents = len(AgentReport.AGENT_TYPES)
-    completed_reports = agent_reports.filter(status='COMPLETED').count()
-    failed_reports = agent_reports.filter(status='FAILED').count()
-    in_progress_reports = agent_reports.filter(status='IN_PROGRESS').count()
-    
-    progress_percentage = (completed_reports / total_agents * 100) if total_agents > 0 else 0
-    
-    # Agent status summary
-    agent_status = {}
-    for report in agent_reports:
-        agent_status[report.agent_type] = {
-            'status': report.status,
-            'score': report.agent_score,
-            'created_at': report.created_at.isoformat() if report.created_at else None,
-        }
-    
-    # Add pending agents
-    for agent_type, agent_name in AgentReport.AGENT_TYPES:
-        if agent_type not in agent_status:
-            agent_status[agent_type] = {
-                'status': 'PENDING',
-                'score': None,
-                'created_at': None,
-            }
+    """
+    AJAX endpoint to get real-time status updates for an idea
+    
+    Served from a cached snapshot with a strong ETag; a poll whose
+    ``If-None-Match`` matches gets 304 without querying the database.
+    """
+    snapshot = get_cached_idea_status(idea_id, request.user.id)
+    if snapshot is None:
+        business_idea = get_object_or_404(
+            with_scheduled_agents(BusinessIdea.objects.all()),
+            id=idea_id,
+            submitted_by=request.user
+        )
+        snapshot = build_idea_status(business_idea)
     
-    return JsonResponse({
-        'status': business_idea.status,
-        'overall_score': business_idea.overall_score,
-        'recommendation': business_idea.recommendation,
-        'progress_percentage': round(progress_percentage, 1),
-        'completed_reports': completed_reports,
-        'failed_reports': failed_reports,
-        'in_progress_reports': in_progress_reports,
-        'agent_status': agent_status,
-        'is_complete': business_idea.status == 'COMPLETED',
-        'last_updated': business_idea.updated_at.isoformat(),
-    })
+    if snapshot['etag'] in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(snapshot['payload'])
+    response['ETag'] = snapshot['etag']
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # Authentication views (using Django's built-in views with custom templates)